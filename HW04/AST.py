@@ -1,5 +1,6 @@
 
 class Node(object):
+    __slots__ = ()
 
     def accept(self, visitor):
         return visitor.visit(self)
@@ -8,12 +9,43 @@ class Node(object):
         return self.printTree()
 
 
+# the nodes held by the slots of <node>
+def children(node):
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            value = getattr(node, name, None)
+            if isinstance(value, Node):
+                yield value
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, Node):
+                        yield item
+
+
+# <node> and every node below it, in no particular order
+def walk(node):
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        yield node
+        todo.extend(children(node))
+
+
+# number of nodes in the tree of <node>
+def size(node):
+    return sum(1 for _ in walk(node))
+
+
 class Program(Node):
+    __slots__ = ('elements', 'frame_size')  # frame_size: set by Resolver
+
     def __init__(self, elements):
         self.elements = elements
 
 
 class Elements(Node):
+    __slots__ = ('list',)
+
     def __init__(self):
         self.list = []
 
@@ -22,6 +54,8 @@ class Elements(Node):
 
 
 class Element(Node):
+    __slots__ = ('dec', 'func', 'inst')
+
     def __init__(self, dec, func, inst):
         self.dec = dec
         self.func = func
@@ -29,6 +63,8 @@ class Element(Node):
 
 
 class Declarations(Node):
+    __slots__ = ('list',)
+
     def __init__(self):
         self.list = []
 
@@ -37,12 +73,16 @@ class Declarations(Node):
 
 
 class Declaration(Node):
+    __slots__ = ('type', 'inits')
+
     def __init__(self, type, inits):
         self.type = type
         self.inits = inits
 
 
 class Inits(Node):
+    __slots__ = ('list',)
+
     def __init__(self):
         self.list = []
 
@@ -51,6 +91,8 @@ class Inits(Node):
 
 
 class Init(Node):
+    __slots__ = ('ID', 'expr', 'line', 'depth', 'slot')  # depth, slot: set by Resolver
+
     def __init__(self, ID, expr, line):
         self.ID = ID
         self.expr = expr
@@ -58,6 +100,8 @@ class Init(Node):
 
 
 class Instructions(Node):
+    __slots__ = ('list',)
+
     def __init__(self):
         self.list = []
 
@@ -66,18 +110,24 @@ class Instructions(Node):
 
 
 class PrintInstr(Node):
+    __slots__ = ('expr_list', 'line')
+
     def __init__(self, expr_list, line):
         self.expr_list = expr_list
         self.line = line
 
 
 class LabeledInstr(Node):
+    __slots__ = ('ID', 'instruction')
+
     def __init__(self, ID, instruction):
         self.ID = ID
         self.instruction = instruction
 
 
 class Assignment(Node):
+    __slots__ = ('ID', 'expression', 'line', 'depth', 'slot')  # depth, slot: set by Resolver
+
     def __init__(self, ID, expression, line):
         self.ID = ID
         self.expression = expression
@@ -85,6 +135,8 @@ class Assignment(Node):
 
 
 class ChoiceInstr(Node):
+    __slots__ = ('cond', 'instr_1', 'instr_2')
+
     def __init__(self, cond, instr_1, instr_2):
         self.cond = cond
         self.instr_1 = instr_1
@@ -92,67 +144,92 @@ class ChoiceInstr(Node):
 
 
 class WhileInstr(Node):
+    __slots__ = ('cond', 'instr')
+
     def __init__(self, cond, instr):
         self.cond = cond
         self.instr = instr
 
 
 class RepeatInstr(Node):
+    __slots__ = ('instructions', 'cond')
+
     def __init__(self, instructions, cond):
         self.instructions = instructions
         self.cond = cond
 
 
 class ReturnInstr(Node):
+    __slots__ = ('expr', 'line', 'tail')  # tail: set by TailCallMarker
+
     def __init__(self, expr, line):
         self.expr = expr
         self.line = line
+        self.tail = None
 
 
 class ContinueInstr(Node):
+    __slots__ = ('line',)
+
     def __init__(self, line):
         self.line = line
 
 
 class BreakInstr(Node):
+    __slots__ = ('line',)
+
     def __init__(self, line):
         self.line = line
 
 
 class CompoundInstr(Node):
+    __slots__ = ('declarations', 'instructions_opt')
+
     def __init__(self, declarations, instructions_opt):
         self.declarations = declarations
         self.instructions_opt = instructions_opt
 
 
 class Const(Node):
+    __slots__ = ('const', 'line', 'type')  # type: set by TypeChecker
+
     def __init__(self, const, line):
         self.const = const
         self.line = line
 
 
 class Integer(Const):
+    __slots__ = ()
+
     def __init__(self, const, line):
         Const.__init__(self, const, line)
 
 
 class Float(Const):
+    __slots__ = ()
+
     def __init__(self, const, line):
         Const.__init__(self, const, line)
 
 
 class String(Const):
+    __slots__ = ()
+
     def __init__(self, const, line):
         Const.__init__(self, const[1:-1], line)
 
 
 class Variable(Node):
+    __slots__ = ('name', 'line', 'depth', 'slot', 'type')  # depth, slot: set by Resolver, type: by TypeChecker
+
     def __init__(self, name, line):
         self.name = name
         self.line = line
 
 
 class IDPareExpr(Node):
+    __slots__ = ('ID', 'expr_list', 'line', 'type', 'cache')  # type: set by TypeChecker, cache: by Interpreter
+
     def __init__(self, ID, expr_list, line):
         self.ID = ID
         self.expr_list = expr_list
@@ -160,11 +237,15 @@ class IDPareExpr(Node):
 
 
 class PareExpr(Node):
+    __slots__ = ('expr', 'type')  # type: set by TypeChecker
+
     def __init__(self, expr):
         self.expr = expr
 
 
 class BinExpr(Node):
+    __slots__ = ('op', 'left', 'right', 'line', 'type')  # type: set by TypeChecker
+
     def __init__(self, op, left, right, line):
         self.op = op
         self.left = left
@@ -173,6 +254,8 @@ class BinExpr(Node):
 
 
 class ExprList(Node):
+    __slots__ = ('list',)
+
     def __init__(self):
         self.list = []
 
@@ -181,6 +264,8 @@ class ExprList(Node):
 
 
 class FunDefs(Node):
+    __slots__ = ('list',)
+
     def __init__(self):
         self.list = []
 
@@ -189,6 +274,8 @@ class FunDefs(Node):
 
 
 class FunDef(Node):
+    __slots__ = ('type', 'ID', 'args_list', 'compound_instr', 'line', 'frame_size')  # frame_size: set by Resolver
+
     def __init__(self, type, ID, args_list, compound_instr, line):
         self.type = type
         self.ID = ID
@@ -198,6 +285,8 @@ class FunDef(Node):
 
 
 class ArgsList(Node):
+    __slots__ = ('list',)
+
     def __init__(self):
         self.list = []
 
@@ -206,6 +295,8 @@ class ArgsList(Node):
 
 
 class Arg(Node):
+    __slots__ = ('type', 'ID', 'line', 'depth', 'slot')  # depth, slot: set by Resolver
+
     def __init__(self, type, ID, line):
         self.type = type
         self.ID = ID
@@ -0,0 +1,110 @@
+import cPickle as pickle
+import hashlib
+import os
+import tempfile
+
+import AST
+import Cparser
+import FastScanner
+import PrattParser
+import scanner
+import SymbolTable
+import TypeChecker
+
+
+MAGIC = 'hw04-ast-cache'
+
+# modules whose code decides what tree and diagnostics a source produces
+FRONT_END = [AST, Cparser, FastScanner, PrattParser, scanner, SymbolTable, TypeChecker]
+
+
+# hash of the source of <modules>
+def sourceVersion(modules):
+    digest = hashlib.sha1()
+    for module in modules:
+        path = os.path.splitext(module.__file__)[0] + '.py'
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def frontEndVersion():
+    return sourceVersion(FRONT_END)
+
+
+class Entry(object):
+
+    def __init__(self, ast, diagnostics, haveErrors):
+        self.ast = ast
+        self.diagnostics = diagnostics      # what the scanner, parser and TypeChecker printed
+        self.haveErrors = haveErrors
+
+
+# On-disk cache of parsed and type-checked programs, one pickle file per
+# source, named after the hash of the source text, the front end version and
+# <options>, the front end choices (lexer, parser) that change the result.
+# Once the directory grows over <max_bytes> the least recently used entries
+# are removed. Files that fail to load are dropped and count as a miss.
+class ASTCache(object):
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, options=''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = frontEndVersion() + '\0' + options
+
+    def key(self, text):
+        return hashlib.sha1(self.version + '\0' + text).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.ast')
+
+    def load(self, text):
+        key = self.key(text)
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                magic, stored_key, entry = pickle.load(f)
+            if magic != MAGIC or stored_key != key or not isinstance(entry, Entry):
+                raise ValueError("not an entry of this cache")
+        except Exception:
+            self.discard(path)
+            return None
+        # mtime marks the last use for eviction
+        os.utime(path, None)
+        return entry
+
+    def store(self, text, entry):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        key = self.key(text)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((MAGIC, key, entry), f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp, self.path(key))
+        except Exception:
+            self.discard(tmp)
+            raise
+        self.evict()
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.ast'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.discard(path)
+            total -= size
@@ -0,0 +1,48 @@
+import time
+
+from Exceptions import BudgetExceeded
+from Stats import peakRSS
+
+
+# Limits on a run of an untrusted program: <fuel> steps, where a step is a
+# loop iteration or a call, <seconds> of wall time from now and <memory>
+# bytes of peak RSS, each None for no limit. Engines call tick() once per
+# step, which only counts down; every <interval> steps check() charges the
+# fuel and samples the clock and the memory, so the time and memory limits
+# are noticed up to <interval> steps late while fuel runs out exactly.
+class Budget(object):
+
+    def __init__(self, fuel=None, seconds=None, memory=None, interval=1024):
+        self.fuel = fuel
+        self.deadline = None if seconds is None else time.time() + seconds
+        self.seconds = seconds
+        self.memory = memory
+        self.interval = interval
+        self.spent = 0                  # steps of the windows granted before the current one
+        self.granted = self.window()
+        self.left = self.granted
+
+    def window(self):
+        if self.fuel is None:
+            return self.interval
+        return max(0, min(self.interval, self.fuel - self.spent))
+
+    def tick(self):
+        self.left -= 1
+        if self.left < 0:
+            self.check()
+
+    # called by the step the current window has no room for
+    def check(self):
+        self.spent += self.granted
+        if self.fuel is not None and self.spent >= self.fuel:
+            raise BudgetExceeded("out of fuel after {} steps".format(self.spent))
+        if self.deadline is not None and time.time() > self.deadline:
+            raise BudgetExceeded("time limit of {} s exceeded after {} steps".format(self.seconds, self.spent))
+        if self.memory is not None and peakRSS() > self.memory:
+            raise BudgetExceeded("memory limit of {} bytes exceeded after {} steps".format(self.memory, self.spent))
+        self.granted = self.window()
+        self.left = self.granted - 1
+
+    def steps(self):
+        return self.spent + self.granted - self.left
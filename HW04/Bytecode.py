@@ -0,0 +1,360 @@
+import AST
+from Exceptions import *
+from Interpreter import ops
+from visit import *
+
+
+# Every instruction takes two slots of the flat code list: opcode, argument.
+# Jump arguments are absolute offsets into that list.
+
+LOAD_CONST = 0
+LOAD_GLOBAL = 1
+LOAD_LOCAL = 2
+STORE_GLOBAL = 3
+STORE_LOCAL = 4
+INIT_GLOBAL = 5
+INIT_LOCAL = 6
+BINARY_OP = 7
+JUMP = 8
+JUMP_IF_FALSE = 9
+JUMP_IF_TRUE = 10
+ENTER_SCOPE = 11
+LEAVE_SCOPE = 12
+CALL = 13
+RETURN = 14
+PRINT = 15
+POP = 16
+DEF_FUNCTION = 17
+
+opnames = ['LOAD_CONST', 'LOAD_GLOBAL', 'LOAD_LOCAL', 'STORE_GLOBAL', 'STORE_LOCAL',
+           'INIT_GLOBAL', 'INIT_LOCAL', 'BINARY_OP', 'JUMP', 'JUMP_IF_FALSE', 'JUMP_IF_TRUE',
+           'ENTER_SCOPE', 'LEAVE_SCOPE', 'CALL', 'RETURN', 'PRINT', 'POP', 'DEF_FUNCTION']
+
+name_ops = [LOAD_GLOBAL, LOAD_LOCAL, STORE_GLOBAL, STORE_LOCAL, INIT_GLOBAL, INIT_LOCAL]
+jump_ops = [JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE]
+
+# BINARY_OP argument indexes this list
+binary_ops = sorted(ops.keys())
+
+# CALL argument packs the callee name index and the number of arguments
+CALL_ARGC_BITS = 8
+
+expressions = (AST.Const, AST.Variable, AST.IDPareExpr, AST.PareExpr, AST.BinExpr)
+
+
+class Code(object):
+
+    def __init__(self, name, params=None):
+        self.name = name
+        self.params = params        # None for the top level program
+        self.code = []
+        self.consts = []
+        self.names = []
+        self.lines = []             # (offset, line) pairs
+        self._consts = {}
+        self._names = {}
+
+    def isFunction(self):
+        return self.params is not None
+
+    def emit(self, op, arg=0):
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def offset(self):
+        return len(self.code)
+
+    def patch(self, at, target):
+        self.code[at + 1] = target
+
+    def constIndex(self, value):
+        key = (type(value), value) if not isinstance(value, Code) else id(value)
+        if key not in self._consts:
+            self._consts[key] = len(self.consts)
+            self.consts.append(value)
+        return self._consts[key]
+
+    def nameIndex(self, name):
+        if name not in self._names:
+            self._names[name] = len(self.names)
+            self.names.append(name)
+        return self._names[name]
+
+    def markLine(self, line):
+        if line is not None and (len(self.lines) == 0 or self.lines[-1][1] != line):
+            self.lines.append((self.offset(), line))
+
+
+class Loop(object):
+
+    def __init__(self, scopes):
+        self.scopes = scopes
+        self.breaks = []
+        self.continues = []
+
+
+class Compiler(object):
+
+    def __init__(self):
+        self.code = None
+        self.scopes = 0
+        self.loops = []
+
+    def compile(self, program):
+        self.code = Code('<program>')
+        program.accept(self)
+        self.code.emit(LOAD_CONST, self.code.constIndex(None))
+        self.code.emit(RETURN)
+        return self.code
+
+    def statement(self, node):
+        node.accept(self)
+        if isinstance(node, expressions):
+            self.code.emit(POP)
+
+    def leaveScopes(self, scopes):
+        if self.scopes > scopes:
+            self.code.emit(LEAVE_SCOPE, self.scopes - scopes)
+
+    def loopBody(self, body):
+        loop = Loop(self.scopes)
+        self.loops.append(loop)
+        body()
+        return self.loops.pop()
+
+    def patchLoop(self, loop, cond):
+        for at in loop.continues:
+            self.code.patch(at, cond)
+        for at in loop.breaks:
+            self.code.patch(at, self.code.offset())
+
+    @on('node')
+    def visit(self, node):
+        pass
+
+    @when(AST.Program)
+    def visit(self, node):
+        if node.elements is not None:
+            node.elements.accept(self)
+
+    @when(AST.Elements)
+    def visit(self, node):
+        for elem in node.list:
+            elem.accept(self)
+
+    @when(AST.Element)
+    def visit(self, node):
+        if node.dec is not None:
+            node.dec.accept(self)
+        if node.func is not None:
+            node.func.accept(self)
+        if node.inst is not None:
+            node.inst.accept(self)
+
+    @when(AST.Declarations)
+    def visit(self, node):
+        for decl in node.list:
+            if decl is not None:
+                decl.accept(self)
+
+    @when(AST.Declaration)
+    def visit(self, node):
+        node.inits.accept(self)
+
+    @when(AST.Inits)
+    def visit(self, node):
+        for init in node.list:
+            init.accept(self)
+
+    @when(AST.Init)
+    def visit(self, node):
+        self.code.markLine(node.line)
+        node.expr.accept(self)
+        self.code.emit(INIT_LOCAL if self.code.isFunction() else INIT_GLOBAL, self.code.nameIndex(node.ID))
+
+    @when(AST.Instructions)
+    def visit(self, node):
+        for inst in node.list:
+            self.statement(inst)
+
+    @when(AST.PrintInstr)
+    def visit(self, node):
+        self.code.markLine(node.line)
+        for expr in node.expr_list.list:
+            expr.accept(self)
+            self.code.emit(PRINT)
+
+    @when(AST.LabeledInstr)
+    def visit(self, node):
+        # the Interpreter does not execute labeled instructions either
+        pass
+
+    @when(AST.Assignment)
+    def visit(self, node):
+        self.code.markLine(node.line)
+        node.expression.accept(self)
+        self.code.emit(STORE_LOCAL if self.code.isFunction() else STORE_GLOBAL, self.code.nameIndex(node.ID))
+
+    @when(AST.ChoiceInstr)
+    def visit(self, node):
+        node.cond.accept(self)
+        jump_else = self.code.emit(JUMP_IF_FALSE)
+        self.statement(node.instr_1)
+        if node.instr_2 is None:
+            self.code.patch(jump_else, self.code.offset())
+        else:
+            jump_end = self.code.emit(JUMP)
+            self.code.patch(jump_else, self.code.offset())
+            self.statement(node.instr_2)
+            self.code.patch(jump_end, self.code.offset())
+
+    # condition is placed after the body so an iteration costs one jump
+    @when(AST.WhileInstr)
+    def visit(self, node):
+        jump_cond = self.code.emit(JUMP)
+        body = self.code.offset()
+        loop = self.loopBody(lambda: self.statement(node.instr))
+        cond = self.code.offset()
+        self.code.patch(jump_cond, cond)
+        node.cond.accept(self)
+        self.code.emit(JUMP_IF_TRUE, body)
+        self.patchLoop(loop, cond)
+
+    @when(AST.RepeatInstr)
+    def visit(self, node):
+        body = self.code.offset()
+        loop = self.loopBody(lambda: node.instructions.accept(self))
+        cond = self.code.offset()
+        node.cond.accept(self)
+        self.code.emit(JUMP_IF_FALSE, body)
+        self.patchLoop(loop, cond)
+
+    @when(AST.ReturnInstr)
+    def visit(self, node):
+        if not self.code.isFunction():
+            raise CompileError("return instruction outside a function: line {}".format(node.line))
+        self.code.markLine(node.line)
+        node.expr.accept(self)
+        # scopes of the function are dropped by the caller
+        self.code.emit(RETURN)
+
+    @when(AST.ContinueInstr)
+    def visit(self, node):
+        if len(self.loops) == 0:
+            raise CompileError("continue instruction outside a loop: line {}".format(node.line))
+        self.code.markLine(node.line)
+        loop = self.loops[-1]
+        self.leaveScopes(loop.scopes)
+        loop.continues.append(self.code.emit(JUMP))
+
+    @when(AST.BreakInstr)
+    def visit(self, node):
+        if len(self.loops) == 0:
+            raise CompileError("break instruction outside a loop: line {}".format(node.line))
+        self.code.markLine(node.line)
+        loop = self.loops[-1]
+        self.leaveScopes(loop.scopes)
+        loop.breaks.append(self.code.emit(JUMP))
+
+    @when(AST.CompoundInstr)
+    def visit(self, node):
+        self.code.emit(ENTER_SCOPE)
+        self.scopes += 1
+        if node.declarations is not None:
+            node.declarations.accept(self)
+        node.instructions_opt.accept(self)
+        self.scopes -= 1
+        self.code.emit(LEAVE_SCOPE, 1)
+
+    @when(AST.Const)
+    def visit(self, node):
+        node.const.accept(self)
+
+    @when(AST.Integer)
+    def visit(self, node):
+        self.code.emit(LOAD_CONST, self.code.constIndex(int(node.const)))
+
+    @when(AST.Float)
+    def visit(self, node):
+        self.code.emit(LOAD_CONST, self.code.constIndex(node.const))
+
+    @when(AST.String)
+    def visit(self, node):
+        self.code.emit(LOAD_CONST, self.code.constIndex(node.const))
+
+    @when(AST.Variable)
+    def visit(self, node):
+        self.code.emit(LOAD_LOCAL if self.code.isFunction() else LOAD_GLOBAL, self.code.nameIndex(node.name))
+
+    @when(AST.IDPareExpr)
+    def visit(self, node):
+        self.code.markLine(node.line)
+        args = [] if node.expr_list is None else node.expr_list.list
+        if len(args) >= 1 << CALL_ARGC_BITS:
+            raise CompileError("too many arguments in {} call: line {}".format(node.ID, node.line))
+        for expr in args:
+            expr.accept(self)
+        self.code.emit(CALL, self.code.nameIndex(node.ID) << CALL_ARGC_BITS | len(args))
+
+    @when(AST.PareExpr)
+    def visit(self, node):
+        node.expr.accept(self)
+
+    @when(AST.BinExpr)
+    def visit(self, node):
+        node.left.accept(self)
+        node.right.accept(self)
+        self.code.emit(BINARY_OP, binary_ops.index(node.op))
+
+    @when(AST.FunDefs)
+    def visit(self, node):
+        for fun_def in node.list:
+            fun_def.accept(self)
+
+    @when(AST.FunDef)
+    def visit(self, node):
+        params = [] if node.args_list is None else [arg.ID for arg in node.args_list.list]
+        outer = self.code, self.scopes, self.loops
+        self.code, self.scopes, self.loops = Code(node.ID, params), 0, []
+        self.code.markLine(node.line)
+        node.compound_instr.accept(self)
+        self.code.emit(LOAD_CONST, self.code.constIndex(None))
+        self.code.emit(RETURN)
+        function = self.code
+        self.code, self.scopes, self.loops = outer
+        self.code.emit(DEF_FUNCTION, self.code.constIndex(function))
+
+
+def describeArg(code, op, arg):
+    if op == LOAD_CONST:
+        value = code.consts[arg]
+        return "<code {}>".format(value.name) if isinstance(value, Code) else repr(value)
+    if op == DEF_FUNCTION:
+        return code.consts[arg].name
+    if op in name_ops:
+        return code.names[arg]
+    if op == BINARY_OP:
+        return binary_ops[arg]
+    if op == CALL:
+        return "{} argc={}".format(code.names[arg >> CALL_ARGC_BITS], arg & ((1 << CALL_ARGC_BITS) - 1))
+    if op in jump_ops:
+        return "to {}".format(arg)
+    return ""
+
+
+def disassemble(code):
+    lines = dict(code.lines)
+    header = code.name if not code.isFunction() else "{}({})".format(code.name, ", ".join(code.params))
+    res = "Disassembly of {}:\n".format(header)
+    targets = set(code.code[at + 1] for at in range(0, len(code.code), 2) if code.code[at] in jump_ops)
+    for at in range(0, len(code.code), 2):
+        op, arg = code.code[at], code.code[at + 1]
+        line = str(lines[at]) if at in lines else ""
+        marker = ">>" if at in targets else ""
+        res += "{:>5} {:>3} {:>5} {:<14} {:>5} {}\n".format(line, marker, at, opnames[op], arg,
+                                                           describeArg(code, op, arg)).rstrip() + "\n"
+    for value in code.consts:
+        if isinstance(value, Code):
+            res += "\n" + disassemble(value)
+    return res
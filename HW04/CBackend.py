@@ -0,0 +1,428 @@
+#!/usr/bin/python
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor
+from Exceptions import CompileError, UnsupportedProgram
+
+
+# exit status of a compiled program that met something only the python
+# engines handle (an int overflow, a division by zero, a negative shift):
+# its output is dropped and the program runs on the Interpreter instead
+FALLBACK_STATUS = 75
+
+INT_MIN = -2 ** 63
+INT_MAX = 2 ** 63 - 1
+
+CC_FLAGS = ['-O2', '-std=gnu99', '-w']
+
+COMPARISON_OPS = frozenset(['==', '!=', '<', '>', '<=', '>='])
+BITWISE_OPS = {'&': '&', '|': '|', '^': '^', '&&': '&', '||': '|'}
+# ints are 64 bit in C and unbounded in python, so these check for overflow
+# and round like python does
+CHECKED_OPS = {'+': 'hw_add', '-': 'hw_sub', '*': 'hw_mul', '/': 'hw_div', '%': 'hw_mod',
+               '<<': 'hw_shl', '>>': 'hw_shr'}
+
+C_TYPES = {'int': 'long long', 'string': 'const char *'}
+TEMP_TYPES = {'int': 'long long', 'string': 'const char *', 'bool': 'int'}
+
+PRELUDE = r"""#include <stdio.h>
+#include <stdlib.h>
+#include <unistd.h>
+
+#define FALLBACK_STATUS %d
+
+static void hw_fallback(void) { _exit(FALLBACK_STATUS); }
+
+static long long hw_add(long long a, long long b) {
+    long long r;
+    if (__builtin_add_overflow(a, b, &r)) hw_fallback();
+    return r;
+}
+
+static long long hw_sub(long long a, long long b) {
+    long long r;
+    if (__builtin_sub_overflow(a, b, &r)) hw_fallback();
+    return r;
+}
+
+static long long hw_mul(long long a, long long b) {
+    long long r;
+    if (__builtin_mul_overflow(a, b, &r)) hw_fallback();
+    return r;
+}
+
+static long long hw_div(long long a, long long b) {
+    long long q;
+    if (b == 0 || (b == -1 && a == (-0x7fffffffffffffffLL - 1))) hw_fallback();
+    q = a / b;
+    if (a %% b != 0 && ((a < 0) != (b < 0))) q--;
+    return q;
+}
+
+static long long hw_mod(long long a, long long b) {
+    long long r;
+    if (b == 0) hw_fallback();
+    if (b == -1) return 0;
+    r = a %% b;
+    if (r != 0 && ((r < 0) != (b < 0))) r += b;
+    return r;
+}
+
+static long long hw_shl(long long a, long long b) {
+    long long r;
+    if (b < 0) hw_fallback();
+    if (a == 0) return 0;
+    if (b >= 63) hw_fallback();
+    r = (long long)((unsigned long long)a << b);
+    if ((r >> b) != a) hw_fallback();
+    return r;
+}
+
+static long long hw_shr(long long a, long long b) {
+    if (b < 0) hw_fallback();
+    if (b >= 63) return a < 0 ? -1 : 0;
+    return a >> b;
+}
+
+""" % FALLBACK_STATUS
+
+
+def calls(node):
+    return any(isinstance(child, IDPareExpr) for child in walk(node))
+
+
+def cString(value):
+    res = '"'
+    for char in value:
+        if char in '\\"':
+            res += '\\' + char
+        elif ' ' <= char <= '~':
+            res += char
+        else:
+            res += '\\%03o' % ord(char)
+    return res + '"'
+
+
+class CVariable(VariableSymbol):
+
+    def __init__(self, name, type, cname):
+        VariableSymbol.__init__(self, name, type)
+        self.cname = cname
+
+
+# Translates a type checked Program that uses only int and string values to
+# C. Every declaration gets a C name of its own, as in the Transpiler; top
+# level variables are file scope statics so functions can reach them, and
+# the top level instructions form main. Comparison results are kept apart
+# as 'bool' values: python prints them as True/False, so they may be
+# printed, tested and used as arithmetic operands but not stored, passed or
+# returned. Anything else raises UnsupportedProgram: floats (kept as source
+# text by the Interpreter), string operators, ints outside 64 bits.
+class CGenerator(NodeVisitor):
+
+    def __init__(self):
+        self.root = SymbolTable(None, "root")
+        self.table = self.root
+        self.globals = []
+        self.prototypes = []
+        self.functions = []
+        self.lines = []
+        self.depth = 1
+        self.count = 0
+        self.function = None            # FunDef generated, None for main
+
+    def generate(self, program):
+        self.visit(program)
+        main = self.lines
+        res = PRELUDE
+        res += "".join(line + "\n" for line in self.globals + self.prototypes)
+        res += "".join(self.functions)
+        res += "int main(void) {\n" + "".join(line + "\n" for line in main) + "    return 0;\n}\n"
+        return res
+
+    def unsupported(self, what, line):
+        raise UnsupportedProgram("{}: line {}".format(what, line))
+
+    def emit(self, line):
+        self.lines.append("    " * self.depth + line)
+
+    def cType(self, type, line):
+        if type not in C_TYPES:
+            self.unsupported("{} values".format(type), line)
+        return C_TYPES[type]
+
+    def declare(self, name, type, line):
+        if self.table.get(name) is not None:
+            raise CompileError("Variable '{}' already declared: line {}".format(name, line))
+        self.count += 1
+        symbol = CVariable(name, type, "v{}_{}".format(self.count, re.sub(r'\W', '_', name)))
+        self.table.put(name, symbol)
+        return symbol
+
+    def lookup(self, name, line):
+        symbol = self.table.getAny(name)
+        if not isinstance(symbol, CVariable):
+            raise CompileError("Usage of undeclared variable '{}': line {}".format(name, line))
+        return symbol
+
+    # C source of <node> as a value of <type>
+    def value(self, node, type, line, what):
+        code, kind = self.visit(node)
+        if kind != type:
+            self.unsupported("{} of a {} as {}".format(what, kind, type), line)
+        return code
+
+    # <combine>d C sources of <operands>, (node, code, kind) triples. C
+    # evaluates the arguments of a call and the operands of an operator in
+    # no set order, while the Interpreter goes left to right: when one after
+    # the first makes a call, which may print or assign what the others
+    # read, they are all evaluated in order into temporaries of a statement
+    # expression first.
+    def ordered(self, operands, combine):
+        if not any(calls(node) for node, _, _ in operands[1:]):
+            return combine([code for _, code, _ in operands])
+        declarations, temps = "", []
+        for _, code, kind in operands:
+            self.count += 1
+            temps.append("t{}".format(self.count))
+            declarations += "{} {} = {}; ".format(TEMP_TYPES[kind], temps[-1], code)
+        return "({{ {}{}; }})".format(declarations, combine(temps))
+
+    def condition(self, node, line):
+        code, kind = self.visit(node)
+        if kind == 'string':
+            self.unsupported("string condition", line)
+        return code
+
+    def statement(self, node):
+        if isinstance(node, (Const, Variable, IDPareExpr, PareExpr, BinExpr)):
+            self.emit("(void)({});".format(self.visit(node)[0]))
+        else:
+            self.visit(node)
+
+    def block(self, instr):
+        self.depth += 1
+        self.statement(instr)
+        self.depth -= 1
+
+    # instructions
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.visit(node.dec)
+        self.visit(node.func)
+        if node.inst is not None:
+            self.statement(node.inst)
+
+    def visit_Declaration(self, node):
+        for init in node.inits.list:
+            ctype = self.cType(node.type, init.line)
+            expr = self.value(init.expr, node.type, init.line, "initialization")
+            symbol = self.declare(init.ID, node.type, init.line)
+            if self.table is self.root:
+                self.globals.append("static {} {};".format(ctype, symbol.cname))
+                self.emit("{} = {};".format(symbol.cname, expr))
+            else:
+                self.emit("{} {} = {};".format(ctype, symbol.cname, expr))
+
+    def visit_PrintInstr(self, node):
+        for expr in node.expr_list.list:
+            code, kind = self.visit(expr)
+            if kind == 'int':
+                self.emit('printf("%lld\\n", {});'.format(code))
+            elif kind == 'bool':
+                self.emit('puts(({}) ? "True" : "False");'.format(code))
+            else:
+                self.emit('puts({});'.format(code))
+
+    def visit_LabeledInstr(self, node):
+        # the interpreters do not run labeled instructions
+        pass
+
+    def visit_Assignment(self, node):
+        symbol = self.lookup(node.ID, node.line)
+        expr = self.value(node.expression, symbol.type, node.line, "assignment")
+        self.emit("{} = {};".format(symbol.cname, expr))
+
+    def visit_ChoiceInstr(self, node):
+        self.emit("if ({}) {{".format(self.condition(node.cond, getattr(node.cond, 'line', None))))
+        self.block(node.instr_1)
+        if node.instr_2 is not None:
+            self.emit("} else {")
+            self.block(node.instr_2)
+        self.emit("}")
+
+    def visit_WhileInstr(self, node):
+        self.emit("while ({}) {{".format(self.condition(node.cond, getattr(node.cond, 'line', None))))
+        self.block(node.instr)
+        self.emit("}")
+
+    def visit_RepeatInstr(self, node):
+        self.emit("do {")
+        self.block(node.instructions)
+        self.emit("}} while (!({}));".format(self.condition(node.cond, getattr(node.cond, 'line', None))))
+
+    def visit_ReturnInstr(self, node):
+        if self.function is None:
+            raise CompileError("return instruction outside a function: line {}".format(node.line))
+        self.emit("return {};".format(self.value(node.expr, self.function.type, node.line, "return")))
+
+    def visit_ContinueInstr(self, node):
+        self.emit("continue;")
+
+    def visit_BreakInstr(self, node):
+        self.emit("break;")
+
+    def visit_Instructions(self, node):
+        for instr in node.list:
+            self.statement(instr)
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        self.emit("{")
+        self.depth += 1
+        self.visit(node.declarations)
+        self.visit(node.instructions_opt)
+        self.depth -= 1
+        self.emit("}")
+        self.table = self.table.getParentScope()
+
+    def visit_FunDef(self, node):
+        ctype = self.cType(node.type, node.line)
+        self.root.put(node.ID, FunctionSymbol(node.ID, node.type, None))
+        outer = self.table, self.lines, self.depth
+        self.table = SymbolTable(self.root, "function")
+        self.function = node
+        params = []
+        for arg in node.args_list.list if node.args_list is not None else []:
+            params.append("{} {}".format(self.cType(arg.type, node.line), self.declare(arg.ID, arg.type, node.line).cname))
+            self.root.get(node.ID).parameters.append(arg.type)
+        header = "static {} f_{}({})".format(ctype, node.ID, ", ".join(params) or "void")
+        self.lines, self.depth = [], 1
+        self.visit(node.compound_instr)
+        # the Interpreter returns None when the body ends without a return
+        self.emit("hw_fallback();")
+        body = self.lines
+        self.table, self.lines, self.depth = outer
+        self.function = None
+
+        self.prototypes.append(header + ";")
+        self.functions.append("\n" + header + " {\n" + "".join(line + "\n" for line in body) + "}\n\n")
+
+    # expressions give their C source and kind: 'int', 'bool' or 'string'
+
+    def visit_Const(self, node):
+        const = node.const
+        if isinstance(const, Integer):
+            value = int(const.const)
+            if not INT_MIN <= value <= INT_MAX:
+                self.unsupported("int constant outside 64 bits", const.line)
+            return "{}LL".format(value), 'int'
+        if isinstance(const, String):
+            return cString(const.const), 'string'
+        self.unsupported("float values", const.line)
+
+    def visit_Variable(self, node):
+        symbol = self.lookup(node.name, node.line)
+        return symbol.cname, symbol.type
+
+    def visit_IDPareExpr(self, node):
+        function = self.root.get(node.ID)
+        if not isinstance(function, FunctionSymbol):
+            self.unsupported("call of '{}' before its definition".format(node.ID), node.line)
+        exprs = [] if node.expr_list is None else node.expr_list.list
+        if len(exprs) != len(function.parameters):
+            self.unsupported("call of '{}' with {} arguments".format(node.ID, len(exprs)), node.line)
+        args = [(expr, self.value(expr, type, node.line, "argument"), type)
+                for expr, type in zip(exprs, function.parameters)]
+        return self.ordered(args, lambda codes: "f_{}({})".format(node.ID, ", ".join(codes))), function.type
+
+    def visit_PareExpr(self, node):
+        return self.visit(node.expr)
+
+    def visit_BinExpr(self, node):
+        left, left_kind = self.visit(node.left)
+        right, right_kind = self.visit(node.right)
+        op = node.op
+        if 'string' in (left_kind, right_kind):
+            self.unsupported("string operator {}".format(op), node.line)
+        operands = [(node.left, left, left_kind), (node.right, right, right_kind)]
+        if op in COMPARISON_OPS:
+            return self.ordered(operands, lambda codes: "({} {} {})".format(codes[0], op, codes[1])), 'bool'
+        if op in BITWISE_OPS:
+            kind = 'bool' if left_kind == right_kind == 'bool' else 'int'
+            return self.ordered(operands, lambda codes: "({} {} {})".format(codes[0], BITWISE_OPS[op], codes[1])), kind
+        if op in CHECKED_OPS:
+            return self.ordered(operands, lambda codes: "{}({}, {})".format(CHECKED_OPS[op], *codes)), 'int'
+        self.unsupported("operator {}".format(op), node.line)
+
+
+# Builds C programs with the system cc and keeps the binaries in
+# <directory>, named after the hash of the C source and the compiler.
+class CBackend(object):
+
+    def __init__(self, directory, cc=None):
+        self.directory = directory
+        self.cc = cc or os.environ.get('CC', 'cc')
+
+    def key(self, source):
+        return hashlib.sha1("\0".join([self.cc] + CC_FLAGS + [source])).hexdigest()
+
+    # path of the binary built from C <source>, compiled unless cached
+    def build(self, source):
+        path = os.path.join(self.directory, self.key(source))
+        if os.path.exists(path):
+            return path
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        fd, c_file = tempfile.mkstemp(dir=self.directory, suffix='.c')
+        tmp = c_file[:-2] + '.tmp'
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(source)
+            try:
+                process = subprocess.Popen([self.cc] + CC_FLAGS + ['-o', tmp, c_file],
+                                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            except OSError as e:
+                raise UnsupportedProgram("cannot run {}: {}".format(self.cc, e))
+            output = process.communicate()[0]
+            if process.returncode != 0:
+                raise UnsupportedProgram("{} failed:\n{}".format(self.cc, output))
+            os.rename(tmp, path)
+        finally:
+            for name in (c_file, tmp):
+                if os.path.exists(name):
+                    os.remove(name)
+        return path
+
+    # runs binary <path>; returns its output, or None when it stopped with
+    # FALLBACK_STATUS or failed otherwise
+    def run(self, path):
+        process = subprocess.Popen([path], stdout=subprocess.PIPE)
+        output = process.communicate()[0]
+        return output if process.returncode == 0 else None
+
+
+# compiles and runs <program>; False when it has to run on an interpreter,
+# with the reason written to <explain>
+def runCompiled(program, directory, explain=sys.stderr):
+    try:
+        backend = CBackend(directory)
+        output = backend.run(backend.build(CGenerator().generate(program)))
+    except CompileError as e:
+        explain.write("c backend: {}\n".format(e))
+        return False
+    if output is None:
+        explain.write("c backend: the program needs python ints or raised an error\n")
+        return False
+    sys.stdout.write(output)
+    return True
@@ -0,0 +1,460 @@
+import AST
+from Memory import *
+from Exceptions import *
+from Interpreter import ops
+from Resolver import Resolver, GLOBAL
+from visit import *
+
+
+# Walks the tree once and turns every node into a pre-bound python closure.
+# Operators, constants and child closures are resolved at compile time, so
+# running the program does not go through accept()/visit dispatch at all.
+# Runtime memory is the same MemoryStack pair the Interpreter uses, which
+# keeps the output identical to the visitor engine.
+#
+# Specialized, the program is first given Resolver slots and variables live
+# in two lists like in the ResolvedInterpreter: the global frame and the one
+# of the running function. An int op int BinExpr then compiles to a single
+# closure that reads its constant and variable operands itself, instead of
+# one closure per operand. Programs the Resolver rejects (reads of
+# undeclared names, which the Interpreter evaluates to None) keep the
+# MemoryStack.
+
+
+def nop():
+    pass
+
+
+INT_OPS = ['+', '-', '*', '/', '%', '|', '&', '^', '<<', '>>', '==', '!=', '>', '<', '<=', '>=']
+
+
+# closure makers for BinExpr nodes the TypeChecker typed int op int, by how
+# their operands are read: a 'const' value, a 'global' or 'local' slot or a
+# 'closure'. They take the operator function, the global frame, the frames
+# list whose [1] is the frame of the running function, and both operands.
+int_handlers = {
+    ('closure', 'closure'): lambda fn, g, f, l, r: lambda: fn(l(), r()),
+    ('closure', 'const'): lambda fn, g, f, l, r: lambda: fn(l(), r),
+    ('closure', 'global'): lambda fn, g, f, l, r: lambda: fn(l(), g[r]),
+    ('closure', 'local'): lambda fn, g, f, l, r: lambda: fn(l(), f[1][r]),
+    ('const', 'closure'): lambda fn, g, f, l, r: lambda: fn(l, r()),
+    ('const', 'const'): lambda fn, g, f, l, r: lambda: fn(l, r),
+    ('const', 'global'): lambda fn, g, f, l, r: lambda: fn(l, g[r]),
+    ('const', 'local'): lambda fn, g, f, l, r: lambda: fn(l, f[1][r]),
+    ('global', 'closure'): lambda fn, g, f, l, r: lambda: fn(g[l], r()),
+    ('global', 'const'): lambda fn, g, f, l, r: lambda: fn(g[l], r),
+    ('global', 'global'): lambda fn, g, f, l, r: lambda: fn(g[l], g[r]),
+    ('global', 'local'): lambda fn, g, f, l, r: lambda: fn(g[l], f[1][r]),
+    ('local', 'closure'): lambda fn, g, f, l, r: lambda: fn(f[1][l], r()),
+    ('local', 'const'): lambda fn, g, f, l, r: lambda: fn(f[1][l], r),
+    ('local', 'global'): lambda fn, g, f, l, r: lambda: fn(f[1][l], g[r]),
+    ('local', 'local'): lambda fn, g, f, l, r: lambda: fn(f[1][l], f[1][r]),
+}
+
+
+# static type of an expression: set by the TypeChecker, or told by the
+# literal for constants the optimization passes made
+def exprType(node):
+    if isinstance(node, AST.Const) and isinstance(node.const, AST.Integer):
+        return 'int'
+    return getattr(node, 'type', None)
+
+
+def intConstant(node):
+    while isinstance(node, AST.PareExpr):
+        node = node.expr
+    if isinstance(node, AST.Const) and isinstance(node.const, AST.Integer):
+        return int(node.const.const)
+    return None
+
+
+def sequence(funcs):
+    if len(funcs) == 0:
+        return nop
+    if len(funcs) == 1:
+        return funcs[0]
+
+    def run():
+        for f in funcs:
+            f()
+    return run
+
+
+class Function(object):
+
+    def __init__(self, name, params, body):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.slots = None               # Resolver slots of the params, when specialized
+        self.frame_size = 0
+
+
+class ClosureCompiler(object):
+
+    # <specialize> keeps variables in Resolver slots and compiles int op int
+    # expressions with int_handlers
+    def __init__(self, specialize=True):
+        self.specialize = specialize
+        self.fun_stack = MemoryStack()
+        self.fun_stack.pop()
+        self.global_stack = MemoryStack()
+        self.frames = None              # [global frame, function frame] once resolved
+        self.functions = {}
+        # function bodies are the only code that runs with a non empty
+        # fun_stack, so the Interpreter's isEmpty() checks are decided here
+        self.in_function = False
+
+    def stack(self):
+        return self.fun_stack if self.in_function else self.global_stack
+
+    @on('node')
+    def visit(self, node):
+        pass
+
+    @when(AST.Program)
+    def visit(self, node):
+        if node.elements is None:
+            return nop
+        if self.specialize:
+            try:
+                Resolver().visit(node)
+                self.frames = [[None] * node.frame_size, None]
+            except CompileError:
+                pass
+        return node.elements.accept(self)
+
+    @when(AST.Elements)
+    def visit(self, node):
+        return sequence([elem.accept(self) for elem in node.list])
+
+    @when(AST.Element)
+    def visit(self, node):
+        parts = [part.accept(self) for part in (node.dec, node.func, node.inst) if part is not None]
+        return sequence(parts)
+
+    @when(AST.Declarations)
+    def visit(self, node):
+        return sequence([decl.accept(self) for decl in node.list if decl is not None])
+
+    @when(AST.Declaration)
+    def visit(self, node):
+        return node.inits.accept(self)
+
+    @when(AST.Inits)
+    def visit(self, node):
+        return sequence([init.accept(self) for init in node.list])
+
+    @when(AST.Init)
+    def visit(self, node):
+        name = node.ID
+        expr = node.expr.accept(self)
+        if self.frames is not None:
+            return self.store(node, expr)
+        stack = self.stack()
+
+        def init():
+            stack.insert(name, expr())
+        return init
+
+    @when(AST.Instructions)
+    def visit(self, node):
+        return sequence([inst.accept(self) for inst in node.list])
+
+    @when(AST.PrintInstr)
+    def visit(self, node):
+        exprs = [expr.accept(self) for expr in node.expr_list.list]
+
+        def print_instr():
+            for expr in exprs:
+                print expr()
+        return print_instr
+
+    @when(AST.LabeledInstr)
+    def visit(self, node):
+        # the Interpreter does not execute labeled instructions either
+        return nop
+
+    # closure setting the slot of <node> to the value of <expr>
+    def store(self, node, expr):
+        slot = node.slot
+        if node.depth == GLOBAL:
+            frame = self.frames[0]
+
+            def store_global():
+                frame[slot] = expr()
+            return store_global
+
+        frames = self.frames
+
+        def store_local():
+            frames[1][slot] = expr()
+        return store_local
+
+    @when(AST.Assignment)
+    def visit(self, node):
+        name = node.ID
+        expr = node.expression.accept(self)
+        if self.frames is not None:
+            return self.store(node, expr)
+        fun_stack = self.fun_stack
+        global_stack = self.global_stack
+
+        if not self.in_function:
+            def assignment():
+                global_stack.set(name, expr())
+            return assignment
+
+        def assignment():
+            value = expr()
+            if fun_stack.getFromF(name) is None:
+                global_stack.set(name, value)
+            else:
+                fun_stack.set(name, value)
+        return assignment
+
+    @when(AST.ChoiceInstr)
+    def visit(self, node):
+        cond = node.cond.accept(self)
+        instr_1 = node.instr_1.accept(self)
+        if node.instr_2 is None:
+            def choice():
+                if cond():
+                    instr_1()
+            return choice
+
+        instr_2 = node.instr_2.accept(self)
+
+        def choice():
+            if cond():
+                instr_1()
+            else:
+                instr_2()
+        return choice
+
+    @when(AST.WhileInstr)
+    def visit(self, node):
+        cond = node.cond.accept(self)
+        instr = node.instr.accept(self)
+
+        def while_instr():
+            while cond():
+                try:
+                    instr()
+                except BreakException:
+                    break
+                except ContinueException:
+                    pass
+        return while_instr
+
+    @when(AST.RepeatInstr)
+    def visit(self, node):
+        instructions = node.instructions.accept(self)
+        cond = node.cond.accept(self)
+
+        def repeat_instr():
+            while True:
+                try:
+                    instructions()
+                except BreakException:
+                    break
+                except ContinueException:
+                    pass
+                if cond():
+                    break
+        return repeat_instr
+
+    @when(AST.ReturnInstr)
+    def visit(self, node):
+        if node.tail is not None:
+            args = self.arguments(node.tail)
+
+            def tail_call():
+                raise TailCallException([arg() for arg in args])
+            return tail_call
+
+        expr = node.expr.accept(self)
+
+        def return_instr():
+            raise ReturnValueException(expr())
+        return return_instr
+
+    @when(AST.ContinueInstr)
+    def visit(self, node):
+        def continue_instr():
+            raise ContinueException()
+        return continue_instr
+
+    @when(AST.BreakInstr)
+    def visit(self, node):
+        def break_instr():
+            raise BreakException()
+        return break_instr
+
+    @when(AST.CompoundInstr)
+    def visit(self, node):
+        stack = self.stack()
+        parts = []
+        if node.declarations is not None:
+            parts.append(node.declarations.accept(self))
+        parts.append(node.instructions_opt.accept(self))
+        body = sequence(parts)
+        if self.frames is not None:
+            # blocks have their slots in the frame of the function
+            return body
+
+        def compound():
+            stack.push(Memory('compound'))
+            try:
+                body()
+            finally:
+                stack.pop()
+        return compound
+
+    @when(AST.Const)
+    def visit(self, node):
+        return node.const.accept(self)
+
+    @when(AST.Integer)
+    def visit(self, node):
+        value = int(node.const)
+        return lambda: value
+
+    @when(AST.Float)
+    def visit(self, node):
+        value = node.const
+        return lambda: value
+
+    @when(AST.String)
+    def visit(self, node):
+        value = node.const
+        return lambda: value
+
+    @when(AST.Variable)
+    def visit(self, node):
+        if self.frames is not None:
+            slot = node.slot
+            if node.depth == GLOBAL:
+                frame = self.frames[0]
+                return lambda: frame[slot]
+            frames = self.frames
+            return lambda: frames[1][slot]
+        name = node.name
+        fun_stack = self.fun_stack
+        global_stack = self.global_stack
+
+        if not self.in_function:
+            return lambda: global_stack.get(name)
+
+        def variable():
+            v = fun_stack.getFromF(name)
+            if v is None:
+                return global_stack.get(name)
+            return v
+        return variable
+
+    def arguments(self, node):
+        return [] if node.expr_list is None else [expr.accept(self) for expr in node.expr_list.list]
+
+    @when(AST.IDPareExpr)
+    def visit(self, node):
+        name = node.ID
+        args = self.arguments(node)
+        functions = self.functions
+        if self.frames is not None:
+            return self.slotCall(name, args)
+        fun_stack = self.fun_stack
+
+        def call():
+            function = functions[name]
+            values = [arg() for _, arg in zip(function.params, args)]
+            while True:
+                fun_mem = Memory(name, True)
+                for param, value in zip(function.params, values):
+                    fun_mem.put(param, value)
+                fun_stack.push(fun_mem)
+                try:
+                    function.body()
+                except ReturnValueException as e:
+                    fun_stack.pop()
+                    return e.value
+                except TailCallException as e:
+                    fun_stack.pop()
+                    values = e.arguments
+                    continue
+                fun_stack.pop()
+                return None
+        return call
+
+    def slotCall(self, name, args):
+        functions = self.functions
+        frames = self.frames
+
+        def call():
+            function = functions[name]
+            values = [arg() for _, arg in zip(function.params, args)]
+            caller = frames[1]
+            try:
+                while True:
+                    frame = [None] * function.frame_size
+                    for slot, value in zip(function.slots, values):
+                        frame[slot] = value
+                    frames[1] = frame
+                    try:
+                        function.body()
+                    except ReturnValueException as e:
+                        return e.value
+                    except TailCallException as e:
+                        values = e.arguments
+                        continue
+                    return None
+            finally:
+                frames[1] = caller
+        return call
+
+    @when(AST.PareExpr)
+    def visit(self, node):
+        return node.expr.accept(self)
+
+    @when(AST.BinExpr)
+    def visit(self, node):
+        op = ops[node.op]
+        if self.specialize and node.op in INT_OPS \
+                and exprType(node.left) == 'int' and exprType(node.right) == 'int':
+            (left_kind, left), (right_kind, right) = self.operand(node.left), self.operand(node.right)
+            frames = self.frames or [None, None]
+            return int_handlers[left_kind, right_kind](op, frames[0], frames, left, right)
+        left = node.left.accept(self)
+        right = node.right.accept(self)
+        return lambda: op(left(), right())
+
+    # how an int_handlers closure reads the operand <node>
+    def operand(self, node):
+        value = intConstant(node)
+        if value is not None:
+            return 'const', value
+        while isinstance(node, AST.PareExpr):
+            node = node.expr
+        if isinstance(node, AST.Variable) and self.frames is not None:
+            return ('global' if node.depth == GLOBAL else 'local'), node.slot
+        return 'closure', node.accept(self)
+
+    @when(AST.FunDefs)
+    def visit(self, node):
+        return sequence([fun_def.accept(self) for fun_def in node.list])
+
+    @when(AST.FunDef)
+    def visit(self, node):
+        params = [] if node.args_list is None else [arg.ID for arg in node.args_list.list]
+        self.in_function = True
+        body = node.compound_instr.accept(self)
+        self.in_function = False
+        function = Function(node.ID, params, body)
+        if self.frames is not None:
+            function.slots = [] if node.args_list is None else [arg.slot for arg in node.args_list.list]
+            function.frame_size = node.frame_size
+        functions = self.functions
+
+        def fun_def():
+            functions[function.name] = function
+        return fun_def
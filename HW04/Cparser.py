@@ -8,9 +8,9 @@ import AST
 class Cparser(object):
 
 
-    def __init__(self):
-        self.scanner = Scanner()
-        self.scanner.build()
+    def __init__(self, tables=None, scanner=None):
+        self.scanner = Scanner() if scanner is None else scanner
+        self.scanner.build(tables)
 
     tokens = Scanner.tokens
 
@@ -0,0 +1,228 @@
+#!/usr/bin/python
+from collections import defaultdict
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor
+from Memoization import PurityChecker
+from Simplifier import runtimeInt, uncertainInts
+
+
+EXPRESSIONS = (Const, Variable, PareExpr, BinExpr, IDPareExpr)
+
+# instructions after which the rest of an instruction list never runs
+TERMINATORS = (ReturnInstr, BreakInstr, ContinueInstr)
+
+
+def empty(node):
+    return isinstance(node, CompoundInstr) and not node.instructions_opt.list \
+        and (node.declarations is None or not node.declarations.list)
+
+
+# names read in <node>; x only counts as read in x = x + 1 when it is also
+# read somewhere else, since such an assignment just keeps a dead value alive.
+# That only holds when the whole assignment can go: one whose expression is
+# not <removable> is kept as the expression alone, which still reads x.
+def reads(node, removable):
+    found = defaultdict(int)
+    own = defaultdict(int)
+    for child in walk(node):
+        if isinstance(child, Variable):
+            found[child.name] += 1
+        elif isinstance(child, Assignment) and removable(child.expression):
+            for variable in walk(child.expression):
+                if isinstance(variable, Variable) and variable.name == child.ID:
+                    own[child.ID] += 1
+    return set(name for name, count in found.items() if count > own[name])
+
+
+# Liveness based dead code elimination, repeated until nothing changes:
+#   - instructions after return, break or continue in an instruction list
+#   - declarations of variables that are never read, and assignments to them
+#   - expressions used as instructions, empty blocks and ifs with empty branches
+# Side effects are kept: an initializer or an assigned expression that
+# prints, calls a function that is not pure or may raise keeps its
+# declaration, and an assignment of one becomes the expression alone. An
+# expression may raise when it reads a variable the TypeChecker did not
+# resolve, applies an operator to values not known to be ints at run time
+# (see Simplifier.uncertainInts), divides by a non constant or shifts by a
+# non constant count.
+# Local variables of a function are only visible in its body; variables of
+# the top level, whose blocks callees see with the dynamic scoping of the
+# Interpreter, are live when read anywhere in the program.
+class DeadCodeEliminator(NodeVisitor):
+
+    def __init__(self, explain=None):
+        self.explain = explain          # file to report removals to, or None
+        self.root = SymbolTable(None, "root")
+        self.table = self.root
+        self.pure = set()
+        self.uncertain = set()
+        self.global_reads = set()
+        self.local_reads = None         # names read in the function visited
+        self.removed = 0
+
+    def report(self, message):
+        if self.explain is not None:
+            self.explain.write(message + "\n")
+
+    def eliminate(self, program):
+        while True:
+            removed = self.removed
+            self.pure = PurityChecker().pureFunctions(program)
+            self.uncertain = uncertainInts(program)
+            self.global_reads = reads(program, self.removable)
+            self.visit(program)
+            if self.removed == removed:
+                break
+        self.report("{0} nodes removed".format(self.removed))
+        return program
+
+    def remove(self, node, message, line):
+        self.removed += size(node)
+        self.report("line {0}: {1}".format(line, message))
+
+    # names read where the variable <name> visible here is declared
+    def readsOf(self, name):
+        if self.local_reads is None:
+            return self.global_reads
+        table = self.table
+        while table is not self.root and table.get(name) is None:
+            table = table.getParentScope()
+        return self.global_reads if table is self.root else self.local_reads
+
+    # whether <node> can be dropped without losing output or an error
+    def removable(self, node):
+        for child in walk(node):
+            if isinstance(child, IDPareExpr) and child.ID not in self.pure:
+                return False
+            if isinstance(child, Variable) and getattr(child, 'type', None) is None:
+                return False
+            if isinstance(child, BinExpr) and not runtimeInt(child, self.uncertain):
+                return False
+            if isinstance(child, BinExpr) and child.op in ('/', '%', '<<', '>>'):
+                right = child.right
+                if not isinstance(right, Const) or not isinstance(right.const, Integer):
+                    return False
+                count = int(right.const.const)
+                if child.op in ('/', '%') and count == 0 or child.op in ('<<', '>>') and count < 0:
+                    return False
+        return True
+
+    def declarations(self, node):
+        if node is None:
+            return
+        kept = []
+        for declaration in node.list:
+            inits = []
+            for init in declaration.inits.list:
+                self.table.put(init.ID, VariableSymbol(init.ID, declaration.type))
+                if init.ID in self.readsOf(init.ID) or not self.removable(init.expr):
+                    inits.append(init)
+                elif len(declaration.inits.list) > 1:
+                    self.remove(init, "unused variable " + init.ID, init.line)
+            if inits:
+                declaration.inits.list = inits
+                kept.append(declaration)
+            else:
+                self.remove(declaration, "unused variable " + declaration.inits.list[0].ID,
+                            declaration.inits.list[0].line)
+        node.list = kept
+
+    # the instruction replacing <node>, or None when it is removed
+    def statement(self, node):
+        if isinstance(node, EXPRESSIONS):
+            if self.removable(node):
+                self.remove(node, "expression without effect", getattr(node, 'line', 0))
+                return None
+            return node
+        if isinstance(node, Assignment) and node.ID not in self.readsOf(node.ID):
+            if self.removable(node.expression):
+                self.remove(node, "assignment to unused variable " + node.ID, node.line)
+                return None
+            self.removed += 1
+            self.report("line {0}: assignment to unused variable {1}, kept its expression".format(node.line, node.ID))
+            return node.expression
+        self.visit(node)
+        if isinstance(node, ChoiceInstr) and empty(node.instr_1) \
+                and (node.instr_2 is None or empty(node.instr_2)) and self.removable(node.cond):
+            self.remove(node, "if without effect", getattr(node.cond, 'line', 0))
+            return None
+        if empty(node):
+            self.removed += size(node)
+            return None
+        return node
+
+    def instructions(self, node):
+        kept = []
+        for index, instruction in enumerate(node.list):
+            instruction = self.statement(instruction)
+            if instruction is not None:
+                kept.append(instruction)
+            if isinstance(instruction, TERMINATORS):
+                for unreachable in node.list[index + 1:]:
+                    self.remove(unreachable, "unreachable", instruction.line)
+                break
+        node.list = kept
+
+    # where the grammar needs an instruction, a removed one becomes {}
+    def instruction(self, node):
+        if empty(node):
+            return node
+        instruction = self.statement(node)
+        return CompoundInstr(None, Instructions()) if instruction is None else instruction
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.declarations(node.dec)
+        self.visit(node.func)
+        if node.inst is not None:
+            self.instructions(node.inst)
+
+    def visit_FunDef(self, node):
+        self.table = SymbolTable(self.table, "function")
+        if node.args_list is not None:
+            for arg in node.args_list.list:
+                self.table.put(arg.ID, VariableSymbol(arg.ID, arg.type))
+        self.local_reads = reads(node.compound_instr, self.removable)
+        self.visit(node.compound_instr)
+        self.local_reads = None
+        self.table = self.table.getParentScope()
+
+    def visit_LabeledInstr(self, node):
+        # the interpreters do not run labeled instructions
+        pass
+
+    def visit_ChoiceInstr(self, node):
+        node.instr_1 = self.instruction(node.instr_1)
+        if node.instr_2 is not None:
+            node.instr_2 = self.statement(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        node.instr = self.instruction(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        self.instructions(node.instructions)
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        self.declarations(node.declarations)
+        self.instructions(node.instructions_opt)
+        self.table = self.table.getParentScope()
+
+    def visit_PrintInstr(self, node):
+        pass
+
+    def visit_Assignment(self, node):
+        pass
+
+    def visit_ReturnInstr(self, node):
+        pass
+
+    def visit_ContinueInstr(self, node):
+        pass
+
+    def visit_BreakInstr(self, node):
+        pass
@@ -5,6 +5,13 @@ class ReturnValueException(Exception):
         self.value = value
 
 
+# a self-recursive tail call, with the arguments of the next run of the body
+class TailCallException(Exception):
+
+    def __init__(self, arguments):
+        self.arguments = arguments
+
+
 class BreakException(Exception):
     pass
 
@@ -12,3 +19,20 @@ class BreakException(Exception):
 class ContinueException(Exception):
     pass
 
+
+class CompileError(Exception):
+    pass
+
+
+# the program uses something a backend cannot translate
+class UnsupportedProgram(CompileError):
+    pass
+
+
+class StackOverflowError(Exception):
+    pass
+
+
+# the program ran out of a Budget.Budget: fuel, time or memory
+class BudgetExceeded(Exception):
+    pass
@@ -0,0 +1,116 @@
+import re
+from functools import partial
+
+from scanner import Scanner
+
+
+class Token(object):
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'column', 'lexer')
+
+    def __init__(self, type, value, lineno, lexpos, column):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+        self.column = column
+
+    def __str__(self):
+        return "LexToken(%s,%r,%d,%d)" % (self.type, self.value, self.lineno, self.lexpos)
+
+    def __repr__(self):
+        return str(self)
+
+
+# One alternative per Scanner rule, in the order ply tries them: ignored
+# characters, function rules in definition order, string rules by decreasing
+# regex length, literals and finally any other character as an error.
+def masterPattern():
+    rules = [('IGNORE', '[' + ''.join(re.escape(c) for c in Scanner.t_ignore) + ']+')]
+    functions = [getattr(Scanner, name) for name in dir(Scanner) if name.startswith('t_')]
+    functions = [f for f in functions if callable(f) and f.__name__ != 't_error']
+    for f in sorted(functions, key=lambda f: f.func_code.co_firstlineno):
+        rules.append((f.__name__[2:], f.__doc__))
+    strings = [(name[2:], getattr(Scanner, name)) for name in dir(Scanner)
+               if name.startswith('t_') and isinstance(getattr(Scanner, name), str) and name != 't_ignore']
+    for name, regex in sorted(strings, key=lambda rule: -len(rule[1])):
+        rules.append((name, regex))
+    rules.append(('LITERAL', '[' + ''.join(re.escape(c) for c in Scanner.literals) + ']'))
+    rules.append(('ERROR', '.'))
+    return '|'.join('(?P<{}>{})'.format(name, regex) for name, regex in rules)
+
+
+# Drop-in replacement for Scanner that tokenizes the whole input in one pass
+# of a single compiled regex. Line numbers and the columns reported by
+# find_tok_column are computed while scanning.
+class FastScanner(object):
+
+    tokens = Scanner.tokens
+    master = re.compile(masterPattern(), re.VERBOSE)
+
+    def build(self, tables=None):
+        pass
+
+    def find_tok_column(self, token):
+        return token.column
+
+    def input(self, text):
+        tokens, errors = self.tokenize(text)
+        if errors:
+            self.token = partial(next, self.stream(tokens, errors), None)
+        else:
+            self.token = partial(next, iter(tokens), None)
+
+    def token(self):
+        return None
+
+    # prints illegal character messages when the parser reaches them, like ply
+    def stream(self, tokens, errors):
+        pos = 0
+        for at, message in errors:
+            while pos < at:
+                yield tokens[pos]
+                pos += 1
+            print(message)
+        while pos < len(tokens):
+            yield tokens[pos]
+            pos += 1
+
+    def tokenize(self, text):
+        tokens = []
+        errors = []
+        append = tokens.append
+        reserved = Scanner.reserved
+        lineno = 1
+        last_cr = 0
+
+        for m in self.master.finditer(text):
+            kind = m.lastgroup
+            if kind == 'IGNORE':
+                continue
+            value = m.group()
+            start = m.start()
+            if kind == 'ID':
+                value = intern(value)
+                append(Token(reserved.get(value, 'ID'), value, lineno, start, start - last_cr))
+            elif kind == 'LITERAL':
+                append(Token(value, value, lineno, start, start - last_cr))
+            elif kind == 'newline':
+                lineno += len(value)
+                last_cr = m.end() - 1
+            elif kind == 'newline2':
+                lineno += len(value) / 2
+                last_cr = m.end() - 1
+            elif kind == 'LINE_COMMENT':
+                pass
+            elif kind == 'BLOCK_COMMENT':
+                newlines = value.count('\n')
+                if newlines:
+                    lineno += newlines
+                    last_cr = text.rfind('\n', start, m.end())
+            elif kind == 'ERROR':
+                errors.append((len(tokens), "Illegal character '{0}' ({1}) in line {2}".format(
+                    value, hex(ord(value)), lineno)))
+            else:
+                append(Token(kind, value, lineno, start, start - last_cr))
+
+        return tokens, errors
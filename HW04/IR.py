@@ -0,0 +1,475 @@
+#!/usr/bin/python
+from collections import OrderedDict
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor
+from Exceptions import CompileError
+
+
+# An SSA form control flow graph of a program. Every Function is a list of
+# Blocks; a Block holds its phis, its instructions and a terminator (jump,
+# branch or return). Instructions are the values they define; their operands
+# are Instrs or Constants.
+#
+#   op       name            args               targets
+#   param    parameter       -                  -
+#   phi      variable        [(pred, value)]    -
+#   binop    operator        [left, right]      -
+#   load     global          -                  -
+#   store    global          [value]            -
+#   call     function        [arguments]        -
+#   print    -               [value]            -
+#   jump     -               -                  [block]
+#   branch   -               [cond]             [then, else]
+#   return   -               [value]            -
+
+VALUE_OPS = frozenset(['param', 'phi', 'binop', 'load', 'call'])
+TERMINATOR_OPS = frozenset(['jump', 'branch', 'return'])
+
+
+class Constant(object):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+UNDEFINED = Constant(None)
+
+
+class Instr(object):
+    __slots__ = ('op', 'name', 'args', 'targets', 'block', 'line', 'id')
+
+    def __init__(self, op, name=None, args=(), targets=(), line=None):
+        self.op = op
+        self.name = name
+        self.args = list(args)
+        self.targets = list(targets)
+        self.block = None
+        self.line = line
+        self.id = None              # number in the dump, set by Function.finish
+
+
+class Block(object):
+    __slots__ = ('label', 'preds', 'phis', 'instrs', 'terminator', 'sealed')
+
+    def __init__(self, label):
+        self.label = label
+        self.preds = []
+        self.phis = []
+        self.instrs = []
+        self.terminator = None
+        self.sealed = False
+
+    def successors(self):
+        return [] if self.terminator is None else self.terminator.targets
+
+
+class Function(object):
+
+    def __init__(self, name, params=None):
+        self.name = name
+        self.params = params        # None for the top level program
+        self.blocks = []
+        self.entry = self.newBlock()
+        self.size = 0               # number of values, set by finish
+
+    def isFunction(self):
+        return self.params is not None
+
+    def newBlock(self):
+        block = Block("L{0}".format(len(self.blocks)))
+        self.blocks.append(block)
+        return block
+
+    # drops unreachable blocks and trivial phis, then numbers the values
+    def finish(self):
+        reachable = set()
+        todo = [self.entry]
+        while todo:
+            block = todo.pop()
+            if block not in reachable:
+                reachable.add(block)
+                todo.extend(block.successors())
+        self.blocks = [block for block in self.blocks if block in reachable]
+        for block in self.blocks:
+            block.preds = [pred for pred in block.preds if pred in reachable]
+            for phi in block.phis:
+                phi.args = [(pred, value) for pred, value in phi.args if pred in reachable]
+
+        replaced = {}
+
+        def resolve(value):
+            while value in replaced:
+                value = replaced[value]
+            return value
+
+        changed = True
+        while changed:
+            changed = False
+            for block in self.blocks:
+                kept = []
+                for phi in block.phis:
+                    values = set(resolve(value) for _, value in phi.args) - set([phi])
+                    if len(values) > 1:
+                        kept.append(phi)
+                        continue
+                    replaced[phi] = values.pop() if values else UNDEFINED
+                    changed = True
+                block.phis = kept
+
+        number = 0
+        for block in self.blocks:
+            block.label = "entry" if block is self.entry else "L{0}".format(self.blocks.index(block))
+            for phi in block.phis:
+                phi.args = [(pred, resolve(value)) for pred, value in phi.args]
+            for instr in block.phis + block.instrs + [block.terminator]:
+                if instr.op != 'phi':
+                    instr.args = [resolve(value) for value in instr.args]
+                if instr.op in VALUE_OPS:
+                    instr.id = number
+                    number += 1
+        self.size = number
+        return self
+
+
+class Module(object):
+
+    def __init__(self):
+        self.main = None
+        self.functions = OrderedDict()
+
+
+class Local(VariableSymbol):
+
+    def __init__(self, name):
+        VariableSymbol.__init__(self, name, None)
+
+
+class Global(VariableSymbol):
+
+    def __init__(self, name):
+        VariableSymbol.__init__(self, name, None)
+
+
+# names used in function bodies, which keeps the top level variables of the
+# same name in memory instead of SSA values of the program
+def sharedNames(program):
+    names = set()
+    todo = [] if program.elements is None else [element.func for element in program.elements.list
+                                                if element.func is not None]
+    while todo:
+        node = todo.pop()
+        if isinstance(node, Variable):
+            names.add(node.name)
+        elif isinstance(node, Assignment):
+            names.add(node.ID)
+        for cls in type(node).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                value = getattr(node, name, None)
+                if isinstance(value, Node):
+                    todo.append(value)
+                elif isinstance(value, list):
+                    todo.extend(item for item in value if isinstance(item, Node))
+    return names
+
+
+# Lowers a type checked Program to a Module, building SSA form on the fly
+# after Braun et al., "Simple and Efficient Construction of Static Single
+# Assignment Form": a variable read looks for its definition in the current
+# block, then in the predecessors, placing phis at joins; blocks whose
+# predecessors are not all known yet (loop headers) get operandless phis that
+# are completed when the block is sealed.
+# Scoping is static, as in Resolver: every declaration is its own Local, and
+# top level variables used by functions stay in memory, read and written with
+# load and store. CompoundInstr leaves no trace; while, repeat and if become
+# branches, break and continue jumps.
+class IRBuilder(NodeVisitor):
+
+    def __init__(self):
+        self.module = Module()
+        self.root = SymbolTable(None, "root")
+        self.table = self.root
+        self.function = None
+        self.block = None
+        self.loops = []                 # (continue target, break target)
+        self.shared = set()
+        self.definitions = {}           # Local: {Block: value}
+        self.incomplete = {}            # Block: {Local: phi}
+
+    def build(self, program):
+        self.shared = sharedNames(program)
+        self.function = self.module.main = Function('<program>')
+        self.block = self.function.entry
+        self.seal(self.block)
+        self.visit(program)
+        self.terminate(Instr('return', args=[UNDEFINED]))
+        self.module.main.finish()
+        return self.module
+
+    def emit(self, instr):
+        instr.block = self.block
+        self.block.instrs.append(instr)
+        return instr
+
+    # ends the current block; what follows a return, break or continue goes to
+    # a block without predecessors, dropped by Function.finish
+    def terminate(self, instr):
+        if self.block.terminator is not None:
+            return
+        instr.block = self.block
+        self.block.terminator = instr
+        for target in instr.targets:
+            target.preds.append(self.block)
+
+    def jump(self, target):
+        self.terminate(Instr('jump', targets=[target]))
+
+    def unreachable(self):
+        self.block = self.function.newBlock()
+        self.seal(self.block)
+
+    # SSA construction
+
+    def write(self, variable, block, value):
+        self.definitions.setdefault(variable, {})[block] = value
+
+    def read(self, variable, block):
+        definitions = self.definitions.setdefault(variable, {})
+        if block in definitions:
+            return definitions[block]
+        if not block.sealed:
+            value = self.phi(variable, block)
+            self.incomplete.setdefault(block, {})[variable] = value
+        elif len(block.preds) == 1:
+            value = self.read(variable, block.preds[0])
+        else:
+            value = self.phi(variable, block)
+            self.write(variable, block, value)
+            self.addOperands(variable, value)
+        self.write(variable, block, value)
+        return value
+
+    def phi(self, variable, block):
+        phi = Instr('phi', variable.name)
+        phi.block = block
+        block.phis.append(phi)
+        return phi
+
+    def addOperands(self, variable, phi):
+        for pred in phi.block.preds:
+            phi.args.append((pred, self.read(variable, pred)))
+
+    def seal(self, block):
+        for variable, phi in self.incomplete.pop(block, {}).items():
+            self.addOperands(variable, phi)
+        block.sealed = True
+
+    # scopes
+
+    def declare(self, name, line):
+        if self.table.get(name) is not None:
+            raise CompileError("Variable '{}' already declared: line {}".format(name, line))
+        if self.table is self.root and name in self.shared:
+            symbol = Global(name)
+        else:
+            symbol = Local(name)
+        self.table.put(name, symbol)
+        return symbol
+
+    def lookup(self, name, line):
+        symbol = self.table.getAny(name)
+        if not isinstance(symbol, (Local, Global)):
+            raise CompileError("Usage of undeclared variable '{}': line {}".format(name, line))
+        return symbol
+
+    def assign(self, symbol, value, line):
+        if isinstance(symbol, Global):
+            self.emit(Instr('store', symbol.name, [value], line=line))
+        else:
+            self.write(symbol, self.block, value)
+
+    # instructions
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.visit(node.dec)
+        self.visit(node.func)
+        self.visit(node.inst)
+
+    def visit_Declaration(self, node):
+        self.visit(node.inits)
+
+    def visit_Init(self, node):
+        value = self.visit(node.expr)
+        self.assign(self.declare(node.ID, node.line), value, node.line)
+
+    def visit_PrintInstr(self, node):
+        for expr in node.expr_list.list:
+            self.emit(Instr('print', args=[self.visit(expr)], line=node.line))
+
+    def visit_LabeledInstr(self, node):
+        # the interpreters do not run labeled instructions
+        pass
+
+    def visit_Assignment(self, node):
+        value = self.visit(node.expression)
+        self.assign(self.lookup(node.ID, node.line), value, node.line)
+
+    def visit_ChoiceInstr(self, node):
+        cond = self.visit(node.cond)
+        then = self.function.newBlock()
+        otherwise = self.function.newBlock() if node.instr_2 is not None else None
+        join = self.function.newBlock()
+        self.terminate(Instr('branch', args=[cond], targets=[then, otherwise or join]))
+        self.seal(then)
+        self.block = then
+        self.visit(node.instr_1)
+        self.jump(join)
+        if otherwise is not None:
+            self.seal(otherwise)
+            self.block = otherwise
+            self.visit(node.instr_2)
+            self.jump(join)
+        self.seal(join)
+        self.block = join
+
+    def visit_WhileInstr(self, node):
+        header = self.function.newBlock()
+        self.jump(header)
+        self.block = header
+        cond = self.visit(node.cond)
+        body = self.function.newBlock()
+        exit = self.function.newBlock()
+        self.terminate(Instr('branch', args=[cond], targets=[body, exit]))
+        self.seal(body)
+        self.block = body
+        self.loops.append((header, exit))
+        self.visit(node.instr)
+        self.loops.pop()
+        self.jump(header)
+        self.seal(header)
+        self.seal(exit)
+        self.block = exit
+
+    def visit_RepeatInstr(self, node):
+        body = self.function.newBlock()
+        self.jump(body)
+        self.block = body
+        test = self.function.newBlock()
+        exit = self.function.newBlock()
+        self.loops.append((test, exit))
+        self.visit(node.instructions)
+        self.loops.pop()
+        self.jump(test)
+        self.seal(test)
+        self.block = test
+        cond = self.visit(node.cond)
+        self.terminate(Instr('branch', args=[cond], targets=[exit, body]))
+        self.seal(body)
+        self.seal(exit)
+        self.block = exit
+
+    def visit_ReturnInstr(self, node):
+        if not self.function.isFunction():
+            raise CompileError("return instruction outside a function: line {}".format(node.line))
+        value = self.visit(node.expr)
+        self.terminate(Instr('return', args=[value], line=node.line))
+        self.unreachable()
+
+    def visit_ContinueInstr(self, node):
+        if not self.loops:
+            raise CompileError("continue instruction outside a loop: line {}".format(node.line))
+        self.jump(self.loops[-1][0])
+        self.unreachable()
+
+    def visit_BreakInstr(self, node):
+        if not self.loops:
+            raise CompileError("break instruction outside a loop: line {}".format(node.line))
+        self.jump(self.loops[-1][1])
+        self.unreachable()
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        self.visit(node.declarations)
+        self.visit(node.instructions_opt)
+        self.table = self.table.getParentScope()
+
+    # expressions give their value
+
+    def visit_Const(self, node):
+        if isinstance(node.const, Integer):
+            return Constant(int(node.const.const))
+        return Constant(node.const.const)
+
+    def visit_Variable(self, node):
+        symbol = self.lookup(node.name, node.line)
+        if isinstance(symbol, Global):
+            return self.emit(Instr('load', node.name, line=node.line))
+        return self.read(symbol, self.block)
+
+    def visit_IDPareExpr(self, node):
+        args = [] if node.expr_list is None else [self.visit(expr) for expr in node.expr_list.list]
+        return self.emit(Instr('call', node.ID, args, line=node.line))
+
+    def visit_PareExpr(self, node):
+        return self.visit(node.expr)
+
+    def visit_BinExpr(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        return self.emit(Instr('binop', node.op, [left, right], line=node.line))
+
+    def visit_FunDef(self, node):
+        params = [] if node.args_list is None else [arg.ID for arg in node.args_list.list]
+        outer = self.function, self.block, self.loops, self.table
+        self.function = Function(node.ID, params)
+        self.block = self.function.entry
+        self.seal(self.block)
+        self.loops = []
+        self.table = SymbolTable(self.root, "function")
+        for name in params:
+            value = self.emit(Instr('param', name, line=node.line))
+            self.write(self.declare(name, node.line), self.block, value)
+        self.visit(node.compound_instr)
+        self.terminate(Instr('return', args=[UNDEFINED]))
+        self.module.functions[node.ID] = self.function.finish()
+        self.function, self.block, self.loops, self.table = outer
+
+
+def describe(value):
+    if isinstance(value, Constant):
+        return "undef" if value.value is None else repr(value.value)
+    return "%{0}".format(value.id)
+
+
+def dumpFunction(function):
+    header = function.name if not function.isFunction() else "{}({})".format(function.name, ", ".join(function.params))
+    res = "function {}:\n".format(header)
+    for block in function.blocks:
+        preds = ", ".join(pred.label for pred in block.preds)
+        res += "{}:{}\n".format(block.label, "  ; preds " + preds if preds else "")
+        for instr in block.phis + block.instrs + [block.terminator]:
+            if instr.op == 'phi':
+                args = ", ".join("[{}: {}]".format(pred.label, describe(value)) for pred, value in instr.args)
+                text = "phi {}  ; {}".format(args, instr.name)
+            elif instr.op in ('jump', 'branch'):
+                text = " ".join([instr.op] + [describe(value) + "," for value in instr.args] +
+                                [", ".join(target.label for target in instr.targets)])
+            else:
+                operands = ", ".join(describe(value) for value in instr.args)
+                text = " ".join(part for part in [instr.op, instr.name, operands] if part)
+            if instr.id is not None:
+                text = "{} = {}".format(describe(instr), text)
+            res += "    " + text + "\n"
+    return res
+
+
+def dump(module):
+    res = dumpFunction(module.main)
+    for function in module.functions.values():
+        res += "\n" + dumpFunction(function)
+    return res
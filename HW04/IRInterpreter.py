@@ -0,0 +1,68 @@
+from Interpreter import ops
+from IR import Constant
+
+
+# Runs a Module from IR.IRBuilder directly. Every call gets a list of the
+# values of its Function, indexed by Instr.id; globals live in one dict shared
+# by all calls. Phis are evaluated when a block is entered, all of them with
+# the values of the edge taken before any is assigned.
+class IRInterpreter(object):
+
+    def __init__(self):
+        self.globals = {}
+        self.functions = {}
+        self.moves = {}                 # (pred, block): [(phi id, value)]
+
+    def run(self, module):
+        self.functions = module.functions
+        return self.execute(module.main, [])
+
+    def edge(self, pred, block):
+        key = pred, block
+        if key not in self.moves:
+            self.moves[key] = [(phi.id, value) for phi in block.phis
+                               for source, value in phi.args if source is pred]
+        return self.moves[key]
+
+    def execute(self, function, args):
+        values = [None] * function.size
+        params = iter(args)
+
+        def operand(value):
+            return value.value if isinstance(value, Constant) else values[value.id]
+
+        pred = None
+        block = function.entry
+        while True:
+            if pred is not None and block.phis:
+                moves = self.edge(pred, block)
+                incoming = [operand(value) for _, value in moves]
+                for (phi, _), value in zip(moves, incoming):
+                    values[phi] = value
+
+            for instr in block.instrs:
+                op = instr.op
+                if op == 'binop':
+                    values[instr.id] = ops[instr.name](operand(instr.args[0]), operand(instr.args[1]))
+                elif op == 'load':
+                    values[instr.id] = self.globals.get(instr.name)
+                elif op == 'store':
+                    self.globals[instr.name] = operand(instr.args[0])
+                elif op == 'call':
+                    values[instr.id] = self.execute(self.functions[instr.name],
+                                                    [operand(arg) for arg in instr.args])
+                elif op == 'print':
+                    print operand(instr.args[0])
+                elif op == 'param':
+                    values[instr.id] = next(params, None)
+                else:
+                    raise RuntimeError("unknown IR instruction {} in {}".format(op, function.name))
+
+            terminator = block.terminator
+            if terminator.op == 'jump':
+                pred, block = block, terminator.targets[0]
+            elif terminator.op == 'branch':
+                taken = terminator.targets[0] if operand(terminator.args[0]) else terminator.targets[1]
+                pred, block = block, taken
+            else:
+                return operand(terminator.args[0])
@@ -0,0 +1,400 @@
+#!/usr/bin/python
+import copy
+
+from AST import *
+from TypeChecker import NodeVisitor
+
+
+MAX_INLINE_SIZE = 40
+
+
+# break or continue that would leave the function body
+def escapes(node):
+    if isinstance(node, (BreakInstr, ContinueInstr)):
+        return True
+    if isinstance(node, (WhileInstr, RepeatInstr)):
+        return False
+    return any(escapes(child) for child in children(node))
+
+
+# the return instructions after which nothing else of the function runs, or
+# None when some path through <node> does not end in one
+def tailReturns(node):
+    if isinstance(node, ReturnInstr):
+        return [node]
+    if isinstance(node, ChoiceInstr) and node.instr_2 is not None:
+        first, second = tailReturns(node.instr_1), tailReturns(node.instr_2)
+        return None if first is None or second is None else first + second
+    if isinstance(node, CompoundInstr) and node.instructions_opt.list:
+        return tailReturns(node.instructions_opt.list[-1])
+    return None
+
+
+# replaces the tail returns of <node> with what <make> builds of their expression
+def replaceReturns(node, make):
+    if isinstance(node, ReturnInstr):
+        return make(node.expr)
+    if isinstance(node, ChoiceInstr):
+        node.instr_1 = replaceReturns(node.instr_1, make)
+        node.instr_2 = replaceReturns(node.instr_2, make)
+    else:
+        instructions = node.instructions_opt.list
+        instructions[-1] = replaceReturns(instructions[-1], make)
+    return node
+
+
+# replaces the Variables named in <values> below <node> with copies of their value
+def substitute(node, values):
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            value = getattr(node, name, None)
+            if isinstance(value, Variable) and value.name in values:
+                setattr(node, name, copy.deepcopy(values[value.name]))
+            elif isinstance(value, Node):
+                substitute(value, values)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, Variable) and item.name in values:
+                        value[i] = copy.deepcopy(values[item.name])
+                    elif isinstance(item, Node):
+                        substitute(item, values)
+
+
+# Gives the variables declared in a copy of a function body fresh names, with
+# the scoping rules of the TypeChecker, and collects the names that are not
+# declared in it (globals and called functions) and the ones assigned to.
+class Renamer(NodeVisitor):
+
+    def __init__(self, fresh):
+        self.fresh = fresh
+        self.scopes = [{}]
+        self.free = set()
+        self.assigned = set()
+
+    def declare(self, name):
+        self.scopes[-1][name] = self.fresh(name)
+        return self.scopes[-1][name]
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        self.free.add(name)
+        return name
+
+    def visit_Declaration(self, node):
+        self.visit(node.inits)
+
+    def visit_Init(self, node):
+        self.visit(node.expr)
+        node.ID = self.declare(node.ID)
+
+    def visit_PrintInstr(self, node):
+        self.visit(node.expr_list)
+
+    def visit_LabeledInstr(self, node):
+        self.visit(node.instruction)
+
+    def visit_Assignment(self, node):
+        self.visit(node.expression)
+        node.ID = self.lookup(node.ID)
+        self.assigned.add(node.ID)
+
+    def visit_ChoiceInstr(self, node):
+        self.visit(node.cond)
+        self.visit(node.instr_1)
+        self.visit(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        self.visit(node.cond)
+        self.visit(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        self.visit(node.instructions)
+        self.visit(node.cond)
+
+    def visit_ReturnInstr(self, node):
+        self.visit(node.expr)
+
+    def visit_ContinueInstr(self, node):
+        pass
+
+    def visit_BreakInstr(self, node):
+        pass
+
+    def visit_CompoundInstr(self, node):
+        self.scopes.append({})
+        self.visit(node.declarations)
+        self.visit(node.instructions_opt)
+        self.scopes.pop()
+
+    def visit_Const(self, node):
+        pass
+
+    def visit_Variable(self, node):
+        node.name = self.lookup(node.name)
+
+    def visit_IDPareExpr(self, node):
+        self.free.add(node.ID)
+        self.visit(node.expr_list)
+
+    def visit_PareExpr(self, node):
+        self.visit(node.expr)
+
+    def visit_BinExpr(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+
+class Candidate(object):
+
+    def __init__(self, fundef, index):
+        self.fundef = fundef
+        self.index = index          # position among the FunDefs of the program
+        self.calls = set(node.ID for node in walk(fundef.compound_instr) if isinstance(node, IDPareExpr))
+        self.size = sum(1 for _ in walk(fundef.compound_instr))
+        self.reason = None          # why calls of it are not inlined
+
+
+# Replaces calls of small non-recursive functions by a block with the body of
+# the function. The parameters become declarations initialized with the
+# arguments and every variable of the body gets a fresh name (containing '@',
+# which no identifier can), so nothing of the caller is shadowed. Calls are
+# inlined where they make up a whole instruction:
+#     f(...);   x = f(...);   return f(...);   print f(...);
+# and the body must end in a return on every path and have no other returns;
+# those become the instruction the call was part of. Other calls are left
+# alone, as are calls of a function defined after the caller, or whose body
+# uses a global that is shadowed at the call site.
+class Inliner(NodeVisitor):
+
+    def __init__(self, max_size=MAX_INLINE_SIZE, explain=None):
+        self.max_size = max_size
+        self.explain = explain          # file to report decisions to, or None
+        self.candidates = {}
+        self.caller = None              # index of the FunDef being visited
+        self.defined = 0                # number of FunDefs visited so far
+        self.scopes = []                # local names at the current point
+        self.count = 0
+        self.inlined = 0
+
+    def report(self, message):
+        if self.explain is not None:
+            self.explain.write(message + "\n")
+
+    def inline(self, program):
+        elements = [] if program.elements is None else program.elements.list
+        fundefs = [fundef for element in elements if element.func is not None for fundef in element.func.list]
+        for index, fundef in enumerate(fundefs):
+            if fundef.ID in self.candidates:
+                self.candidates[fundef.ID].reason = "defined more than once"
+            else:
+                self.candidates[fundef.ID] = Candidate(fundef, index)
+        for candidate in sorted(self.candidates.values(), key=lambda candidate: candidate.index):
+            if candidate.reason is None:
+                candidate.reason = self.check(candidate)
+            if candidate.reason is not None:
+                self.report("{0}: not inlined, {1}".format(candidate.fundef.ID, candidate.reason))
+        self.visit(program)
+        self.report("{0} calls inlined".format(self.inlined))
+        return program
+
+    def check(self, candidate):
+        if candidate.fundef.ID in self.reachable(candidate.calls):
+            return "recursive"
+        if candidate.size > self.max_size:
+            return "{0} nodes, more than {1}".format(candidate.size, self.max_size)
+        body = candidate.fundef.compound_instr
+        returns = tailReturns(body)
+        if returns is None:
+            return "not every path ends in a return"
+        if len(returns) != sum(1 for node in walk(body) if isinstance(node, ReturnInstr)):
+            return "returns before the end"
+        if escapes(body):
+            return "break or continue outside of a loop"
+        return None
+
+    # functions called directly or indirectly from <calls>
+    def reachable(self, calls):
+        seen = set()
+        todo = list(calls)
+        while todo:
+            name = todo.pop()
+            if name not in seen:
+                seen.add(name)
+                if name in self.candidates:
+                    todo.extend(self.candidates[name].calls)
+        return seen
+
+    # a name for a variable of <function> that no other variable has
+    def fresh(self, function, name):
+        self.count += 1
+        return "{0}@{1}.{2}".format(name, function, self.count)
+
+    def locals(self):
+        names = set()
+        for scope in self.scopes:
+            names |= scope
+        return names
+
+    # the block replacing <call>, with <make> building the instruction that
+    # takes the place of each return, or None
+    def expand(self, call, make):
+        candidate = self.candidates.get(call.ID)
+        if candidate is None:
+            return None
+        if candidate.reason is not None:
+            return None
+        where = "call of {0} at line {1}".format(call.ID, call.line)
+        if candidate.index >= (self.defined if self.caller is None else self.caller):
+            self.report("{0}: not inlined, {1} is defined later".format(where, call.ID))
+            return None
+        fundef = candidate.fundef
+        params = [] if fundef.args_list is None else fundef.args_list.list
+        args = [] if call.expr_list is None else call.expr_list.list
+        if len(params) != len(args):
+            self.report("{0}: not inlined, wrong number of arguments".format(where))
+            return None
+
+        body = copy.deepcopy(fundef.compound_instr)
+        renamer = Renamer(lambda name: self.fresh(fundef.ID, name))
+        names = [renamer.declare(param.ID) for param in params]
+        renamer.visit(body)
+        shadowed = renamer.free & self.locals()
+        if shadowed:
+            self.report("{0}: not inlined, {1} shadowed at the call site".format(where, ", ".join(sorted(shadowed))))
+            return None
+
+        # a constant argument, or a variable that nothing run by the body or
+        # by the other arguments can assign, takes the place of a parameter
+        # that is not assigned either; the other parameters become declarations
+        calls = any(isinstance(node, IDPareExpr) for root in [body] + args for node in walk(root))
+        values = {}
+        declarations = Declarations()
+        for param, name, arg in zip(params, names, args):
+            if name not in renamer.assigned and (isinstance(arg, Const) or isinstance(arg, Variable)
+                                                 and arg.name not in renamer.assigned and not calls):
+                values[name] = arg
+            else:
+                inits = Inits()
+                inits.add(Init(name, arg, param.line))
+                declarations.add(Declaration(param.type, inits))
+        if values:
+            substitute(body, values)
+
+        if body.declarations is not None:
+            declarations.list.extend(body.declarations.list)
+        block = CompoundInstr(declarations if declarations.list else None, body.instructions_opt)
+        self.inlined += 1
+        self.report("{0}: inlined".format(where))
+        return replaceReturns(block, make)
+
+    # the instructions replacing <node>: itself, or the body of the call it
+    # consists of, as a block when the body declares variables
+    def statement(self, node):
+        block = None
+        if isinstance(node, IDPareExpr):
+            block = self.expand(node, lambda expr: expr)
+        elif isinstance(node, Assignment) and isinstance(node.expression, IDPareExpr):
+            block = self.expand(node.expression, lambda expr: Assignment(node.ID, expr, node.line))
+        elif isinstance(node, ReturnInstr) and isinstance(node.expr, IDPareExpr):
+            block = self.expand(node.expr, lambda expr: ReturnInstr(expr, node.line))
+        elif isinstance(node, PrintInstr) and len(node.expr_list.list) == 1 \
+                and isinstance(node.expr_list.list[0], IDPareExpr):
+            def make(expr):
+                expr_list = ExprList()
+                expr_list.add(expr)
+                return PrintInstr(expr_list, node.line)
+            block = self.expand(node.expr_list.list[0], make)
+        if block is None:
+            self.visit(node)
+            return [node]
+        self.visit(block)
+        if block.declarations is None:
+            return block.instructions_opt.list
+        return [block]
+
+    def instructions(self, node):
+        node.list = [new for instruction in node.list for new in self.statement(instruction)]
+
+    # statement() where the grammar has room for one instruction
+    def single(self, node):
+        instructions = self.statement(node)
+        if len(instructions) == 1:
+            return instructions[0]
+        block = Instructions()
+        block.list = instructions
+        return CompoundInstr(None, block)
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.visit(node.dec)
+        self.visit(node.func)
+        if node.inst is not None:
+            self.instructions(node.inst)
+
+    def visit_Declaration(self, node):
+        if self.scopes:
+            for init in node.inits.list:
+                self.scopes[-1].add(init.ID)
+
+    def visit_FunDef(self, node):
+        self.caller = self.defined
+        self.defined += 1
+        self.scopes = [set() if node.args_list is None else set(arg.ID for arg in node.args_list.list)]
+        self.visit(node.compound_instr)
+        self.scopes = []
+        self.caller = None
+
+    def visit_LabeledInstr(self, node):
+        node.instruction = self.single(node.instruction)
+
+    def visit_ChoiceInstr(self, node):
+        node.instr_1 = self.single(node.instr_1)
+        if node.instr_2 is not None:
+            node.instr_2 = self.single(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        node.instr = self.single(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        self.instructions(node.instructions)
+
+    def visit_CompoundInstr(self, node):
+        self.scopes.append(set())
+        self.visit(node.declarations)
+        self.instructions(node.instructions_opt)
+        self.scopes.pop()
+
+    # instructions without instructions inside
+    def visit_PrintInstr(self, node):
+        pass
+
+    def visit_Assignment(self, node):
+        pass
+
+    def visit_ReturnInstr(self, node):
+        pass
+
+    def visit_ContinueInstr(self, node):
+        pass
+
+    def visit_BreakInstr(self, node):
+        pass
+
+    def visit_Const(self, node):
+        pass
+
+    def visit_Variable(self, node):
+        pass
+
+    def visit_IDPareExpr(self, node):
+        pass
+
+    def visit_PareExpr(self, node):
+        pass
+
+    def visit_BinExpr(self, node):
+        pass
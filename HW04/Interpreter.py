@@ -5,21 +5,33 @@ from Memory import *
 from Exceptions import  *
 from visit import *
 import sys
+from Budget import Budget
 
 sys.setrecursionlimit(10000)
 
+ops = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.div,
+       '%': operator.mod, '|': operator.or_, '&': operator.and_, '^': operator.xor,
+       '&&': operator.iand, '||': operator.ior, '<<': operator.lshift, '>>': operator.rshift,
+       '==': operator.eq, '!=': operator.ne, '>': operator.gt, '<': operator.lt,
+       '<=': operator.le, '>=': operator.ge}
+
 
 class Interpreter(object):
 
-    def __init__(self):
+    # <memo> is a Memoization.MemoCache for calls of pure functions, or None;
+    # <budget> a Budget.Budget charged a step per loop iteration and call
+    def __init__(self, memo=None, budget=None):
         self.fun_stack = MemoryStack()
         self.fun_stack.pop()
         self.global_stack = MemoryStack()
-        self.ops = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.div,
-                    '%': operator.mod, '|': operator.or_, '&': operator.and_, '^': operator.xor,
-                    '&&': operator.iand, '||': operator.ior, '<<': operator.lshift, '>>': operator.rshift,
-                    '==': operator.eq, '!=': operator.ne, '>': operator.gt, '<': operator.lt,
-                    '<=': operator.le, '>=': operator.ge}
+        self.ops = ops
+        self.memo = memo
+        self.budget = Budget() if budget is None else budget
+        # replaced whenever a function is bound, which invalidates the
+        # callees cached on IDPareExpr nodes
+        self.bindings = object()
+        self.site_hits = 0
+        self.site_misses = 0
 
     @on('node')
     def visit(self, node):
@@ -103,7 +115,9 @@ class Interpreter(object):
     # simplistic while loop interpretation
     @when(AST.WhileInstr)
     def visit(self, node):
+        budget = self.budget
         while node.cond.accept(self):
+            budget.tick()
             try:
                node.instr.accept(self)
             except BreakException:
@@ -113,11 +127,11 @@ class Interpreter(object):
 
     @when(AST.RepeatInstr)
     def visit(self, node):
+        budget = self.budget
         while True:
+            budget.tick()
             try:
                 node.instructions.accept(self)
-                if node.cond.accept(self):
-                    break
             except BreakException:
                 break
             except ContinueException:
@@ -127,6 +141,8 @@ class Interpreter(object):
 
     @when(AST.ReturnInstr)
     def visit(self, node):
+        if node.tail is not None:
+            raise TailCallException(self.arguments(node.tail))
         value = node.expr.accept(self)
         raise ReturnValueException(value)
 
@@ -183,21 +199,59 @@ class Interpreter(object):
             else:
                 return v
 
+    def arguments(self, node):
+        return [] if node.expr_list is None else [expr.accept(self) for expr in node.expr_list.list]
+
     @when(AST.IDPareExpr)
     def visit(self, node):
-        function = self.global_stack.get(node.ID)
-        fun_mem = Memory(node.ID, True)
-        if node.expr_list is not None:
-            for arg, expr in zip(function.args_list.list, node.expr_list.list):
-                fun_mem.put(arg.accept(self), expr.accept(self))
-        
-        self.fun_stack.push(fun_mem)
-        try:
-            function.compound_instr.accept(self)
-        except ReturnValueException as e:
+        args = self.arguments(node)
+        if self.memo is not None and node.ID in self.memo.pure:
+            return self.memo.call(self, node.ID, args, node)
+        return self.call(node.ID, args, node)
+
+    # FunDef and parameter names of function <name>; with call site <site>
+    # (an IDPareExpr) they are cached on the node until the next binding
+    def callee(self, name, site=None):
+        if site is not None:
+            cache = getattr(site, 'cache', None)
+            if cache is not None and cache[0] is self.bindings:
+                self.site_hits += 1
+                return cache[1], cache[2]
+            self.site_misses += 1
+        function = self.global_stack.get(name)
+        params = [] if function.args_list is None else [arg.accept(self) for arg in function.args_list.list]
+        if site is not None:
+            site.cache = (self.bindings, function, params)
+        return function, params
+
+    def callStats(self):
+        calls = self.site_hits + self.site_misses
+        ratio = 100.0 * self.site_hits / calls if calls else 0.0
+        return "call sites: {} hits, {} misses, {:.1f}% hit ratio".format(self.site_hits, self.site_misses, ratio)
+
+    # runs function <name> with already evaluated arguments <args>, called
+    # from IDPareExpr <site> if given; a tail call reruns the body in a
+    # fresh Memory in place of the current one
+    def call(self, name, args, site=None):
+        function, params = self.callee(name, site)
+        while True:
+            self.budget.tick()
+            fun_mem = Memory(name, True)
+            for param, value in zip(params, args):
+                fun_mem.put(param, value)
+
+            self.fun_stack.push(fun_mem)
+            try:
+                function.compound_instr.accept(self)
+            except ReturnValueException as e:
+                self.fun_stack.pop()
+                return e.value
+            except TailCallException as e:
+                self.fun_stack.pop()
+                args = e.arguments
+                continue
             self.fun_stack.pop()
-            return e.value
-        self.fun_stack.pop()
+            return None
 
     @when(AST.PareExpr)
     def visit(self, node):
@@ -222,6 +276,7 @@ class Interpreter(object):
     @when(AST.FunDef)
     def visit(self, node):
         self.global_stack.insert(node.ID, node)
+        self.bindings = object()
 
     @when(AST.ArgsList)
     def visit(self, node):
@@ -240,3 +295,169 @@ class Interpreter(object):
         r2 = node.right.accept(self)
         # ...
     """
+
+
+# Runs a program annotated by Resolver.Resolver. Variables live in two fixed
+# size lists, the global frame and the frame of the running function, and
+# are read and written through the (depth, slot) addresses of the nodes.
+class ResolvedInterpreter(Interpreter):
+
+    visit = extend(Interpreter.visit)
+
+    def __init__(self, memo=None, budget=None):
+        Interpreter.__init__(self, memo, budget)
+        self.frames = [None, None]
+        self.functions = {}
+
+    @when(AST.Program)
+    def visit(self, node):
+        self.frames[0] = [None] * node.frame_size
+        if node.elements is not None:
+            node.elements.accept(self)
+
+    @when(AST.Init)
+    def visit(self, node):
+        self.frames[node.depth][node.slot] = node.expr.accept(self)
+
+    @when(AST.Assignment)
+    def visit(self, node):
+        expr = node.expression.accept(self)
+        self.frames[node.depth][node.slot] = expr
+        return expr
+
+    @when(AST.CompoundInstr)
+    def visit(self, node):
+        if node.declarations is not None:
+            node.declarations.accept(self)
+        node.instructions_opt.accept(self)
+
+    @when(AST.Variable)
+    def visit(self, node):
+        return self.frames[node.depth][node.slot]
+
+    def call(self, name, args, site=None):
+        function = self.functions[name]
+        caller = self.frames[1]
+        try:
+            while True:
+                self.budget.tick()
+                frame = [None] * function.frame_size
+                if function.args_list is not None:
+                    for arg, value in zip(function.args_list.list, args):
+                        frame[arg.slot] = value
+                self.frames[1] = frame
+                try:
+                    function.compound_instr.accept(self)
+                except ReturnValueException as e:
+                    return e.value
+                except TailCallException as e:
+                    args = e.arguments
+                    continue
+                return None
+        finally:
+            self.frames[1] = caller
+
+    @when(AST.FunDef)
+    def visit(self, node):
+        self.functions[node.ID] = node
+
+
+class Completion(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+BREAK = Completion('break')
+CONTINUE = Completion('continue')
+RETURN = Completion('return')
+
+
+# Signals break, continue and return by returning a Completion record from
+# the statement visits instead of raising the Exceptions.py exceptions.
+# Value of the last return is kept in self.return_value.
+class CompletionInterpreter(Interpreter):
+
+    visit = extend(Interpreter.visit)
+
+    def __init__(self, memo=None, budget=None):
+        Interpreter.__init__(self, memo, budget)
+        self.return_value = None
+        self.tail_arguments = None      # set by a tail call until the body reruns
+
+    @when(AST.Instructions)
+    def visit(self, node):
+        for inst in node.list:
+            completion = inst.accept(self)
+            if completion.__class__ is Completion:
+                return completion
+
+    @when(AST.WhileInstr)
+    def visit(self, node):
+        budget = self.budget
+        while node.cond.accept(self):
+            budget.tick()
+            completion = node.instr.accept(self)
+            if completion.__class__ is Completion:
+                if completion is BREAK:
+                    break
+                if completion is RETURN:
+                    return completion
+
+    @when(AST.RepeatInstr)
+    def visit(self, node):
+        budget = self.budget
+        while True:
+            budget.tick()
+            completion = node.instructions.accept(self)
+            if completion.__class__ is Completion:
+                if completion is BREAK:
+                    break
+                if completion is RETURN:
+                    return completion
+            if node.cond.accept(self):
+                break
+
+    @when(AST.ReturnInstr)
+    def visit(self, node):
+        if node.tail is not None:
+            self.tail_arguments = self.arguments(node.tail)
+        else:
+            self.return_value = node.expr.accept(self)
+        return RETURN
+
+    @when(AST.ContinueInstr)
+    def visit(self, node):
+        return CONTINUE
+
+    @when(AST.BreakInstr)
+    def visit(self, node):
+        return BREAK
+
+    @when(AST.CompoundInstr)
+    def visit(self, node):
+        stack = self.global_stack if self.fun_stack.isEmpty() else self.fun_stack
+        stack.push(Memory('compound'))
+        if node.declarations is not None:
+            node.declarations.accept(self)
+        completion = node.instructions_opt.accept(self)
+        stack.pop()
+        return completion
+
+    def call(self, name, args, site=None):
+        function, params = self.callee(name, site)
+        while True:
+            self.budget.tick()
+            fun_mem = Memory(name, True)
+            for param, value in zip(params, args):
+                fun_mem.put(param, value)
+
+            self.fun_stack.push(fun_mem)
+            completion = function.compound_instr.accept(self)
+            self.fun_stack.pop()
+            if completion is not RETURN:
+                return None
+            if self.tail_arguments is None:
+                value, self.return_value = self.return_value, None
+                return value
+            args, self.tail_arguments = self.tail_arguments, None
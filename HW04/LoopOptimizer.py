@@ -0,0 +1,371 @@
+#!/usr/bin/python
+import copy
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor, ttype
+from Memoization import PurityChecker
+from Simplifier import uncertainInts
+
+
+# products of an induction variable used fewer times than this per loop are
+# left alone: updating the running product costs an assignment and an
+# addition, as much as evaluating the product twice
+MIN_REDUCED_USES = 2
+
+# operators that cannot raise on int operands; / and % are added when the
+# divisor is a nonzero constant, << and >> when the count is a small constant
+SAFE_OPS = frozenset(['+', '-', '*', '&', '|', '^', '==', '!=', '<', '>', '<=', '>='])
+MAX_SHIFT = 64
+
+TEMPORARY = "loop@"
+
+
+def key(node):
+    if isinstance(node, Const):
+        return repr((type(node.const).__name__, node.const.const))
+    if isinstance(node, Variable):
+        return node.name
+    if isinstance(node, PareExpr):
+        return key(node.expr)
+    return "({0} {1} {2})".format(key(node.left), node.op, key(node.right))
+
+
+def intConst(node):
+    return isinstance(node, Const) and isinstance(node.const, Integer)
+
+
+# Loop invariant code motion and strength reduction for while and repeat
+# loops, innermost first. The def/use analysis uses the Assignment targets
+# and declarations found in the loop:
+#   - a BinExpr whose variables are neither assigned nor declared in the loop,
+#     that calls nothing and cannot raise, is computed once before the loop
+#     into a temporary; the loop becomes { int loop@1 = n - 1; while ... }
+#   - for an induction variable i, assigned only by i = i + c or i = i - c
+#     with a constant c, a product i * k with an invariant k that is used at
+#     least MIN_REDUCED_USES times becomes a temporary that is initialized to
+#     i * k before the loop and advanced by c * k right after i is
+# Only variables that are ints at run time (see Simplifier.uncertainInts)
+# take part, so a hoisted expression cannot raise even where the loop would
+# not have run it.
+# Calls of functions that are not pure may assign any global (or, with the
+# dynamic scoping of the Interpreter, any variable of the top level), so in
+# loops that make such calls only variables local to the function count as
+# invariant.
+class LoopOptimizer(NodeVisitor):
+
+    def __init__(self):
+        self.root = SymbolTable(None, "root")
+        self.table = self.root
+        self.in_function = False
+        self.pure = set()
+        self.uncertain = set()
+        self.count = 0
+        self.hoisted = 0
+        self.reduced = 0
+
+    def optimize(self, program):
+        self.pure = PurityChecker().pureFunctions(program)
+        self.uncertain = uncertainInts(program)
+        self.visit(program)
+        return program
+
+    def fresh(self):
+        self.count += 1
+        return "{0}{1}".format(TEMPORARY, self.count)
+
+    # the optimized loop <node>, wrapped in a block declaring its temporaries
+    def loop(self, node):
+        self.visit(node.instr if isinstance(node, WhileInstr) else node.instructions)
+
+        assigned = set()
+        declared = set()
+        impure_calls = False
+        for child in walk(node):
+            if isinstance(child, Assignment):
+                assigned.add(child.ID)
+            elif isinstance(child, Init):
+                declared.add(child.ID)
+            elif isinstance(child, IDPareExpr) and child.ID not in self.pure:
+                impure_calls = True
+
+        declarations = Declarations()
+        temporaries = {}
+        self.lift(node, assigned | declared, impure_calls, declarations, declared)
+        self.hoist(node, assigned | declared, impure_calls, declarations, temporaries)
+        self.reduce(node, assigned, declared, impure_calls, declarations)
+        if not declarations.list:
+            return node
+        instructions = Instructions()
+        instructions.add(node)
+        return CompoundInstr(declarations, instructions)
+
+    # moves the temporaries of inner loops that are invariant in <node> too
+    def lift(self, node, assigned, impure_calls, declarations, declared):
+        for child in walk(node):
+            if not isinstance(child, CompoundInstr) or child.declarations is None:
+                continue
+            kept = []
+            for declaration in child.declarations.list:
+                init = declaration.inits.list[0]
+                if init.ID.startswith(TEMPORARY) and self.invariant(init.expr, assigned, impure_calls):
+                    declarations.add(declaration)
+                    declared.discard(init.ID)
+                else:
+                    kept.append(declaration)
+            child.declarations.list = kept
+
+    def declare(self, declarations, name, type, expr, line):
+        inits = Inits()
+        inits.add(Init(name, expr, line))
+        declarations.add(Declaration(type, inits))
+
+    def invariantVariable(self, name, assigned, impure_calls):
+        if name in assigned:
+            return False
+        if impure_calls:
+            table = self.table
+            while table is not None and table.get(name) is None:
+                table = table.getParentScope()
+            return self.in_function and table is not None and table is not self.root
+        return True
+
+    # 'int' when <node> is an invariant int expression, else None; strings
+    # are left in the loop, where "s" * n may never be evaluated
+    def invariant(self, node, assigned, impure_calls):
+        if isinstance(node, Const):
+            return 'int' if isinstance(node.const, Integer) else None
+        if isinstance(node, Variable):
+            if not self.invariantVariable(node.name, assigned, impure_calls):
+                return None
+            symbol = self.table.getAny(node.name)
+            if not isinstance(symbol, VariableSymbol) or symbol.type != 'int' or node.name in self.uncertain:
+                return None
+            return 'int'
+        if isinstance(node, PareExpr):
+            return self.invariant(node.expr, assigned, impure_calls)
+        if not isinstance(node, BinExpr):
+            return None
+        left = self.invariant(node.left, assigned, impure_calls)
+        right = self.invariant(node.right, assigned, impure_calls)
+        if left is None or right is None:
+            return None
+        if node.op not in SAFE_OPS:
+            if not intConst(node.right):
+                return None
+            count = int(node.right.const.const)
+            if node.op in ('/', '%') and count == 0 or node.op in ('<<', '>>') and not 0 <= count <= MAX_SHIFT:
+                return None
+        return ttype[node.op][left][right]
+
+    # replaces the largest invariant BinExprs below <node> by temporaries
+    def hoist(self, node, assigned, impure_calls, declarations, temporaries):
+        for cls in type(node).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                value = getattr(node, name, None)
+                if isinstance(value, Node):
+                    setattr(node, name, self.hoisted_(value, assigned, impure_calls, declarations, temporaries))
+                elif isinstance(value, list):
+                    value[:] = [self.hoisted_(item, assigned, impure_calls, declarations, temporaries)
+                                if isinstance(item, Node) else item for item in value]
+
+    def hoisted_(self, node, assigned, impure_calls, declarations, temporaries):
+        if isinstance(node, BinExpr):
+            type = self.invariant(node, assigned, impure_calls)
+            if type is not None:
+                expr_key = key(node)
+                if expr_key not in temporaries:
+                    temporaries[expr_key] = self.fresh()
+                    self.declare(declarations, temporaries[expr_key], type, node, node.line)
+                    self.hoisted += 1
+                return Variable(temporaries[expr_key], node.line)
+        self.hoist(node, assigned, impure_calls, declarations, temporaries)
+        return node
+
+    # {name: (assignment, step)} of the induction variables of <node>
+    def inductionVariables(self, node, declared, impure_calls):
+        assignments = {}
+        for child in walk(node):
+            if isinstance(child, Assignment):
+                assignments.setdefault(child.ID, []).append(child)
+        induction = {}
+        for name, found in assignments.items():
+            if len(found) != 1 or name in declared or not self.invariantVariable(name, set(), impure_calls):
+                continue
+            expr = found[0].expression
+            symbol = self.table.getAny(name)
+            if not isinstance(symbol, VariableSymbol) or symbol.type != 'int' or name in self.uncertain \
+                    or not isinstance(expr, BinExpr):
+                continue
+            if expr.op in ('+', '-') and isinstance(expr.left, Variable) and expr.left.name == name \
+                    and intConst(expr.right):
+                step = int(expr.right.const.const)
+            elif expr.op == '+' and isinstance(expr.right, Variable) and expr.right.name == name \
+                    and intConst(expr.left):
+                step = int(expr.left.const.const)
+            else:
+                continue
+            induction[name] = (found[0], step if expr.op == '+' else -step)
+        return induction
+
+    def reduce(self, node, assigned, declared, impure_calls, declarations):
+        induction = self.inductionVariables(node, declared, impure_calls)
+        assigned = assigned | declared
+        if not induction:
+            return
+        products = {}
+        for child in walk(node):
+            if isinstance(child, BinExpr) and child.op == '*':
+                for variable, factor in [(child.left, child.right), (child.right, child.left)]:
+                    if isinstance(variable, Variable) and variable.name in induction \
+                            and self.invariant(factor, assigned, impure_calls) == 'int':
+                        products.setdefault((variable.name, key(factor)), []).append(child)
+                        break
+        for (name, _), uses in sorted(products.items()):
+            if len(uses) < MIN_REDUCED_USES:
+                continue
+            product = uses[0]
+            factor = product.right if isinstance(product.left, Variable) and product.left.name == name else product.left
+            temporary = self.fresh()
+            self.declare(declarations, temporary, 'int', copy.deepcopy(product), product.line)
+            uses = set(id(use) for use in uses)
+            self.replace(node, lambda child: Variable(temporary, child.line) if id(child) in uses else None)
+
+            assignment, step = induction[name]
+            line = assignment.line
+            op = '+' if step >= 0 else '-'
+            if intConst(factor):
+                value = step * int(factor.const.const)
+                delta = Const(Integer(str(abs(value)), line), 0)
+                op = '+' if value >= 0 else '-'
+            elif abs(step) == 1:
+                delta = copy.deepcopy(factor)
+            else:
+                delta = Variable(self.fresh(), line)
+                self.declare(declarations, delta.name, 'int',
+                             BinExpr('*', Const(Integer(str(abs(step)), line), 0), copy.deepcopy(factor), line),
+                             line)
+            advance = Assignment(temporary, BinExpr(op, Variable(temporary, line), delta, line), line)
+            self.insertAfter(node, assignment, advance)
+            self.reduced += 1
+
+    # replaces the nodes below <node> for which <replacement> gives a node
+    def replace(self, node, replacement):
+        for cls in type(node).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                value = getattr(node, name, None)
+                if isinstance(value, Node):
+                    new = replacement(value)
+                    if new is None:
+                        self.replace(value, replacement)
+                    else:
+                        setattr(node, name, new)
+                elif isinstance(value, list):
+                    for i, item in enumerate(value):
+                        if isinstance(item, Node):
+                            new = replacement(item)
+                            if new is None:
+                                self.replace(item, replacement)
+                            else:
+                                value[i] = new
+
+    # puts instruction <new> right after instruction <target> below <node>
+    def insertAfter(self, node, target, new):
+        def pair():
+            instructions = Instructions()
+            instructions.add(target)
+            instructions.add(new)
+            return CompoundInstr(None, instructions)
+
+        for child in children(node):
+            if isinstance(child, Instructions) and target in child.list:
+                child.list.insert(child.list.index(target) + 1, new)
+                return True
+        for name in ('instr', 'instr_1', 'instr_2', 'instruction'):
+            if getattr(node, name, None) is target:
+                setattr(node, name, pair())
+                return True
+        return any(self.insertAfter(child, target, new) for child in children(node))
+
+    def statement(self, node):
+        if isinstance(node, (WhileInstr, RepeatInstr)):
+            return self.loop(node)
+        self.visit(node)
+        return node
+
+    def instructions(self, node):
+        node.list = [self.statement(instruction) for instruction in node.list]
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.visit(node.dec)
+        self.visit(node.func)
+        if node.inst is not None:
+            self.instructions(node.inst)
+
+    def visit_Declaration(self, node):
+        for init in node.inits.list:
+            self.table.put(init.ID, VariableSymbol(init.ID, node.type))
+
+    def visit_FunDef(self, node):
+        self.table = SymbolTable(self.table, "function")
+        if node.args_list is not None:
+            for arg in node.args_list.list:
+                self.table.put(arg.ID, VariableSymbol(arg.ID, arg.type))
+        self.in_function = True
+        self.visit(node.compound_instr)
+        self.in_function = False
+        self.table = self.table.getParentScope()
+
+    def visit_LabeledInstr(self, node):
+        node.instruction = self.statement(node.instruction)
+
+    def visit_ChoiceInstr(self, node):
+        node.instr_1 = self.statement(node.instr_1)
+        if node.instr_2 is not None:
+            node.instr_2 = self.statement(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        node.instr = self.statement(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        self.instructions(node.instructions)
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        self.visit(node.declarations)
+        self.instructions(node.instructions_opt)
+        self.table = self.table.getParentScope()
+
+    # instructions without instructions inside
+    def visit_PrintInstr(self, node):
+        pass
+
+    def visit_Assignment(self, node):
+        pass
+
+    def visit_ReturnInstr(self, node):
+        pass
+
+    def visit_ContinueInstr(self, node):
+        pass
+
+    def visit_BreakInstr(self, node):
+        pass
+
+    def visit_Const(self, node):
+        pass
+
+    def visit_Variable(self, node):
+        pass
+
+    def visit_IDPareExpr(self, node):
+        pass
+
+    def visit_PareExpr(self, node):
+        pass
+
+    def visit_BinExpr(self, node):
+        pass
@@ -0,0 +1,158 @@
+#!/usr/bin/python
+from collections import OrderedDict
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor
+
+
+class FunctionInfo(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.impure = False
+        self.calls = set()
+
+
+# Finds user functions whose result depends only on their arguments: the body
+# reads and writes no globals, does not print, and calls only pure functions.
+# Scopes of a function body start from an empty table, so any name that does
+# not resolve inside the function is a global.
+class PurityChecker(NodeVisitor):
+
+    def __init__(self):
+        self.table = None
+        self.function = None
+        self.functions = {}
+
+    def pureFunctions(self, program):
+        self.visit(program)
+        pure = set(name for name, info in self.functions.items() if not info.impure)
+        changed = True
+        while changed:
+            changed = False
+            for name in list(pure):
+                if not self.functions[name].calls <= pure:
+                    pure.discard(name)
+                    changed = True
+        return pure
+
+    def useVariable(self, name):
+        if self.table.getAny(name) is None:
+            self.function.impure = True
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        # code outside of functions is never memoized
+        self.visit(node.func)
+
+    def visit_FunDef(self, node):
+        info = FunctionInfo(node.ID)
+        if node.ID in self.functions:
+            info.impure = True
+        self.functions[node.ID] = info
+        self.function = info
+        self.table = SymbolTable(None, "function")
+        if node.args_list is not None:
+            for arg in node.args_list.list:
+                self.table.put(arg.ID, VariableSymbol(arg.ID, arg.type))
+        self.visit(node.compound_instr)
+        self.table = None
+        self.function = None
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        self.visit(node.declarations)
+        self.visit(node.instructions_opt)
+        self.table = self.table.getParentScope()
+
+    def visit_Declaration(self, node):
+        self.visit(node.inits)
+
+    def visit_Init(self, node):
+        self.visit(node.expr)
+        self.table.put(node.ID, VariableSymbol(node.ID, None))
+
+    def visit_PrintInstr(self, node):
+        self.function.impure = True
+
+    def visit_LabeledInstr(self, node):
+        self.visit(node.instruction)
+
+    def visit_Assignment(self, node):
+        self.visit(node.expression)
+        self.useVariable(node.ID)
+
+    def visit_ChoiceInstr(self, node):
+        self.visit(node.cond)
+        self.visit(node.instr_1)
+        self.visit(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        self.visit(node.cond)
+        self.visit(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        self.visit(node.instructions)
+        self.visit(node.cond)
+
+    def visit_ReturnInstr(self, node):
+        self.visit(node.expr)
+
+    def visit_ContinueInstr(self, node):
+        pass
+
+    def visit_BreakInstr(self, node):
+        pass
+
+    def visit_Const(self, node):
+        pass
+
+    def visit_Variable(self, node):
+        self.useVariable(node.name)
+
+    def visit_IDPareExpr(self, node):
+        self.function.calls.add(node.ID)
+        self.visit(node.expr_list)
+
+    def visit_PareExpr(self, node):
+        self.visit(node.expr)
+
+    def visit_BinExpr(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+
+# Bounded LRU cache of results of pure function calls, keyed on the function
+# name and the argument tuple. Types are part of the key so that 1 and True
+# (a comparison result) are cached separately.
+class MemoCache(object):
+
+    def __init__(self, pure, size=1024):
+        self.pure = pure
+        self.size = size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # <site> is the calling IDPareExpr, passed on to interpreter.call
+    def call(self, interpreter, name, args, site=None):
+        key = (name, tuple(args), tuple(map(type, args)))
+        if key in self.cache:
+            self.hits += 1
+            value = self.cache.pop(key)
+            self.cache[key] = value
+            return value
+
+        self.misses += 1
+        value = interpreter.call(name, args, site)
+        if self.size > 0:
+            self.cache[key] = value
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        return value
+
+    def stats(self):
+        return "memo: {} hits, {} misses, {} cached".format(self.hits, self.misses, len(self.cache))
@@ -0,0 +1,277 @@
+import gc
+
+from Cparser import Cparser
+from scanner import Scanner
+import AST
+
+
+# binary operators of the `expression` rule of Cparser, each with its level in
+# Cparser.precedence (higher binds tighter) and associativity
+def binaryOperators():
+    # one `expression <op> expression` production per line
+    operators = set(line.split()[-2].strip("'") for line in Cparser.p_expression.__doc__.splitlines())
+    levels = {}
+    for level, entry in enumerate(Cparser.precedence):
+        for op in entry[1:]:
+            if op in operators:
+                levels[op] = (level + 1, entry[0])
+    return levels
+
+
+# Recursive descent parser for the grammar of Cparser, with precedence
+# climbing for binary expressions. Builds the same trees as the ply parser,
+# stops at the same token on syntax errors and reports them the same way.
+class PrattParser(object):
+
+    operators = binaryOperators()
+
+    # tokens an instruction can start with
+    instruction_start = frozenset(['PRINT', 'ID', 'IF', 'WHILE', 'REPEAT', 'RETURN', 'CONTINUE', 'BREAK',
+                                   '{', '(', 'INTEGER', 'FLOAT', 'STRING'])
+
+    def __init__(self, tables=None, scanner=None):
+        self.scanner = Scanner() if scanner is None else scanner
+        self.scanner.build(tables)
+
+    def parse(self, text):
+        # tokens and tree have no cycles, collecting while they grow only
+        # costs time
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.scanner.input(text)
+            self.next_token = self.scanner.token
+            self.tok = self.next_token()
+            program = self.program()
+        finally:
+            if enabled:
+                gc.enable()
+        if self.tok is not None:
+            self.error()
+        return program
+
+    def error(self):
+        tok = self.tok
+        if tok:
+            print("Syntax error at line {0}, column {1}: LexToken({2}, '{3}')".format(tok.lineno, self.scanner.find_tok_column(tok), tok.type, tok.value))
+        else:
+            print("Unexpected end of input")
+        exit()
+
+    def advance(self):
+        tok = self.tok
+        self.tok = self.next_token()
+        return tok
+
+    def expect(self, type):
+        tok = self.tok
+        if tok is None or tok.type != type:
+            self.error()
+        self.tok = self.next_token()
+        return tok
+
+    def at(self, type):
+        return self.tok is not None and self.tok.type == type
+
+    def program(self):
+        elements = AST.Elements()
+        while self.tok is not None and (self.tok.type == 'TYPE' or self.tok.type in self.instruction_start):
+            elements.add(self.element())
+        return AST.Program(None if len(elements.list) == 0 else elements)
+
+    # declarations and function definitions both start with TYPE ID, the
+    # token after the ID tells them apart
+    def element(self):
+        declarations = AST.Declarations()
+        fundefs = AST.FunDefs()
+        while self.at('TYPE'):
+            type = self.advance()
+            name = self.expect('ID')
+            if self.at('('):
+                fundefs.add(self.fundef(type, name))
+                break
+            declarations.add(self.declaration(type, name))
+        while self.at('TYPE'):
+            fundefs.add(self.fundef(self.advance(), self.expect('ID')))
+        instructions = self.instructions_opt()
+        return AST.Element(None if len(declarations.list) == 0 else declarations,
+                           None if len(fundefs.list) == 0 else fundefs,
+                           None if len(instructions.list) == 0 else instructions)
+
+    def declarations(self):
+        declarations = AST.Declarations()
+        while self.at('TYPE'):
+            type = self.advance()
+            declarations.add(self.declaration(type, self.expect('ID')))
+        return declarations
+
+    def declaration(self, type, name):
+        inits = AST.Inits()
+        inits.add(self.init(name))
+        while self.at(','):
+            self.advance()
+            inits.add(self.init(self.expect('ID')))
+        self.expect(';')
+        return AST.Declaration(type.value, inits)
+
+    def init(self, name):
+        self.expect('=')
+        return AST.Init(name.value, self.expression(), name.lineno)
+
+    def fundef(self, type, name):
+        self.expect('(')
+        args_list = None
+        if self.at('TYPE'):
+            args_list = AST.ArgsList()
+            args_list.add(self.arg())
+            while self.at(','):
+                self.advance()
+                args_list.add(self.arg())
+        self.expect(')')
+        return AST.FunDef(type.value, name.value, args_list, self.compound_instr(), type.lineno)
+
+    def arg(self):
+        type = self.expect('TYPE')
+        return AST.Arg(type.value, self.expect('ID').value, type.lineno)
+
+    def instructions_opt(self):
+        instructions = AST.Instructions()
+        while self.tok is not None and self.tok.type in self.instruction_start:
+            instructions.add(self.instruction())
+        return instructions
+
+    def instructions(self):
+        if self.tok is None or self.tok.type not in self.instruction_start:
+            self.error()
+        return self.instructions_opt()
+
+    def instruction(self):
+        if self.tok is None or self.tok.type not in self.instruction_start:
+            self.error()
+        type = self.tok.type
+        if type == 'ID':
+            name = self.advance()
+            if self.at(':'):
+                self.advance()
+                return AST.LabeledInstr(name.value, self.instruction())
+            if self.at('='):
+                self.advance()
+                expression = self.expression()
+                self.expect(';')
+                return AST.Assignment(name.value, expression, name.lineno)
+            expression = self.binary(self.call_or_variable(name), 0)
+            self.expect(';')
+            return expression
+        if type == 'PRINT':
+            line = self.advance().lineno
+            expr_list = self.expr_list()
+            self.expect(';')
+            return AST.PrintInstr(expr_list, line)
+        if type == 'IF':
+            self.advance()
+            cond = self.condition()
+            instr_1 = self.instruction()
+            instr_2 = None
+            # a dangling else belongs to the innermost if
+            if self.at('ELSE'):
+                self.advance()
+                instr_2 = self.instruction()
+            return AST.ChoiceInstr(cond, instr_1, instr_2)
+        if type == 'WHILE':
+            self.advance()
+            cond = self.condition()
+            return AST.WhileInstr(cond, self.instruction())
+        if type == 'REPEAT':
+            self.advance()
+            instructions = self.instructions()
+            self.expect('UNTIL')
+            cond = self.expression()
+            self.expect(';')
+            return AST.RepeatInstr(instructions, cond)
+        if type == 'RETURN':
+            line = self.advance().lineno
+            expression = self.expression()
+            self.expect(';')
+            return AST.ReturnInstr(expression, line)
+        if type == 'CONTINUE':
+            line = self.advance().lineno
+            self.expect(';')
+            return AST.ContinueInstr(line)
+        if type == 'BREAK':
+            line = self.advance().lineno
+            self.expect(';')
+            return AST.BreakInstr(line)
+        if type == '{':
+            return self.compound_instr()
+        expression = self.expression()
+        self.expect(';')
+        return expression
+
+    def compound_instr(self):
+        self.expect('{')
+        declarations = self.declarations()
+        instructions = self.instructions_opt()
+        self.expect('}')
+        return AST.CompoundInstr(None if len(declarations.list) == 0 else declarations, instructions)
+
+    def condition(self):
+        self.expect('(')
+        cond = self.expression()
+        self.expect(')')
+        return cond
+
+    def expr_list(self):
+        expr_list = AST.ExprList()
+        expr_list.add(self.expression())
+        while self.at(','):
+            self.advance()
+            expr_list.add(self.expression())
+        return expr_list
+
+    def expression(self, min_level=0):
+        return self.binary(self.primary(), min_level)
+
+    # folds the operators of level <min_level> or higher following <left>
+    def binary(self, left, min_level):
+        operators = self.operators
+        tok = self.tok
+        while tok is not None and tok.type in operators:
+            level, assoc = operators[tok.type]
+            if level < min_level:
+                break
+            self.advance()
+            right = self.expression(level if assoc == 'right' else level + 1)
+            left = AST.BinExpr(tok.value, left, right, tok.lineno)
+            tok = self.tok
+            if assoc == 'nonassoc' and tok is not None and operators.get(tok.type, (None,))[0] == level:
+                self.error()
+        return left
+
+    def primary(self):
+        tok = self.tok
+        if tok is None:
+            self.error()
+        type = tok.type
+        if type == 'ID':
+            return self.call_or_variable(self.advance())
+        if type == '(':
+            self.advance()
+            expression = self.expression()
+            self.expect(')')
+            return AST.PareExpr(expression)
+        # ply gives the `const` nonterminal line 0, hence Const(..., 0)
+        if type == 'INTEGER':
+            return AST.Const(AST.Integer(self.advance().value, tok.lineno), 0)
+        if type == 'FLOAT':
+            return AST.Const(AST.Float(self.advance().value, tok.lineno), 0)
+        if type == 'STRING':
+            return AST.Const(AST.String(self.advance().value, tok.lineno), 0)
+        self.error()
+
+    def call_or_variable(self, name):
+        if not self.at('('):
+            return AST.Variable(name.value, name.lineno)
+        self.advance()
+        expr_list = None if self.at(')') else self.expr_list()
+        self.expect(')')
+        return AST.IDPareExpr(name.value, expr_list, name.lineno)
@@ -0,0 +1,155 @@
+import json
+from collections import defaultdict
+from timeit import default_timer
+
+import AST
+from Interpreter import Interpreter
+
+
+LOOPS = (AST.WhileInstr, AST.RepeatInstr)
+
+
+class NodeStats(object):
+    __slots__ = ('kind', 'line', 'count', 'total', 'own')
+
+    def __init__(self, kind, line):
+        self.kind = kind
+        self.line = line
+        self.count = 0
+        self.total = 0.0            # seconds including the nodes below
+        self.own = 0.0              # seconds in this node alone
+
+
+class Rollup(object):
+    __slots__ = ('count', 'total', 'active')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.active = 0             # activations running, only the outermost is timed
+
+
+# line a node reports under: its own, the one of the condition for the
+# instructions without one, or 0 to take the line of the enclosing node
+def lineOf(node):
+    line = getattr(node, 'line', None)
+    if line:
+        return line
+    if isinstance(node, (AST.WhileInstr, AST.RepeatInstr, AST.ChoiceInstr)):
+        return lineOf(node.cond)
+    if isinstance(node, AST.PareExpr):
+        return lineOf(node.expr)
+    if isinstance(node, AST.Const):
+        return node.const.line
+    return 0
+
+
+# Interpreter that times every visit. It replaces the dispatch of visit
+# with a wrapper, so the plain Interpreter carries no profiling code at all.
+# Every node gets its execution count, total and own time; lines count how
+# many times they were entered from another line. Time is also rolled up
+# per function and per loop (outermost activation of recursive ones), and
+# own time per stack of functions and loops for flame graphs.
+class ProfilingInterpreter(Interpreter):
+
+    def __init__(self, memo=None, budget=None):
+        Interpreter.__init__(self, memo, budget)
+        self.dispatch = Interpreter.visit.dispatcher
+        self.nodes = {}
+        self.lines = defaultdict(lambda: [0, 0.0])      # line: [entries, seconds]
+        self.functions = defaultdict(Rollup)
+        self.loops = defaultdict(Rollup)
+        self.stacks = defaultdict(float)                 # "program;f;while@3": own seconds
+        self.contexts = ['<program>']
+        self.children = []                               # time of the children of running visits
+        self.line = 0
+
+    def visit(self, node):
+        stats = self.nodes.get(node)
+        if stats is None:
+            stats = self.nodes[node] = NodeStats(node.__class__.__name__, lineOf(node) or self.line)
+        outer_line = self.line
+        self.line = stats.line
+        loop = None
+        if isinstance(node, LOOPS):
+            loop = self.enter(self.loops, "{}@{}".format('while' if isinstance(node, AST.WhileInstr) else 'repeat',
+                                                        stats.line))
+        self.children.append(0.0)
+        start = default_timer()
+        try:
+            return self.dispatch(self, node)
+        finally:
+            elapsed = default_timer() - start
+            own = elapsed - self.children.pop()
+            if self.children:
+                self.children[-1] += elapsed
+            stats.count += 1
+            stats.total += elapsed
+            stats.own += own
+            self.stacks[";".join(self.contexts)] += own
+            if stats.line != outer_line:
+                line = self.lines[stats.line]
+                line[0] += 1
+                line[1] += elapsed
+            if loop is not None:
+                self.leave(loop, elapsed)
+            self.line = outer_line
+
+    def call(self, name, args, site=None):
+        rollup = self.enter(self.functions, name)
+        start = default_timer()
+        try:
+            return Interpreter.call(self, name, args, site)
+        finally:
+            self.leave(rollup, default_timer() - start)
+
+    def enter(self, rollups, name):
+        rollup = rollups[name]
+        rollup.count += 1
+        rollup.active += 1
+        self.contexts.append(name)
+        return rollup
+
+    def leave(self, rollup, elapsed):
+        rollup.active -= 1
+        if rollup.active == 0:
+            rollup.total += elapsed
+        self.contexts.pop()
+
+    # text report: the <top> lines with the most own time, then functions and loops
+    def report(self, top=20):
+        own = defaultdict(float)
+        for stats in self.nodes.values():
+            own[stats.line] += stats.own
+        res = "{:>6} {:>12} {:>12} {:>12}\n".format("line", "entries", "own (ms)", "total (ms)")
+        for line in sorted(own, key=lambda line: -own[line])[:top]:
+            entries, total = self.lines[line] if line in self.lines else (0, 0.0)
+            res += "{:>6} {:>12} {:>12.3f} {:>12.3f}\n".format(line, entries, own[line] * 1000, total * 1000)
+        for title, rollups in (("function", self.functions), ("loop", self.loops)):
+            if not rollups:
+                continue
+            res += "\n{:<18} {:>12} {:>12}\n".format(title, "runs", "total (ms)")
+            for name in sorted(rollups, key=lambda name: -rollups[name].total):
+                res += "{:<18} {:>12} {:>12.3f}\n".format(name, rollups[name].count, rollups[name].total * 1000)
+        return res
+
+    def toJSON(self):
+        def rollups(table):
+            return [{'name': name, 'count': rollup.count, 'total_ms': rollup.total * 1000}
+                    for name, rollup in sorted(table.items())]
+
+        nodes = sorted(self.nodes.values(), key=lambda stats: (stats.line, stats.kind))
+        return json.dumps({
+            'nodes': [{'kind': stats.kind, 'line': stats.line, 'count': stats.count,
+                       'total_ms': stats.total * 1000, 'own_ms': stats.own * 1000} for stats in nodes],
+            'lines': [{'line': line, 'entries': entries, 'total_ms': total * 1000}
+                      for line, (entries, total) in sorted(self.lines.items())],
+            'functions': rollups(self.functions),
+            'loops': rollups(self.loops),
+        }, indent=2, sort_keys=True)
+
+    # one "frame;frame;frame microseconds" line per stack, the input of
+    # flamegraph.pl and speedscope
+    def collapsed(self):
+        return "".join("{} {}\n".format(stack, int(round(seconds * 1e6)))
+                       for stack, seconds in sorted(self.stacks.items()))
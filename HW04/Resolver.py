@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor
+from Exceptions import CompileError
+
+
+GLOBAL = 0
+LOCAL = 1
+
+
+class SlotSymbol(VariableSymbol):
+
+    def __init__(self, name, depth, slot):
+        VariableSymbol.__init__(self, name, None)
+        self.depth = depth
+        self.slot = slot
+
+
+# Gives every Variable, Assignment, Init and Arg a (depth, slot) address.
+# Functions do not nest, so there are only two frames at a time: the global
+# one (depth 0) and the frame of the running function (depth 1). Variables of
+# nested compound blocks are flattened into the frame of their function, and
+# sibling blocks share slots, so every access is a single list index.
+class Resolver(NodeVisitor):
+
+    def __init__(self):
+        self.table = SymbolTable(None, "root")
+        self.depth = GLOBAL
+        self.next_slot = 0
+        self.size = 0
+
+    def declare(self, node):
+        if self.table.get(node.ID) is not None:
+            raise CompileError("Variable '{}' already declared: line {}".format(node.ID, node.line))
+        node.depth = self.depth
+        node.slot = self.next_slot
+        self.table.put(node.ID, SlotSymbol(node.ID, node.depth, node.slot))
+        self.next_slot += 1
+        self.size = max(self.size, self.next_slot)
+
+    def lookup(self, node, name):
+        symbol = self.table.getAny(name)
+        if not isinstance(symbol, SlotSymbol):
+            raise CompileError("Usage of undeclared variable '{}': line {}".format(name, node.line))
+        node.depth = symbol.depth
+        node.slot = symbol.slot
+
+    def visit_Program(self, node):
+        if node.elements is not None:
+            self.visit(node.elements)
+        node.frame_size = self.size
+
+    def visit_Element(self, node):
+        self.visit(node.dec)
+        self.visit(node.func)
+        self.visit(node.inst)
+
+    def visit_Declaration(self, node):
+        self.visit(node.inits)
+
+    def visit_Init(self, node):
+        self.visit(node.expr)
+        self.declare(node)
+
+    def visit_PrintInstr(self, node):
+        self.visit(node.expr_list)
+
+    def visit_LabeledInstr(self, node):
+        self.visit(node.instruction)
+
+    def visit_Assignment(self, node):
+        self.visit(node.expression)
+        self.lookup(node, node.ID)
+
+    def visit_ChoiceInstr(self, node):
+        self.visit(node.cond)
+        self.visit(node.instr_1)
+        self.visit(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        self.visit(node.cond)
+        self.visit(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        self.visit(node.instructions)
+        self.visit(node.cond)
+
+    def visit_ReturnInstr(self, node):
+        self.visit(node.expr)
+
+    def visit_ContinueInstr(self, node):
+        pass
+
+    def visit_BreakInstr(self, node):
+        pass
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        first_slot = self.next_slot
+        self.visit(node.declarations)
+        self.visit(node.instructions_opt)
+        self.next_slot = first_slot
+        self.table = self.table.getParentScope()
+
+    def visit_Const(self, node):
+        pass
+
+    def visit_Variable(self, node):
+        self.lookup(node, node.name)
+
+    def visit_IDPareExpr(self, node):
+        self.visit(node.expr_list)
+
+    def visit_PareExpr(self, node):
+        self.visit(node.expr)
+
+    def visit_BinExpr(self, node):
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_FunDef(self, node):
+        self.table.put(node.ID, FunctionSymbol(node.ID, node.type, None))
+        outer = self.depth, self.next_slot, self.size
+        self.depth, self.next_slot, self.size = LOCAL, 0, 0
+        self.table = SymbolTable(self.table, "child")
+        self.visit(node.args_list)
+        self.visit(node.compound_instr)
+        self.table = self.table.getParentScope()
+        node.frame_size = self.size
+        self.depth, self.next_slot, self.size = outer
+
+    def visit_Arg(self, node):
+        self.declare(node)
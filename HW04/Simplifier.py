@@ -0,0 +1,261 @@
+#!/usr/bin/python
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor, ttype
+from Interpreter import ops
+
+
+# folded ints and strings longer than this stay unfolded
+MAX_CONST_LENGTH = 1024
+
+
+# whether <node> gives an int at run time, when none of the variables named
+# in <uncertain> appear in it; calls may return a float or None
+def runtimeInt(node, uncertain):
+    if isinstance(node, Const):
+        return isinstance(node.const, Integer)
+    if isinstance(node, Variable):
+        return node.name not in uncertain
+    if isinstance(node, PareExpr):
+        return runtimeInt(node.expr, uncertain)
+    if isinstance(node, BinExpr):
+        return ttype[node.op]['int']['int'] is not None \
+            and runtimeInt(node.left, uncertain) and runtimeInt(node.right, uncertain)
+    return False
+
+
+# names of the variables and parameters that may hold something else than an
+# int at run time. The TypeChecker lets a float initialize, be assigned to or
+# be passed as an int, and the interpreters keep floats as their source text,
+# so an int is only known to be one when every declaration of its name is
+# int and everything stored in it is known to be an int too. Names are not
+# told apart by scope, which only makes the set larger.
+def uncertainInts(program):
+    functions = dict((node.ID, node) for node in walk(program) if isinstance(node, FunDef))
+    uncertain = set()
+    for node in walk(program):
+        if isinstance(node, Declaration) and node.type != 'int':
+            uncertain.update(init.ID for init in node.inits.list)
+        elif isinstance(node, Arg) and node.type != 'int':
+            uncertain.add(node.ID)
+    while True:
+        known = len(uncertain)
+        for node in walk(program):
+            if isinstance(node, Init) and not runtimeInt(node.expr, uncertain):
+                uncertain.add(node.ID)
+            elif isinstance(node, Assignment) and not runtimeInt(node.expression, uncertain):
+                uncertain.add(node.ID)
+            elif isinstance(node, IDPareExpr) and node.ID in functions:
+                params = functions[node.ID].args_list
+                args = [] if node.expr_list is None else node.expr_list.list
+                for param, arg in zip([] if params is None else params.list, args):
+                    if not runtimeInt(arg, uncertain):
+                        uncertain.add(param.ID)
+        if len(uncertain) == known:
+            return uncertain
+
+
+class Folded(object):
+
+    def __init__(self, node, type, value=None, constant=False):
+        self.node = node
+        self.type = type
+        self.value = value          # runtime value when constant
+        self.constant = constant
+
+
+# Constant folding and algebraic simplification of a type checked program,
+# after the rules of the Scala simplifier:
+#   - BinExpr of int and string constants are evaluated with the operators
+#     of the Interpreter; comparisons keep their node, their value is only
+#     used by enclosing expressions and conditions
+#   - x + 0, 0 + x, x - 0, x * 1, 1 * x, x / 1 give x and x - x gives 0 when
+#     x is an int at run time (see uncertainInts); floats are left alone
+#     because the interpreters keep them as their source text, on which
+#     these are not identities and raise
+#   - PareExpr wrappers are dropped
+#   - if with a constant condition is replaced by the taken branch and while
+#     with a false one is removed
+# Expression visitors return a Folded, instruction visitors the replacement
+# instruction or None when it is removed.
+class Simplifier(NodeVisitor):
+
+    def __init__(self):
+        self.table = SymbolTable(None, "root")
+        self.type = None
+        self.uncertain = set()
+
+    def simplify(self, program):
+        self.uncertain = uncertainInts(program)
+        self.visit(program)
+        return program
+
+    # an expression used as an instruction gives a Folded
+    def statement(self, node):
+        instruction = self.visit(node)
+        return instruction.node if isinstance(instruction, Folded) else instruction
+
+    def instructions(self, node):
+        kept = []
+        for instruction in node.list:
+            instruction = self.statement(instruction)
+            if instruction is not None:
+                kept.append(instruction)
+        node.list = kept
+
+    # where the grammar needs an instruction, a removed one becomes {}
+    def instruction(self, node):
+        instruction = self.statement(node)
+        return CompoundInstr(None, Instructions()) if instruction is None else instruction
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.visit(node.dec)
+        self.visit(node.func)
+        if node.inst is not None:
+            self.instructions(node.inst)
+
+    def visit_Declaration(self, node):
+        self.type = node.type
+        self.visit(node.inits)
+        self.type = None
+
+    def visit_Init(self, node):
+        node.expr = self.visit(node.expr).node
+        self.table.put(node.ID, VariableSymbol(node.ID, self.type))
+
+    def visit_FunDef(self, node):
+        self.table.put(node.ID, FunctionSymbol(node.ID, node.type, None))
+        self.table = SymbolTable(self.table, "function")
+        if node.args_list is not None:
+            for arg in node.args_list.list:
+                self.table.put(arg.ID, VariableSymbol(arg.ID, arg.type))
+        self.visit(node.compound_instr)
+        self.table = self.table.getParentScope()
+
+    def visit_PrintInstr(self, node):
+        node.expr_list.list = [self.visit(expr).node for expr in node.expr_list.list]
+        return node
+
+    def visit_LabeledInstr(self, node):
+        # the interpreters do not run labeled instructions
+        return node
+
+    def visit_Assignment(self, node):
+        node.expression = self.visit(node.expression).node
+        return node
+
+    def visit_ChoiceInstr(self, node):
+        cond = self.visit(node.cond)
+        if cond.constant:
+            if cond.value:
+                return self.statement(node.instr_1)
+            return None if node.instr_2 is None else self.statement(node.instr_2)
+        node.cond = cond.node
+        node.instr_1 = self.instruction(node.instr_1)
+        if node.instr_2 is not None:
+            node.instr_2 = self.statement(node.instr_2)
+        return node
+
+    def visit_WhileInstr(self, node):
+        cond = self.visit(node.cond)
+        if cond.constant and not cond.value:
+            return None
+        node.cond = cond.node
+        node.instr = self.instruction(node.instr)
+        return node
+
+    def visit_RepeatInstr(self, node):
+        self.instructions(node.instructions)
+        node.cond = self.visit(node.cond).node
+        return node
+
+    def visit_ReturnInstr(self, node):
+        node.expr = self.visit(node.expr).node
+        return node
+
+    def visit_ContinueInstr(self, node):
+        return node
+
+    def visit_BreakInstr(self, node):
+        return node
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        self.visit(node.declarations)
+        self.instructions(node.instructions_opt)
+        self.table = self.table.getParentScope()
+        return node
+
+    def visit_Const(self, node):
+        if isinstance(node.const, Integer):
+            return Folded(node, 'int', int(node.const.const), True)
+        if isinstance(node.const, String):
+            return Folded(node, 'string', node.const.const, True)
+        return Folded(node, 'float')
+
+    def visit_Variable(self, node):
+        symbol = self.table.getAny(node.name)
+        return Folded(node, symbol.type if isinstance(symbol, VariableSymbol) else None)
+
+    def visit_IDPareExpr(self, node):
+        if node.expr_list is not None:
+            node.expr_list.list = [self.visit(expr).node for expr in node.expr_list.list]
+        symbol = self.table.getAny(node.ID)
+        return Folded(node, symbol.type if isinstance(symbol, FunctionSymbol) else None)
+
+    def visit_PareExpr(self, node):
+        return self.visit(node.expr)
+
+    def visit_BinExpr(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        op = node.op
+        type = ttype[op][left.type][right.type]
+        node.left = left.node
+        node.right = right.node
+
+        if left.constant and right.constant and type is not None:
+            folded = self.fold(node, type, left.value, right.value)
+            if folded is not None:
+                return folded
+
+        if type == 'int' and left.type == 'int' and right.type == 'int' \
+                and runtimeInt(left.node, self.uncertain) and runtimeInt(right.node, self.uncertain):
+            if self.isConstant(right, 0) and op in ('+', '-') or self.isConstant(right, 1) and op in ('*', '/'):
+                return left
+            if self.isConstant(left, 0) and op == '+' or self.isConstant(left, 1) and op == '*':
+                return right
+            if op == '-' and isinstance(left.node, Variable) and isinstance(right.node, Variable) \
+                    and left.node.name == right.node.name:
+                return self.constant(node, 0)
+
+        return Folded(node, type)
+
+    def isConstant(self, folded, value):
+        return folded.constant and type(folded.value) is int and folded.value == value
+
+    def fold(self, node, type, left, right):
+        op = node.op
+        # do not build huge values just to throw them away
+        if op == '<<' and right > MAX_CONST_LENGTH * 4:
+            return None
+        if op == '*' and isinstance(left, str) and len(left) * right > MAX_CONST_LENGTH:
+            return None
+        try:
+            value = ops[op](left, right)
+        except (ArithmeticError, ValueError, TypeError):
+            return None
+        if isinstance(value, bool):
+            return Folded(node, type, value, True)
+        if isinstance(value, (int, long)) and len(str(value)) <= MAX_CONST_LENGTH:
+            return self.constant(node, value)
+        if isinstance(value, str) and len(value) <= MAX_CONST_LENGTH:
+            return Folded(Const(String('"' + value + '"', node.line), 0), 'string', value, True)
+        return None
+
+    def constant(self, node, value):
+        return Folded(Const(Integer(str(value), node.line), 0), 'int', value, True)
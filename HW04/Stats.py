@@ -0,0 +1,72 @@
+import json
+import resource
+import time
+from contextlib import contextmanager
+
+from AST import size
+
+
+# ru_maxrss is in KB on Linux
+def peakRSS():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Wall time, CPU time (time.clock) and memory of the phases main runs, in
+# the order they ran, with counts such as tokens and AST nodes. Python 2 has
+# no tracemalloc, so memory is the peak resident set size of the process
+# when a phase ends, and how much the phase raised it: a phase that stays
+# under the peak of an earlier one shows no growth.
+class Stats(object):
+
+    def __init__(self):
+        self.phases = []
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu, rss = time.time(), time.clock(), peakRSS()
+        try:
+            yield
+        finally:
+            peak = peakRSS()
+            self.phases.append({'phase': name,
+                                'wall_ms': (time.time() - wall) * 1000,
+                                'cpu_ms': (time.clock() - cpu) * 1000,
+                                'peak_rss_kb': peak // 1024,
+                                'peak_growth_kb': (peak - rss) // 1024})
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def countNodes(self, name, ast):
+        self.count(name, size(ast))
+
+    # makes <scanner> count the tokens it returns, under 'tokens'. The token
+    # method is wrapped once input is given, as FastScanner replaces it then.
+    def countTokens(self, scanner):
+        start = scanner.input
+        self.counts['tokens'] = 0
+
+        def input(text):
+            start(text)
+            token = scanner.token
+
+            def counting():
+                tok = token()
+                if tok is not None:
+                    self.counts['tokens'] += 1
+                return tok
+            scanner.token = counting
+        scanner.input = input
+
+    def report(self):
+        res = "{:<12} {:>10} {:>10} {:>14} {:>14}\n".format("phase", "wall (ms)", "cpu (ms)",
+                                                           "peak RSS (KB)", "growth (KB)")
+        for phase in self.phases:
+            res += "{phase:<12} {wall_ms:>10.2f} {cpu_ms:>10.2f} {peak_rss_kb:>14} {peak_growth_kb:>14}\n".format(**phase)
+        for name in sorted(self.counts):
+            res += "{:<12} {:>10}\n".format(name, self.counts[name])
+        return res
+
+    def toJSON(self):
+        return json.dumps({'phases': self.phases, 'counts': self.counts}, indent=2, sort_keys=True)
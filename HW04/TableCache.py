@@ -0,0 +1,91 @@
+import hashlib
+import imp
+import inspect
+import os
+
+import ply
+import ply.lex as lex
+import ply.yacc as yacc
+
+from Cparser import Cparser
+from scanner import Scanner
+
+
+# bump when the layout of the cached tables changes
+TABLES_VERSION = 1
+
+
+def grammarHash():
+    parts = [str(TABLES_VERSION), ply.__version__]
+
+    parts.append(repr(Cparser.tokens))
+    parts.append(repr(Cparser.precedence))
+    rules = [getattr(Cparser, name) for name in dir(Cparser) if name.startswith('p_')]
+    for rule in sorted(rules, key=lambda f: f.__name__):
+        parts.append(rule.__name__ + ':' + (rule.__doc__ or ''))
+
+    parts.append(repr(Scanner.literals))
+    parts.append(repr(sorted(Scanner.reserved.items())))
+    parts.append(repr(Scanner.t_ignore))
+    rules = [(name, getattr(Scanner, name)) for name in dir(Scanner) if name.startswith('t_')]
+    functions = [(name, rule) for name, rule in rules if inspect.ismethod(rule)]
+    strings = [(name, rule) for name, rule in rules if isinstance(rule, str)]
+    # ply tries function rules in definition order
+    for name, rule in sorted(functions, key=lambda item: item[1].func_code.co_firstlineno):
+        parts.append(name + ':' + (rule.__doc__ or ''))
+    for name, rule in sorted(strings):
+        parts.append(name + ':' + rule)
+
+    return hashlib.sha1('\n'.join(parts)).hexdigest()[:16]
+
+
+# Keeps the lexer and LALR tables built by ply in <directory>, keyed by the
+# hash of the grammar, so a run with unchanged grammar loads them instead of
+# validating the grammar and regenerating the tables. Debug output
+# (parser.out, conflict warnings) is never written.
+class TableCache(object):
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.key = grammarHash()
+
+    def lexTabName(self):
+        return 'lextab_' + self.key
+
+    def parseTabPath(self):
+        return os.path.join(self.directory, 'parsetab_' + self.key + '.pickle')
+
+    def makeDirectory(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def discard(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def lexer(self, scanner):
+        name = self.lexTabName()
+        path = os.path.join(self.directory, name + '.py')
+        if os.path.exists(path):
+            try:
+                return lex.lex(object=scanner, optimize=1, lextab=imp.load_source(name, path),
+                               errorlog=lex.NullLogger())
+            except Exception:
+                self.discard(path)
+                self.discard(path + 'c')
+
+        self.makeDirectory()
+        return lex.lex(object=scanner, optimize=1, lextab=name, outputdir=self.directory,
+                       errorlog=lex.NullLogger())
+
+    def parser(self, cparser):
+        path = self.parseTabPath()
+        self.makeDirectory()
+        try:
+            return yacc.yacc(module=cparser, debug=False, optimize=True, picklefile=path,
+                             errorlog=yacc.NullLogger())
+        except Exception:
+            # corrupt pickle, build the tables again
+            self.discard(path)
+            return yacc.yacc(module=cparser, debug=False, optimize=True, picklefile=path,
+                             errorlog=yacc.NullLogger())
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+
+from AST import *
+from TypeChecker import NodeVisitor
+
+
+# the call <expr> makes if it is nothing but a call of function <name>
+def selfCall(expr, name):
+    while isinstance(expr, PareExpr):
+        expr = expr.expr
+    if isinstance(expr, IDPareExpr) and expr.ID == name:
+        return expr
+    return None
+
+
+# Marks the tail calls of self-recursive functions: a return instruction in
+# the body of f whose expression is a call of f gets that IDPareExpr as its
+# `tail`. The engines evaluate the arguments and rerun the body in the frame
+# of the current call instead of calling f again.
+class TailCallMarker(NodeVisitor):
+
+    def __init__(self):
+        self.function = None
+
+    def mark(self, program):
+        self.visit(program)
+        return program
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.visit(node.func)
+
+    def visit_FunDef(self, node):
+        self.function = node.ID
+        self.visit(node.compound_instr)
+        self.function = None
+
+    def visit_CompoundInstr(self, node):
+        self.visit(node.instructions_opt)
+
+    def visit_LabeledInstr(self, node):
+        self.visit(node.instruction)
+
+    def visit_ChoiceInstr(self, node):
+        self.visit(node.instr_1)
+        self.visit(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        self.visit(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        self.visit(node.instructions)
+
+    def visit_ReturnInstr(self, node):
+        node.tail = selfCall(node.expr, self.function)
+
+    def visit_PrintInstr(self, node):
+        pass
+
+    def visit_Assignment(self, node):
+        pass
+
+    def visit_ContinueInstr(self, node):
+        pass
+
+    def visit_BreakInstr(self, node):
+        pass
+
+    def visit_IDPareExpr(self, node):
+        pass
+
+    def visit_BinExpr(self, node):
+        pass
+
+    def visit_PareExpr(self, node):
+        pass
+
+    def visit_Const(self, node):
+        pass
+
+    def visit_Variable(self, node):
+        pass
@@ -0,0 +1,297 @@
+#!/usr/bin/python
+import hashlib
+import marshal
+import os
+import re
+import sys
+import tempfile
+
+from AST import *
+from SymbolTable import *
+from TypeChecker import NodeVisitor
+from Exceptions import CompileError
+from ASTCache import FRONT_END, sourceVersion
+import DeadCode
+import Inliner
+import LoopOptimizer
+import Memoization
+import Simplifier
+import TailCalls
+
+
+MAGIC = 'hw04-py-cache'
+
+# generated code runs in a module of its own, so every operator maps to the
+# python one; && and || are the bitwise operators Interpreter.ops uses
+PY_OPS = {'&&': '&', '||': '|'}
+
+EXPRESSIONS = (Const, Variable, IDPareExpr, PareExpr, BinExpr)
+
+# modules besides the front end and this one whose code decides the python
+# generated for a source
+PIPELINE = [DeadCode, Inliner, LoopOptimizer, Memoization, Simplifier, TailCalls]
+
+
+class PyVariable(VariableSymbol):
+
+    def __init__(self, name, pyname, isGlobal):
+        VariableSymbol.__init__(self, name, None)
+        self.pyname = pyname
+        self.isGlobal = isGlobal
+
+
+# Translates a type checked Program to the source of a python module.
+# Scoping is static, as in Resolver: every declaration gets a python name of
+# its own, v<number>_<name>, so variables of nested blocks that shadow outer
+# ones are distinct locals and no name clashes with a python keyword or
+# builtin. Functions become f_<name> defs, declaring the top level
+# variables they assign global. while is a python while loop; repeat is one
+# whose test skips the condition on the first pass, which keeps continue
+# going through the condition as in the other engines.
+class Transpiler(NodeVisitor):
+
+    def __init__(self):
+        self.root = SymbolTable(None, "root")
+        self.table = self.root
+        self.lines = []
+        self.depth = 0
+        self.count = 0
+        self.loops = 0                  # loops around the instruction visited
+        self.function = None            # globals assigned by the function generated
+
+    def transpile(self, program):
+        self.visit(program)
+        if not self.lines:
+            self.emit("pass")
+        return "\n".join(self.lines) + "\n"
+
+    def emit(self, line):
+        self.lines.append("    " * self.depth + line)
+
+    def fresh(self, prefix, name):
+        self.count += 1
+        return "{}{}_{}".format(prefix, self.count, re.sub(r'\W', '_', name))
+
+    def declare(self, name, line):
+        if self.table.get(name) is not None:
+            raise CompileError("Variable '{}' already declared: line {}".format(name, line))
+        symbol = PyVariable(name, self.fresh('v', name), self.function is None)
+        self.table.put(name, symbol)
+        return symbol
+
+    def lookup(self, name, line):
+        symbol = self.table.getAny(name)
+        if not isinstance(symbol, PyVariable):
+            raise CompileError("Usage of undeclared variable '{}': line {}".format(name, line))
+        return symbol
+
+    # expressions used as instructions become expression statements
+    def statement(self, node):
+        if isinstance(node, EXPRESSIONS):
+            self.emit(self.visit(node))
+        else:
+            self.visit(node)
+
+    # emits <instr> as the body of a block, or pass if it emits nothing
+    def body(self, instr):
+        start = len(self.lines)
+        self.depth += 1
+        self.statement(instr)
+        if len(self.lines) == start:
+            self.emit("pass")
+        self.depth -= 1
+
+    # instructions
+
+    def visit_Program(self, node):
+        self.visit(node.elements)
+
+    def visit_Element(self, node):
+        self.visit(node.dec)
+        self.visit(node.func)
+        if node.inst is not None:
+            self.statement(node.inst)
+
+    def visit_Declaration(self, node):
+        self.visit(node.inits)
+
+    def visit_Init(self, node):
+        expr = self.visit(node.expr)
+        self.emit("{} = {}".format(self.declare(node.ID, node.line).pyname, expr))
+
+    def visit_PrintInstr(self, node):
+        for expr in node.expr_list.list:
+            self.emit("print {}".format(self.visit(expr)))
+
+    def visit_LabeledInstr(self, node):
+        # the interpreters do not run labeled instructions
+        pass
+
+    def visit_Assignment(self, node):
+        expr = self.visit(node.expression)
+        symbol = self.lookup(node.ID, node.line)
+        if symbol.isGlobal and self.function is not None:
+            self.function.add(symbol.pyname)
+        self.emit("{} = {}".format(symbol.pyname, expr))
+
+    def visit_ChoiceInstr(self, node):
+        self.emit("if {}:".format(self.visit(node.cond)))
+        self.body(node.instr_1)
+        if node.instr_2 is not None:
+            self.emit("else:")
+            self.body(node.instr_2)
+
+    def visit_WhileInstr(self, node):
+        self.emit("while {}:".format(self.visit(node.cond)))
+        self.loopBody(node.instr)
+
+    def visit_RepeatInstr(self, node):
+        first = self.fresh('r', 'first')
+        self.emit("{} = True".format(first))
+        self.emit("while {} or not {}:".format(first, self.visit(node.cond)))
+        self.depth += 1
+        self.emit("{} = False".format(first))
+        self.depth -= 1
+        self.loopBody(node.instructions)
+
+    def loopBody(self, instr):
+        self.loops += 1
+        self.body(instr)
+        self.loops -= 1
+
+    def visit_ReturnInstr(self, node):
+        self.emit("return {}".format(self.visit(node.expr)))
+
+    def visit_ContinueInstr(self, node):
+        if not self.loops:
+            raise CompileError("continue instruction outside a loop: line {}".format(node.line))
+        self.emit("continue")
+
+    def visit_BreakInstr(self, node):
+        if not self.loops:
+            raise CompileError("break instruction outside a loop: line {}".format(node.line))
+        self.emit("break")
+
+    def visit_Instructions(self, node):
+        for instr in node.list:
+            self.statement(instr)
+
+    def visit_CompoundInstr(self, node):
+        self.table = SymbolTable(self.table, "child")
+        self.visit(node.declarations)
+        self.visit(node.instructions_opt)
+        self.table = self.table.getParentScope()
+
+    def visit_FunDef(self, node):
+        params = [] if node.args_list is None else [arg.ID for arg in node.args_list.list]
+        outer = self.table, self.lines, self.depth
+        self.table = SymbolTable(self.root, "function")
+        self.function = set()
+        pynames = [self.declare(name, node.line).pyname for name in params]
+        self.lines, self.depth = [], 1
+        self.visit(node.compound_instr)
+        body, assigned = self.lines, self.function
+        self.table, self.lines, self.depth = outer
+        self.function = None
+
+        self.emit("def f_{}({}):".format(node.ID, ", ".join(pynames)))
+        if assigned:
+            self.emit("    global {}".format(", ".join(sorted(assigned))))
+        self.lines.extend(body or ["    " * (self.depth + 1) + "pass"])
+
+    # expressions give their python source
+
+    def visit_Const(self, node):
+        if isinstance(node.const, Integer):
+            return repr(int(node.const.const))
+        # floats are kept as their source text, as in the Interpreter
+        return repr(node.const.const)
+
+    def visit_Variable(self, node):
+        return self.lookup(node.name, node.line).pyname
+
+    def visit_IDPareExpr(self, node):
+        args = [] if node.expr_list is None else [self.visit(expr) for expr in node.expr_list.list]
+        return "f_{}({})".format(node.ID, ", ".join(args))
+
+    def visit_PareExpr(self, node):
+        return self.visit(node.expr)
+
+    def visit_BinExpr(self, node):
+        return "({} {} {})".format(self.visit(node.left), PY_OPS.get(node.op, node.op), self.visit(node.right))
+
+
+# code object of the python module generated for <program>
+def compileProgram(program, filename='<hw04>'):
+    return compileSource(Transpiler().transpile(program), filename)
+
+
+def compileSource(source, filename='<hw04>'):
+    # dont_inherit: / is the integer division of Interpreter.ops whatever
+    # the __future__ imports of the caller
+    return compile(source, filename, 'exec', 0, True)
+
+
+def run(code):
+    limit = sys.getrecursionlimit()
+    # one python frame per call of the program
+    sys.setrecursionlimit(max(limit, 10000))
+    try:
+        exec code in {'__name__': '__hw04__'}
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+# On-disk cache of the compiled modules, one marshal file per program, like
+# a .pyc next to its .py: it is named after the hash of the program source,
+# the python version, the code of the front end, the passes and the
+# Transpiler, and the <options> they run with, so a hit runs the code object
+# without parsing, checking or transpiling the source again. The diagnostics
+# printed on the way are stored with it, to be replayed.
+class CodeCache(object):
+
+    def __init__(self, directory, options=''):
+        self.directory = directory
+        modules = FRONT_END + PIPELINE + [sys.modules[__name__]]
+        self.version = "{}:{}:{}:{}".format(MAGIC, sys.version, sourceVersion(modules), options)
+
+    def key(self, text):
+        return hashlib.sha1(self.version + '\0' + text).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pyc')
+
+    # (diagnostics, code) compiled from <text>, or None
+    def load(self, text):
+        key = self.key(text)
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                stored_key, diagnostics, code = marshal.load(f)
+            if stored_key != key:
+                raise ValueError("not an entry of this cache")
+        except Exception:
+            self.discard(path)
+            return None
+        return diagnostics, code
+
+    def store(self, text, diagnostics, code):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        key = self.key(text)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump((key, diagnostics, code), f)
+            os.rename(tmp, self.path(key))
+        except Exception:
+            self.discard(tmp)
+            raise
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -187,7 +187,8 @@ class TypeChecker(NodeVisitor):
         return 'string'
 
     def visit_Const(self, node):
-        return self.visit(node.const)
+        node.type = self.visit(node.const)
+        return node.type
 
     def visit_Variable(self, node):
         var_type = self.table.getAny(node.name)
@@ -196,7 +197,8 @@ class TypeChecker(NodeVisitor):
         elif isinstance(var_type, FunctionSymbol):
             print "Error: Function identifier '{}' used as a variable: line {}".format(node.name, node.line)
         else:
-            return var_type.type
+            node.type = var_type.type
+            return node.type
 
     def visit_IDPareExpr(self, node):
         fun_option = self.table.getAny(node.ID)
@@ -212,10 +214,12 @@ class TypeChecker(NodeVisitor):
                     if ttype['='][declared][current] is None:
                         print "Error: Improper type of args in {} call: line {}".format(fun_option.name, node.line)
                         break
-            return fun_option.type
+            node.type = fun_option.type
+            return node.type
 
     def visit_PareExpr(self, node):
-        return self.visit(node.expr)
+        node.type = self.visit(node.expr)
+        return node.type
 
     def visit_BinExpr(self, node):
                                           # alternative usage,
@@ -225,7 +229,8 @@ class TypeChecker(NodeVisitor):
         op = node.op
         if ttype[op][type1][type2] is None and type1 is not None and type2 is not None:
             print "Error: Illegal operation, {} {} {}: line {}".format(type1, op, type2, node.line)
-        return ttype[op][type1][type2]
+        node.type = ttype[op][type1][type2]
+        return node.type
 
     def visit_FunDef(self, node):
         fun_name = self.table.get(node.ID)
@@ -0,0 +1,158 @@
+from Memory import *
+from Exceptions import StackOverflowError
+from Interpreter import ops
+from Bytecode import *
+
+
+# rough heap cost of one call (measured with ru_maxrss): the Frame, its
+# operand stack and the Memory of the callee
+FRAME_BYTES = 2048
+
+
+class Frame(object):
+
+    def __init__(self, code, base):
+        self.code = code
+        self.pc = 0
+        self.stack = []
+        self.base = base            # length of fun_stack to restore on return
+
+
+# Memory holding local <name> of the running function, whose block memories
+# are scopes[base:], or None. Locals never live in the memories of callers,
+# so a lookup costs the block depth of the function, not the call depth.
+def scopeOf(scopes, base, name):
+    for i in xrange(len(scopes) - 1, base - 1, -1):
+        if scopes[i].mem_dict.get(name) is not None:
+            return scopes[i]
+    return None
+
+
+# User calls push a Frame on a plain list instead of recursing in python, so
+# the host stack stays flat and recursion depth is bounded by <memory_budget>
+# (in bytes) only.
+class VM(object):
+
+    def __init__(self, memory_budget=256 * 1024 * 1024):
+        self.fun_stack = MemoryStack()
+        self.fun_stack.pop()
+        self.global_stack = MemoryStack()
+        self.functions = {}
+        self.binary_ops = [ops[op] for op in binary_ops]
+        self.memory_budget = memory_budget
+        self.max_depth = memory_budget // FRAME_BYTES
+
+    # executes code object <code> and returns the value of its RETURN
+    def run(self, code):
+        fun_stack = self.fun_stack
+        global_stack = self.global_stack
+        functions = self.functions
+        binary = self.binary_ops
+        max_depth = self.max_depth
+        frames = []
+
+        frame = Frame(code, 0)
+        base = 0
+        instructions = code.code
+        consts = code.consts
+        names = code.names
+        scope_stack = fun_stack if code.isFunction() else global_stack
+        stack = frame.stack
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if op == LOAD_LOCAL:
+                name = names[arg]
+                memory = scopeOf(fun_stack.stack, base, name)
+                push(global_stack.get(name) if memory is None else memory.mem_dict[name])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == BINARY_OP:
+                right = pop()
+                stack[-1] = binary[arg](stack[-1], right)
+            elif op == JUMP_IF_TRUE:
+                if pop():
+                    pc = arg
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == LOAD_GLOBAL:
+                push(global_stack.get(names[arg]))
+            elif op == STORE_LOCAL:
+                name = names[arg]
+                memory = scopeOf(fun_stack.stack, base, name)
+                if memory is None:
+                    global_stack.set(name, pop())
+                else:
+                    memory.mem_dict[name] = pop()
+            elif op == STORE_GLOBAL:
+                global_stack.set(names[arg], pop())
+            elif op == CALL:
+                argc = arg & ((1 << CALL_ARGC_BITS) - 1)
+                function = functions[names[arg >> CALL_ARGC_BITS]]
+                fun_mem = Memory(function.name, True)
+                if argc:
+                    for param, value in zip(function.params, stack[-argc:]):
+                        fun_mem.put(param, value)
+                    del stack[-argc:]
+                if len(frames) >= max_depth:
+                    raise StackOverflowError("call of {} exceeds the memory budget of {} bytes at depth {}".format(
+                        function.name, self.memory_budget, len(frames)))
+                frame.pc = pc
+                frames.append(frame)
+                base = len(fun_stack.stack)
+                frame = Frame(function, base)
+                fun_stack.push(fun_mem)
+
+                code = function
+                instructions = code.code
+                consts = code.consts
+                names = code.names
+                scope_stack = fun_stack
+                stack = frame.stack
+                push = stack.append
+                pop = stack.pop
+                pc = 0
+            elif op == RETURN:
+                value = pop()
+                if len(frames) == 0:
+                    return value
+                del fun_stack.stack[frame.base:]
+                frame = frames.pop()
+                base = frame.base
+
+                code = frame.code
+                instructions = code.code
+                consts = code.consts
+                names = code.names
+                scope_stack = fun_stack if code.isFunction() else global_stack
+                stack = frame.stack
+                push = stack.append
+                pop = stack.pop
+                pc = frame.pc
+                push(value)
+            elif op == ENTER_SCOPE:
+                scope_stack.push(Memory('compound'))
+            elif op == LEAVE_SCOPE:
+                del scope_stack.stack[-arg:]
+            elif op == INIT_LOCAL:
+                fun_stack.insert(names[arg], pop())
+            elif op == INIT_GLOBAL:
+                global_stack.insert(names[arg], pop())
+            elif op == PRINT:
+                print pop()
+            elif op == POP:
+                pop()
+            elif op == DEF_FUNCTION:
+                function = consts[arg]
+                functions[function.name] = function
+            else:
+                raise RuntimeError("unknown opcode {} at {} in {}".format(op, pc - 2, code.name))
@@ -1,7 +1,38 @@
 #!/usr/bin/env python
 import filecmp
+import json
+import subprocess
+import tempfile
 import unittest
 import os
+import shutil
+
+# main.py options other than the defaults, checked against the same .expected files
+VARIANTS = [('completion', ['--engine', 'completion']),
+            ('resolved', ['--engine', 'resolved']),
+            ('closure', ['--engine', 'closure']),
+            ('closure_generic', ['--engine', 'closure', '--no-specialize']),
+            ('vm', ['--engine', 'vm']),
+            ('ir', ['--engine', 'ir']),
+            ('python', ['--engine', 'python']),
+            ('c', ['--engine', 'c']),
+            ('profile', ['--profile-json', os.devnull]),
+            ('budget', ['--fuel', '100000000', '--timeout', '600', '--max-memory', '4096']),
+            ('fast_lexer', ['--lexer', 'fast']),
+            ('pratt', ['--parser', 'pratt', '--lexer', 'fast']),
+            ('stream', ['--stream', 'mmap']),
+            ('optimized', ['-O']),
+            ('optimized_completion', ['-O', '--engine', 'completion']),
+            ('no_memo', ['-O', '--no-memo']),
+            ('optimized_resolved', ['-O', '--engine', 'resolved']),
+            ('optimized_closure', ['-O', '--engine', 'closure']),
+            ('optimized_vm', ['-O', '--engine', 'vm']),
+            ('optimized_python', ['-O', '--engine', 'python']),
+            ('optimized_c', ['-O', '--engine', 'c']),
+            ('no_inline', ['-O', '--no-inline']),
+            ('no_simplify', ['-O', '--no-simplify']),
+            ('no_dce', ['-O', '--no-dce']),
+            ('no_loop_opt', ['-O', '--no-loop-opt'])]
 
 class AcceptanceTests(unittest.TestCase):
 
@@ -16,13 +47,123 @@ class AcceptanceTests(unittest.TestCase):
             return 'test_' + filename
 
         def test_func(self):
-            os.system("python main.py tests/{0} > tests/{1}.actual".format(filename,name))
+            os.system("python main.py tests/{0} > tests/{1}.actual 2> {2}".format(filename, name, os.devnull))
             res = filecmp.cmp("tests/{0}.actual".format(name), "tests/{0}.expected".format(name))
             self.assertTrue(res, "files {0}.actual and {0}.expected differ".format(name))
 
         func_name = file2func_name(name)
         setattr(cls, func_name, test_func)
 
+        for variant, options in VARIANTS:
+            cls.add_variant_test(variant, options, filename, name)
+
+    @classmethod
+    def add_variant_test(cls, variant, options, filename, name):
+
+        def test_func(self):
+            # a program may end with an error, as dead_code does: only its output is compared
+            process = subprocess.Popen(["python", "main.py"] + options + ["tests/{0}".format(filename)],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            actual = process.communicate()[0]
+            with open("tests/{0}.expected".format(name)) as expected:
+                self.assertEqual(actual, expected.read(), "{0} output differs from {1}.expected".format(variant, name))
+
+        setattr(cls, 'test_{0}_{1}'.format(variant, name), test_func)
+
+    def test_vm_deep_recursion(self):
+        # deeper than the visitor engines can go with the recursion limit of 10000
+        source = tempfile.NamedTemporaryFile(suffix='.in', delete=False)
+        source.write("int sum(int n) {\n  if (n == 0) return 0;\n  return n + sum(n - 1);\n}\nprint sum(20000);\n")
+        source.close()
+        try:
+            actual = subprocess.check_output(["python", "main.py", "--engine", "vm", source.name])
+        finally:
+            os.remove(source.name)
+        self.assertEqual(actual, "200010000\n")
+
+    def test_budget_limits(self):
+        # an endless loop and a runaway recursion stopped by each limit, reported on stdout with status 3
+        loop = "int i = 0;\nwhile (1) i = i + 1;\n"
+        recursion = "int f(int n) {\n  return f(n + 1) + 1;\n}\nprint f(0);\n"
+        stack = r"Error: recursion exceeds the python stack after \d+ steps\n$"
+        cases = [(loop, ['--fuel', '1000'], r"Error: out of fuel after 1000 steps\n$"),
+                 (recursion, ['--fuel', '100'], r"Error: out of fuel after 100 steps\n$"),
+                 (recursion, ['--fuel', '100000000'], stack),
+                 (loop, ['--timeout', '0.2'], r"Error: time limit of 0.2 s exceeded after \d+ steps\n$"),
+                 (recursion, ['--timeout', '600'], stack),
+                 (loop, ['--max-memory', '1'], r"Error: memory limit of 1048576 bytes exceeded after 1024 steps\n$"),
+                 (recursion, ['--max-memory', '1', '--budget-interval', '16'],
+                  r"Error: memory limit of 1048576 bytes exceeded after 16 steps\n$")]
+        for program, options, message in cases:
+            source = tempfile.NamedTemporaryFile(suffix='.in', delete=False)
+            source.write(program)
+            source.close()
+            try:
+                for engine in ['visitor', 'completion', 'resolved']:
+                    process = subprocess.Popen(["python", "main.py", "--engine", engine] + options + [source.name],
+                                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    out, err = process.communicate()
+                    self.assertEqual((process.returncode, err), (3, ""), (engine, options))
+                    self.assertRegexpMatches(out, message)
+            finally:
+                os.remove(source.name)
+
+    def test_profile_and_stats(self):
+        directory = tempfile.mkdtemp()
+        profile, collapsed, stats = [os.path.join(directory, name) for name in ['profile.json', 'stacks', 'stats.json']]
+        try:
+            subprocess.check_output(["python", "main.py", "--profile-json", profile, "--profile-collapsed", collapsed,
+                                     "--stats-json", stats, "tests/fib.in"])
+            with open(profile) as f:
+                profile = json.load(f)
+            with open(collapsed) as f:
+                collapsed = f.read().splitlines()
+            with open(stats) as f:
+                stats = json.load(f)
+        finally:
+            shutil.rmtree(directory)
+        # fib(0..15) makes 5150 calls, trib(0..15) 13348
+        self.assertEqual([(function['name'], function['count']) for function in profile['functions']],
+                         [('fib', 5150), ('fib_iter', 16), ('trib', 13348)])
+        self.assertEqual([(loop['name'], loop['count']) for loop in profile['loops']],
+                         [('while@18', 14), ('while@56', 1), ('while@62', 1), ('while@68', 1)])
+        stacks = [line.rsplit(' ', 1)[0] for line in collapsed]
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed))
+        self.assertIn('<program>;while@62;fib_iter;while@18', stacks)
+        self.assertIn('<program>;while@56' + ';fib' * 15, stacks)
+        self.assertNotIn('<program>;while@56' + ';fib' * 16, stacks)
+        self.assertEqual([phase['phase'] for phase in stats['phases']], ['parse', 'typecheck', 'optimize', 'run'])
+        for phase in stats['phases']:
+            self.assertEqual(sorted(phase), ['cpu_ms', 'peak_growth_kb', 'peak_rss_kb', 'phase', 'wall_ms'])
+        self.assertEqual(stats['counts'], {'tokens': 275, 'parsed nodes': 235, 'run nodes': 235})
+
+    def test_compile_errors(self):
+        # the interpreters run it; the compilers reject it, as an error and not a traceback
+        source = tempfile.NamedTemporaryFile(suffix='.in', delete=False)
+        source.write("int i = 1;\nwhile (i < 3) i = i + 1;\ncontinue;\n")
+        source.close()
+        try:
+            for engine in ['vm', 'ir', 'python']:
+                process = subprocess.Popen(["python", "main.py", "--engine", engine, source.name],
+                                           stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                out, err = process.communicate()
+                self.assertEqual((process.returncode, err), (0, ""), engine)
+                self.assertTrue(out.endswith("Error: continue instruction outside a loop: line 3\n"), engine)
+        finally:
+            os.remove(source.name)
+
+    def test_ast_cache_front_ends(self):
+        # each lexer and parser gets its own entry, not the tree another one built
+        directory = tempfile.mkdtemp()
+        try:
+            for options in ([], ['--lexer', 'fast'], ['--parser', 'pratt', '--lexer', 'fast'], []):
+                subprocess.check_output(["python", "main.py", "--cache-ast", "--ast-cache", directory] + options
+                                        + ["tests/collatz.in"])
+            entries = [name for name in os.listdir(directory) if name.endswith('.ast')]
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(len(entries), 3)
+
     @classmethod
     def add_tests(cls, dir):
         for dirpath, dirnames, filenames in os.walk(dir):
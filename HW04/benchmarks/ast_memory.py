@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# Bytes per AST node of a large generated program with the __slots__ node
+# classes of AST.py, against the same nodes laid out with a per instance
+# __dict__ as they were before. Child nodes, lists and strings are shared
+# by both layouts and are not counted.
+#
+#   python benchmarks/ast_memory.py [statements]
+
+import sys
+import timeit
+from common import parse
+import AST
+
+
+def generate(statements):
+    lines = ["int x = 0, y = 1;"]
+    for i in range(statements):
+        lines.append("x = (x + {0}) * y - {0} / 3;".format(i))
+        lines.append("if (x > {0}) y = y + 1; else print x;".format(i))
+    return "\n".join(lines) + "\n"
+
+
+def fields(node):
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(node, name):
+                yield name, getattr(node, name)
+
+
+def nodes(root):
+    todo = [root]
+    while todo:
+        node = todo.pop()
+        yield node
+        for _, value in fields(node):
+            if isinstance(value, AST.Node):
+                todo.append(value)
+            elif isinstance(value, list):
+                todo.extend(item for item in value if isinstance(item, AST.Node))
+
+
+class DictNode(object):
+    pass
+
+
+def with_dict(node):
+    mirror = DictNode()
+    for name, value in fields(node):
+        setattr(mirror, name, value)
+    return mirror
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    ast = parse(generate(statements))
+
+    all_nodes = list(nodes(ast))
+    slotted = sum(sys.getsizeof(node) for node in all_nodes)
+    mirrors = [with_dict(node) for node in all_nodes]
+    dicted = sum(sys.getsizeof(node) + sys.getsizeof(node.__dict__) for node in mirrors)
+
+    binexpr = next(node for node in all_nodes if isinstance(node, AST.BinExpr))
+    mirror = with_dict(binexpr)
+    slot_access = min(timeit.repeat(lambda: binexpr.left, number=1000000, repeat=3))
+    dict_access = min(timeit.repeat(lambda: mirror.left, number=1000000, repeat=3))
+
+    print "{} nodes".format(len(all_nodes))
+    print "{:<10} {:>10} {:>16}".format("layout", "bytes/node", "attr access (ns)")
+    print "{:<10} {:>10.1f} {:>16.1f}".format("__dict__", float(dicted) / len(all_nodes), dict_access * 1000)
+    print "{:<10} {:>10.1f} {:>16.1f}".format("__slots__", float(slotted) / len(all_nodes), slot_access * 1000)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# Interpreter run time of a loop and of recursive calls with no limits and
+# with fuel, a deadline and a memory limit checked every 1024 steps, as
+# main.py does with --fuel, --timeout and --max-memory.
+#
+#   python benchmarks/budget.py [iterations]
+
+import os
+import sys
+from common import parse, best_of
+from Budget import Budget
+from Interpreter import Interpreter
+
+LOOP = """
+int i = 0, s = 0;
+while (i < %d) {
+    s = s + i %% 7;
+    i = i + 1;
+}
+print s;
+"""
+
+CALLS = """
+int fib(int n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+print fib(%d);
+"""
+
+
+def run(ast, limited):
+    budget = Budget(10 ** 9, 3600, 1 << 40) if limited else None
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(Interpreter(budget=budget))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print "{:<10} {:>14} {:>14}".format("", "no limit (ms)", "limited (ms)")
+    for name, program in [('loop', LOOP % iterations), ('fib', CALLS % 16)]:
+        ast = parse(program)
+        time = best_of(lambda: run(ast, False), repeat=7)
+        time_limited = best_of(lambda: run(ast, True), repeat=7)
+        print "{:<10} {:>14.1f} {:>14.1f}".format(name, time * 1000, time_limited * 1000)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Wall time of the collatz, gcd, primes and fact acceptance programs on the
+# Interpreter and as binaries built by the c engine (CBackend), including
+# the start of the process; build is the uncached time to generate the C
+# source and run cc on it.
+#
+#   python benchmarks/c_backend.py [repeat]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from common import parse
+from Interpreter import Interpreter
+from CBackend import CGenerator, CBackend
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests')
+
+
+def best_wall(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        fn()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def interpret(ast):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(Interpreter())
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    directory = tempfile.mkdtemp()
+    try:
+        print "{:<10} {:>16} {:>10} {:>12}".format("", "Interpreter (ms)", "c (ms)", "build (ms)")
+        for name in ["collatz", "gcd", "primes", "fact"]:
+            with open(os.path.join(TESTS, name + ".in")) as f:
+                ast = parse(f.read())
+            interpreted = best_wall(lambda: interpret(ast), repeat)
+            start = time.time()
+            backend = CBackend(directory)
+            binary = backend.build(CGenerator().generate(ast))
+            build = time.time() - start
+            compiled = best_wall(lambda: backend.run(binary), repeat)
+            print "{:<10} {:>16.2f} {:>10.2f} {:>12.1f}".format(
+                name, interpreted * 1000, compiled * 1000, build * 1000)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# Per-call and per-continue cost of exception based control flow
+# (Interpreter) against completion records (CompletionInterpreter).
+#
+#   python benchmarks/calls.py [iterations]
+
+import sys
+from common import parse, best_of
+from Interpreter import Interpreter, CompletionInterpreter
+
+
+LOOP = """
+int i = 0;
+while (i < %d) {
+    i = i + 1;
+}
+"""
+
+CALLS = """
+int i = 0;
+
+int id(int n) {
+    return n;
+}
+
+while (i < %d) {
+    id(i);
+    i = i + 1;
+}
+"""
+
+CONTINUES = """
+int i = 0;
+while (i < %d) {
+    i = i + 1;
+    continue;
+}
+"""
+
+
+def cost(engine, text, iterations):
+    ast = parse(text % iterations)
+    return best_of(lambda: ast.accept(engine()), repeat=9)
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print "{:<22} {:>14} {:>14}".format("", "call (us)", "continue (us)")
+    for engine in [Interpreter, CompletionInterpreter]:
+        loop = cost(engine, LOOP, iterations)
+        call = (cost(engine, CALLS, iterations) - loop) / iterations * 1e6
+        cont = (cost(engine, CONTINUES, iterations) - loop) / iterations * 1e6
+        print "{:<22} {:>14.2f} {:>14.2f}".format(engine.__name__, call, cont)
@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import ply.yacc as yacc
+from Cparser import Cparser
+from TypeChecker import TypeChecker
+
+
+def parse(text):
+    cparser = Cparser()
+    parser = yacc.yacc(module=cparser, write_tables=False, debug=False, errorlog=yacc.NullLogger())
+    ast = parser.parse(text, lexer=cparser.scanner)
+    typeChecker = TypeChecker()
+    ast.accept(typeChecker)
+    if typeChecker.haveErrors:
+        raise ValueError("benchmark program does not type check")
+    return ast
+
+
+# returns the best cpu time of <repeat> runs of <fn>
+def best_of(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.clock()
+        fn()
+        elapsed = time.clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# Node counts and Interpreter run time of a generated looking program full of
+# unused variables and of every acceptance test program, before and after
+# the DeadCodeEliminator.
+#
+#   python benchmarks/dead_code.py [iterations]
+
+import os
+import sys
+from common import parse, best_of
+from ast_memory import nodes
+from Interpreter import Interpreter
+from DeadCode import DeadCodeEliminator
+
+GENERATED = """
+int i = 0, total = 0;
+
+int step(int a) {
+    int t0 = a * 2, t1 = a + 3, t2 = a * a, t3 = t1 - t0;
+    int result = a + 1;
+    t2 = t2 + t3;
+    return result;
+    t0 = t0 + 1;
+}
+
+while (i < %d) {
+    int scratch = i * 3, copy = total;
+    total = total + step(i) %% 1000;
+    scratch = scratch + copy;
+    i = i + 1;
+}
+print total;
+"""
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests')
+
+
+def run(ast):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(Interpreter())
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    programs = [("generated", GENERATED % iterations)]
+    for filename in sorted(os.listdir(TESTS)):
+        if filename.endswith('.in'):
+            with open(os.path.join(TESTS, filename)) as f:
+                programs.append((os.path.splitext(filename)[0], f.read()))
+
+    print "{:<10} {:>8} {:>8} {:>12} {:>12}".format("test", "nodes", "after", "time (ms)", "after (ms)")
+    for name, text in programs:
+        ast = parse(text)
+        before = len(list(nodes(ast)))
+        time = best_of(lambda: run(ast), repeat=5)
+        ast = DeadCodeEliminator().eliminate(ast)
+        after = len(list(nodes(ast)))
+        time_after = best_of(lambda: run(ast), repeat=5)
+        print "{:<10} {:>8} {:>8} {:>12.2f} {:>12.2f}".format(name, before, after, time * 1000, time_after * 1000)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# Interpreter run time of a loop calling small helper functions and of
+# tests/collatz.in, with and without the Inliner.
+#
+#   python benchmarks/inlining.py [iterations]
+
+import os
+import sys
+from common import parse, best_of
+from Interpreter import Interpreter
+from Inliner import Inliner
+
+HELPERS = """
+int i = 0, total = 0;
+
+int square(int n) {
+    return n * n;
+}
+
+int clamp(int n, int limit) {
+    if (n > limit) return limit;
+    else return n;
+}
+
+while (i < %d) {
+    total = square(i);
+    total = clamp(total, 1000);
+    i = i + 1;
+}
+"""
+
+COLLATZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests', 'collatz.in')
+
+
+def run(ast):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(Interpreter())
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with open(COLLATZ) as f:
+        collatz = f.read()
+
+    print "{:<10} {:>12} {:>12}".format("", "calls (ms)", "inlined (ms)")
+    for name, text in [("helpers", HELPERS % iterations), ("collatz", collatz)]:
+        ast = parse(text)
+        calls = best_of(lambda: run(ast), repeat=5)
+        ast = Inliner().inline(ast)
+        inlined = best_of(lambda: run(ast), repeat=5)
+        print "{:<10} {:>12.1f} {:>12.1f}".format(name, calls * 1000, inlined * 1000)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# Lexing throughput of the ply based Scanner and of FastScanner on a
+# generated program, in MB of source per second. Also checks that both
+# produce the same token stream.
+#
+#   python benchmarks/lexing.py [statements]
+
+import sys
+from common import best_of
+from scanner import Scanner
+from FastScanner import FastScanner
+
+
+def generate(statements):
+    lines = ["int x = 0, y = 1;", "string s = \"text\";"]
+    for i in range(statements):
+        lines.append("# statement {0}".format(i))
+        lines.append("x = (x + {0}) * y - {0} / 3.5;".format(i))
+        lines.append("if (x >= {0} && y != 2) y = y << 1; else print s;".format(i))
+        if i % 100 == 0:
+            lines.append("/* block\n   comment */")
+    return "\n".join(lines) + "\n"
+
+
+def drain(scanner, text):
+    scanner.input(text)
+    tokens = []
+    token = scanner.token
+    tok = token()
+    while tok is not None:
+        tokens.append(tok)
+        tok = token()
+    return tokens
+
+
+def signature(tokens):
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in tokens]
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generate(statements)
+    megabytes = len(text) / (1024.0 * 1024.0)
+
+    ply_scanner = Scanner()
+    ply_scanner.build()
+    fast_scanner = FastScanner()
+
+    if signature(drain(ply_scanner, text)) != signature(drain(fast_scanner, text)):
+        print "token streams differ"
+        sys.exit(1)
+
+    print "{:.2f} MB, {} tokens".format(megabytes, len(drain(fast_scanner, text)))
+    for name, scanner in [("Scanner (ply)", ply_scanner), ("FastScanner", fast_scanner)]:
+        elapsed = best_of(lambda: drain(scanner, text), repeat=3)
+        print "{:<15} {:>8.2f} MB/s".format(name, megabytes / elapsed)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# Interpreter run time of loops with invariant expressions and products of
+# induction variables, and of every acceptance test program, with and
+# without the LoopOptimizer.
+#
+#   python benchmarks/loop_opt.py [iterations]
+
+import os
+import sys
+from common import parse, best_of
+from Interpreter import Interpreter
+from Simplifier import Simplifier
+from LoopOptimizer import LoopOptimizer
+
+MATRIX = """
+int rows = %d, cols = 40, i = 0, j = 0, sum = 0;
+while (i < rows) {
+    j = 0;
+    while (j < cols) {
+        sum = sum + (i * cols + j) * (rows - 1) + i * cols;
+        j = j + 1;
+    }
+    i = i + 1;
+}
+print sum;
+"""
+
+FIB = """
+int n = %d, a = 0, b = 1, t = 0, i = 0;
+while (i < (n - 1)) {
+    t = a + b;
+    a = b;
+    b = t %% (n * 1000 + 7);
+    i = i + 1;
+}
+print b;
+"""
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests')
+
+
+def run(ast):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(Interpreter())
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    programs = [("matrix", MATRIX % (iterations / 40)), ("fib_iter", FIB % iterations)]
+    for filename in sorted(os.listdir(TESTS)):
+        if filename.endswith('.in'):
+            with open(os.path.join(TESTS, filename)) as f:
+                programs.append((os.path.splitext(filename)[0], f.read()))
+
+    print "{:<10} {:>12} {:>12}".format("", "time (ms)", "after (ms)")
+    for name, text in programs:
+        ast = Simplifier().simplify(parse(text))
+        time = best_of(lambda: run(ast), repeat=5)
+        ast = LoopOptimizer().optimize(ast)
+        time_after = best_of(lambda: run(ast), repeat=5)
+        print "{:<10} {:>12.1f} {:>12.1f}".format(name, time * 1000, time_after * 1000)
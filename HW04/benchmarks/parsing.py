@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Parse throughput of the ply LALR parser and of PrattParser on a generated
+# program, in MB of source per second, with both lexers and with the tokens
+# scanned beforehand, which leaves only the parsing.
+#
+#   python benchmarks/parsing.py [statements]
+
+import sys
+from functools import partial
+from common import best_of
+import ply.yacc as yacc
+from Cparser import Cparser
+from PrattParser import PrattParser
+from FastScanner import FastScanner
+
+
+def generate(statements):
+    lines = ["int x = 0, y = 1;", "int f(int a, int b) {", "  return a * b + 1;", "}"]
+    for i in range(statements):
+        lines.append("x = (x + {0}) * y - f(x, {0}) / 3 % 7;".format(i))
+        lines.append("if (x >= {0} && y != 2 || x < y) y = y << 1; else print x, y;".format(i))
+        lines.append("while (y > {0}) {{ y = y - 1; }}".format(i))
+    return "\n".join(lines) + "\n"
+
+
+# replays the tokens FastScanner produced for the program
+class Replay(FastScanner):
+
+    def __init__(self, text):
+        self.tokens_of = {text: self.tokenize(text)[0]}
+
+    def input(self, text):
+        self.token = partial(next, iter(self.tokens_of[text]), None)
+
+
+def ply_parse(scanner):
+    cparser = Cparser(scanner=scanner)
+    parser = yacc.yacc(module=cparser, write_tables=False, debug=False, errorlog=yacc.NullLogger())
+    return lambda text: parser.parse(text, lexer=cparser.scanner)
+
+
+def pratt_parse(scanner):
+    return PrattParser(scanner=scanner).parse
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    text = generate(statements)
+    megabytes = len(text) / (1024.0 * 1024.0)
+
+    print "{:.2f} MB".format(megabytes)
+    for name, parse in [("ply, ply lexer", ply_parse(None)),
+                        ("ply, FastScanner", ply_parse(FastScanner())),
+                        ("pratt, ply lexer", pratt_parse(None)),
+                        ("pratt, FastScanner", pratt_parse(FastScanner())),
+                        ("ply, replay", ply_parse(Replay(text))),
+                        ("pratt, replay", pratt_parse(Replay(text)))]:
+        elapsed = best_of(lambda: parse(text), repeat=3)
+        print "{:<20} {:>8.2f} MB/s".format(name, megabytes / elapsed)
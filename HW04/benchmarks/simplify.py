@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# Node counts and Interpreter run time of every acceptance test program
+# before and after the Simplifier pass.
+#
+#   python benchmarks/simplify.py [repeat]
+
+import os
+import sys
+from common import parse, best_of
+from ast_memory import nodes
+from Interpreter import Interpreter
+from Simplifier import Simplifier
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests')
+
+
+def run(ast):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(Interpreter())
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print "{:<10} {:>8} {:>8} {:>12} {:>12}".format("test", "nodes", "after", "time (ms)", "after (ms)")
+    for filename in sorted(os.listdir(TESTS)):
+        if not filename.endswith('.in'):
+            continue
+        with open(os.path.join(TESTS, filename)) as f:
+            text = f.read()
+        ast = parse(text)
+        before = len(list(nodes(ast)))
+        time = best_of(lambda: run(ast), repeat)
+        ast = Simplifier().simplify(ast)
+        after = len(list(nodes(ast)))
+        time_after = best_of(lambda: run(ast), repeat)
+        print "{:<10} {:>8} {:>8} {:>12.2f} {:>12.2f}".format(
+            os.path.splitext(filename)[0], before, after, time * 1000, time_after * 1000)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# Closure engine run time of the collatz, gcd and primes acceptance programs
+# and of an int arithmetic loop, generic (variables in the MemoryStack, one
+# closure per operand) and specialized (variables in Resolver slots, int op
+# int expressions reading their constant and variable operands themselves).
+#
+#   python benchmarks/specialize.py [iterations]
+
+import os
+import sys
+from common import parse, best_of
+from ClosureCompiler import ClosureCompiler
+
+ARITHMETIC = """
+int i = 0, s = 0;
+while (i < %d) {
+    s = (s + i * 3 - (i %% 7)) %% 1000003;
+    if (i > s) s = s + 1;
+    i = i + 1;
+}
+print s;
+"""
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests')
+
+
+def run(ast, specialize):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(ClosureCompiler(specialize))()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    programs = [("arithmetic", ARITHMETIC % iterations)]
+    for name in ["collatz", "gcd", "primes"]:
+        with open(os.path.join(TESTS, name + ".in")) as f:
+            programs.append((name, f.read()))
+
+    print "{:<10} {:>12} {:>16}".format("", "generic (ms)", "specialized (ms)")
+    for name, text in programs:
+        ast = parse(text)
+        generic = best_of(lambda: run(ast, False), repeat=15)
+        typed = best_of(lambda: run(ast, True), repeat=15)
+        print "{:<10} {:>12.1f} {:>16.1f}".format(name, generic * 1000, typed * 1000)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# Wall time of `python main.py` on a one line program, with the default ply
+# setup and with --fast-start, each with and without tables already built.
+# Removes the parsetab.py/parser.out that ply writes next to Cparser.py.
+#
+#   python benchmarks/startup.py [runs]
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HW04 = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+PROGRAM = "print 1;\n"
+
+
+def clean_ply_tables():
+    for name in ['parsetab.py', 'parsetab.pyc', 'parser.out']:
+        path = os.path.join(HW04, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def clean_cache(cache):
+    shutil.rmtree(cache, ignore_errors=True)
+
+
+def best_run(args, before, runs):
+    best = None
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(runs):
+            before()
+            start = time.time()
+            subprocess.check_call([sys.executable, 'main.py'] + args, cwd=HW04, stdout=devnull, stderr=devnull)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    program = tempfile.NamedTemporaryFile(suffix='.in', delete=False)
+    program.write(PROGRAM)
+    program.close()
+    cache = tempfile.mkdtemp()
+    fast = ['--fast-start', '--table-cache', cache, program.name]
+
+    try:
+        results = [
+            ("ply, cold", best_run([program.name], clean_ply_tables, runs)),
+            ("ply, warm", best_run([program.name], lambda: None, runs)),
+            ("fast-start, cold", best_run(fast, lambda: clean_cache(cache), runs)),
+            ("fast-start, warm", best_run(fast, lambda: None, runs)),
+        ]
+    finally:
+        os.remove(program.name)
+        clean_cache(cache)
+
+    for name, elapsed in results:
+        print "{:<20} {:>8.1f} ms".format(name, elapsed * 1000)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# Peak RSS and time to the first token when lexing a large generated file
+# that is read whole (as main.py does without --stream), read in chunks and
+# read from an mmap. Each mode runs in a fresh process.
+#
+#   python benchmarks/stream_memory.py [megabytes]
+
+import mmap
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import common  # puts HW04 on sys.path
+from scanner import Scanner, StreamScanner
+
+MODES = ['whole', 'chunks', 'mmap']
+
+
+def generate(path, megabytes):
+    block = "".join("x = (x + {0}) * y - {0} / 3; /* {0}\n */ print \"line {0}\";\n".format(i) for i in range(1000))
+    with open(path, 'w') as f:
+        for _ in range(int(megabytes * 1024 * 1024 / len(block)) + 1):
+            f.write(block)
+
+
+def lex(mode, path):
+    start = time.time()
+    with open(path) as f:
+        if mode == 'whole':
+            scanner, source = Scanner(), f.read()
+        elif mode == 'chunks':
+            scanner, source = StreamScanner(), f
+        else:
+            scanner, source = StreamScanner(), mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        scanner.build()
+        scanner.input(source)
+        first = None
+        while scanner.token() is not None:
+            if first is None:
+                first = time.time() - start
+    # ru_maxrss is in KB on Linux
+    print first, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] in MODES:
+        lex(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 16
+    fd, path = tempfile.mkstemp(suffix='.in')
+    os.close(fd)
+    try:
+        generate(path, megabytes)
+        print "{:.1f} MB".format(os.path.getsize(path) / (1024.0 * 1024.0))
+        print "{:<8} {:>14} {:>14}".format("mode", "peak RSS (MB)", "first token (ms)")
+        for mode in MODES:
+            first, rss = subprocess.check_output([sys.executable, __file__, mode, path]).split()
+            print "{:<8} {:>14.1f} {:>14.1f}".format(mode, int(rss) / 1024.0, float(first) * 1000)
+    finally:
+        os.remove(path)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# Interpreter run time of a tail-recursive sum with ordinary calls and with
+# the tail calls marked by TailCallMarker.
+#
+#   python benchmarks/tail_calls.py [depth]
+
+import os
+import sys
+from common import parse, best_of
+from Interpreter import Interpreter
+from TailCalls import TailCallMarker
+
+SUM = """
+int sum(int n, int acc) {
+    if (n == 0) return acc;
+    return sum(n - 1, acc + n);
+}
+print sum(%d, 0);
+"""
+
+
+def run(ast):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        ast.accept(Interpreter())
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    # deeper sums exceed the recursion limit without tail calls
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    ast = parse(SUM % depth)
+    time = best_of(lambda: run(ast), repeat=9)
+    ast = TailCallMarker().mark(ast)
+    time_after = best_of(lambda: run(ast), repeat=9)
+    print "{:<10} {:>12} {:>12}".format("", "calls (ms)", "tail (ms)")
+    print "{:<10} {:>12.1f} {:>12.1f}".format("sum", time * 1000, time_after * 1000)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# Run time of every acceptance test program on the Interpreter, the closure
+# engine and the python engine (Transpiler), and the time to generate and
+# compile the python module.
+#
+#   python benchmarks/transpile.py [repeat]
+
+import os
+import sys
+from common import parse, best_of
+from Interpreter import Interpreter
+from ClosureCompiler import ClosureCompiler
+from TailCalls import TailCallMarker
+import Transpiler
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tests')
+
+
+def quiet(fn):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        fn()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print "{:<10} {:>14} {:>12} {:>12} {:>12}".format(
+        "test", "visitor (ms)", "closure (ms)", "python (ms)", "compile (ms)")
+    for filename in sorted(os.listdir(TESTS)):
+        if not filename.endswith('.in'):
+            continue
+        with open(os.path.join(TESTS, filename)) as f:
+            ast = TailCallMarker().mark(parse(f.read()))
+        visitor = best_of(lambda: quiet(lambda: ast.accept(Interpreter())), repeat)
+        closure = best_of(lambda: quiet(lambda: ast.accept(ClosureCompiler())()), repeat)
+        build = best_of(lambda: Transpiler.compileProgram(ast), repeat)
+        code = Transpiler.compileProgram(ast)
+        python = best_of(lambda: quiet(lambda: Transpiler.run(code)), repeat)
+        print "{:<10} {:>14.2f} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+            os.path.splitext(filename)[0], visitor * 1000, closure * 1000, python * 1000, build * 1000)
@@ -1,30 +1,381 @@
+import mmap
+import os
 import sys
+import argparse
 import ply.yacc as yacc
 from Cparser import Cparser
+from PrattParser import PrattParser
 import Interpreter as inter
+from ClosureCompiler import ClosureCompiler
+from Bytecode import Compiler, disassemble
+from VM import VM
+from IR import IRBuilder, dump
+from IRInterpreter import IRInterpreter
+import Transpiler
+import CBackend
+from Exceptions import StackOverflowError, BudgetExceeded, CompileError
+from Budget import Budget
+from Resolver import Resolver
+from Simplifier import Simplifier
+from Inliner import Inliner
+from DeadCode import DeadCodeEliminator
+from LoopOptimizer import LoopOptimizer
+from TailCalls import TailCallMarker
+from Profiler import ProfilingInterpreter
+from Stats import Stats
+from Memoization import PurityChecker, MemoCache
 from TypeChecker import TypeChecker
+from TableCache import TableCache
+from FastScanner import FastScanner
+from scanner import StreamScanner
+from ASTCache import ASTCache, Entry
+from StringIO import StringIO
+
+
+ENGINES = ['visitor', 'completion', 'resolved', 'closure', 'vm', 'ir', 'python', 'c']
+
+# exit status of a run stopped by --fuel, --timeout or --max-memory
+BUDGET_EXCEEDED = 3
+
+
+# runs <ast>; returns the exit status of the process, BUDGET_EXCEEDED when
+# the budget stopped it
+def run(ast, args):
+    memo = None
+    if args.optimize and not args.no_memo:
+        memo = MemoCache(PurityChecker().pureFunctions(ast), args.memo_size)
+
+    interpreter = None
+    budget = None
+    status = 0
+    if budgeted(args):
+        budget = Budget(args.fuel, args.timeout,
+                        None if args.max_memory is None else args.max_memory * 1024 * 1024, args.budget_interval)
+    try:
+        interpreter = execute(ast, args, memo, budget)
+    except BudgetExceeded as e:
+        print("Error: {0}".format(e))
+        status = BUDGET_EXCEEDED
+    except RuntimeError as e:
+        # runaway recursion overflows the python stack before the fuel runs out
+        if budget is None or 'recursion' not in str(e):
+            raise
+        print("Error: recursion exceeds the python stack after {0} steps".format(budget.steps()))
+        status = BUDGET_EXCEEDED
+
+    if args.memo_stats and memo is not None:
+        sys.stderr.write(memo.stats() + "\n")
+    if args.call_stats and interpreter is not None:
+        sys.stderr.write(interpreter.callStats() + "\n")
+    return status
+
+
+# runs <ast> with the engine chosen; returns the Interpreter if one ran it
+def execute(ast, args, memo, budget):
+    interpreter = None
+    if args.engine == 'c' and CBackend.runCompiled(ast, args.c_cache):
+        return
+    if args.engine == 'closure':
+        ast.accept(ClosureCompiler(not args.no_specialize))()
+    elif args.engine == 'completion':
+        interpreter = inter.CompletionInterpreter(memo, budget)
+        ast.accept(interpreter)
+    elif args.engine == 'resolved':
+        Resolver().visit(ast)
+        ast.accept(inter.ResolvedInterpreter(memo, budget))
+    elif args.engine == 'vm':
+        try:
+            VM(args.memory_budget * 1024 * 1024).run(Compiler().compile(ast))
+        except StackOverflowError as e:
+            print("Error: {0}".format(e))
+    elif args.engine == 'ir':
+        IRInterpreter().run(IRBuilder().build(ast))
+    elif args.engine == 'python':
+        Transpiler.run(Transpiler.compileProgram(ast, args.filename))
+    elif profiling(args):
+        interpreter = ProfilingInterpreter(memo, budget)
+        ast.accept(interpreter)
+        writeProfile(interpreter, args)
+    else:
+        interpreter = inter.Interpreter(memo, budget)
+        ast.accept(interpreter)
+    return interpreter
+
+
+def budgeted(args):
+    return args.fuel is not None or args.timeout is not None or args.max_memory is not None
+
+
+def reporting(args):
+    return args.stats or args.stats_json
+
+
+def writeStats(stats, args):
+    if args.stats:
+        sys.stderr.write(stats.report())
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            f.write(stats.toJSON())
+
+
+def profiling(args):
+    return args.profile or args.profile_json or args.profile_collapsed
+
+
+def writeProfile(profiler, args):
+    if args.profile:
+        sys.stderr.write(profiler.report(args.profile_top))
+    for filename, output in ((args.profile_json, profiler.toJSON), (args.profile_collapsed, profiler.collapsed)):
+        if filename:
+            with open(filename, 'w') as f:
+                f.write(output())
+
+
+# parses and type checks <text>, a file or an mmap with --stream; with
+# <capture> the diagnostics printed on the way are also kept in the returned
+# entry, so a cache hit can replay them. Phases and counts go to <stats>.
+def frontEnd(text, args, stats, capture=False):
+    stdout = sys.stdout
+    if capture:
+        sys.stdout = StringIO()
+    try:
+        tables = TableCache(args.table_cache) if args.fast_start else None
+        if args.stream:
+            scanner = StreamScanner(args.stream_chunk_size * 1024)
+        else:
+            scanner = FastScanner() if args.lexer == 'fast' else None
+        with stats.phase('parse'):
+            if args.parser == 'pratt':
+                pratt = PrattParser(tables, scanner)
+                if reporting(args):
+                    stats.countTokens(pratt.scanner)
+                ast = pratt.parse(text)
+            else:
+                cparser = Cparser(tables, scanner)
+                parser = yacc.yacc(module=cparser) if tables is None else tables.parser(cparser)
+                if reporting(args):
+                    stats.countTokens(cparser.scanner)
+                ast = parser.parse(text, lexer=cparser.scanner)
+
+        with stats.phase('typecheck'):
+            typeChecker = TypeChecker()
+            ast.accept(typeChecker)
+    finally:
+        if capture:
+            diagnostics = sys.stdout.getvalue()
+            sys.stdout = stdout
+            sys.stdout.write(diagnostics)
+    return Entry(ast, diagnostics if capture else None, typeChecker.haveErrors)
+
+
+# parses, checks, optimizes and runs <text>; a python engine run compiles
+# the program into <codes>, a Transpiler.CodeCache, too. Returns the exit
+# status run gives, None when it does not run.
+def compileAndRun(text, args, stats, codes=None):
+    cache = ASTCache(args.ast_cache, args.ast_cache_size * 1024 * 1024,
+                     repr((args.lexer, args.parser))) if args.cache_ast else None
+    entry = None
+    if cache is not None:
+        with stats.phase('cache load'):
+            entry = cache.load(text)
+    if entry is not None:
+        sys.stdout.write(entry.diagnostics)
+    else:
+        entry = frontEnd(text, args, stats, capture=cache is not None or codes is not None)
+        if cache is not None:
+            cache.store(text, entry)
+
+    if entry.haveErrors == 0:
+        ast = entry.ast
+        if reporting(args):
+            stats.countNodes('parsed nodes', ast)
+        with stats.phase('optimize'):
+            if args.optimize and not args.no_inline:
+                ast = Inliner(args.inline_size, sys.stderr if args.explain_inlining else None).inline(ast)
+            if args.optimize and not args.no_simplify:
+                ast = Simplifier().simplify(ast)
+            if args.optimize and not args.no_dce:
+                ast = DeadCodeEliminator(sys.stderr if args.explain_dce else None).eliminate(ast)
+            if args.optimize and not args.no_loop_opt:
+                ast = LoopOptimizer().optimize(ast)
+            if not args.no_tco:
+                ast = TailCallMarker().mark(ast)
+        if reporting(args):
+            stats.countNodes('run nodes', ast)
+        try:
+            if args.disassemble:
+                print disassemble(Compiler().compile(ast)),
+            elif args.show_c:
+                print CBackend.CGenerator().generate(ast),
+            elif args.show_python:
+                print Transpiler.Transpiler().transpile(ast),
+            elif args.dump_ir:
+                print dump(IRBuilder().build(ast)),
+            elif codes is not None:
+                code = Transpiler.compileProgram(ast, args.filename)
+                codes.store(text, entry.diagnostics, code)
+                with stats.phase('run'):
+                    Transpiler.run(code)
+            else:
+                with stats.phase('run'):
+                    return run(ast, args)
+        except CompileError as e:
+            # programs the TypeChecker accepts and a compiler rejects, reported as it reports errors
+            print("Error: {0}".format(e))
+
+
+# runs the code <codes> holds for <text>, replaying the diagnostics printed
+# when it was compiled; False when there is none
+def runCached(codes, text, stats):
+    with stats.phase('cache load'):
+        cached = codes.load(text)
+    if cached is None:
+        return False
+    diagnostics, code = cached
+    sys.stdout.write(diagnostics)
+    with stats.phase('run'):
+        Transpiler.run(code)
+    return True
+
+
+# the options that change the python generated for a source
+def pipelineOptions(args):
+    return repr((args.lexer, args.parser, args.optimize, args.no_inline, args.inline_size, args.no_simplify,
+                 args.no_dce, args.no_loop_opt, args.no_tco))
+
+
+def listing(args):
+    return args.disassemble or args.show_c or args.show_python or args.dump_ir
 
 
 if __name__ == '__main__':
 
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('filename', nargs='?', default="example.txt")
+    arg_parser.add_argument('--engine', choices=ENGINES, default='visitor',
+                            help="execution engine used to run the program")
+    arg_parser.add_argument('--disassemble', action='store_true',
+                            help="print the bytecode of the program instead of running it")
+    arg_parser.add_argument('--dump-ir', action='store_true',
+                            help="print the SSA form control flow graph of the program instead of running it")
+    arg_parser.add_argument('--show-python', action='store_true',
+                            help="print the python source the python engine would run instead of running it")
+    arg_parser.add_argument('--cache-py', action='store_true',
+                            help="python engine: run the code object compiled from the same source with the same "
+                                 "options from --py-cache, without parsing, checking nor transpiling it again")
+    arg_parser.add_argument('--py-cache', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pycache'),
+                            help="directory of the compiled python modules")
+    arg_parser.add_argument('--show-c', action='store_true',
+                            help="print the C source the c engine would build instead of running it")
+    arg_parser.add_argument('--c-cache', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cbin'),
+                            help="directory of the binaries built by the c engine")
+    arg_parser.add_argument('--memory-budget', type=int, default=256,
+                            help="megabytes the vm engine may spend on call frames")
+    arg_parser.add_argument('--lexer', choices=['ply', 'fast'], default='ply',
+                            help="ply lexer or the single pass FastScanner")
+    arg_parser.add_argument('--parser', choices=['ply', 'pratt'], default='ply',
+                            help="ply LALR parser or the recursive descent PrattParser")
+    arg_parser.add_argument('--fast-start', action='store_true',
+                            help="load lexer and parser tables from --table-cache instead of rebuilding them")
+    arg_parser.add_argument('--table-cache', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.tables'),
+                            help="directory of the cached lexer and parser tables")
+    arg_parser.add_argument('--cache-ast', action='store_true',
+                            help="reuse the parsed and type checked program from --ast-cache when the source is unchanged")
+    arg_parser.add_argument('--ast-cache', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.astcache'),
+                            help="directory of the cached programs")
+    arg_parser.add_argument('--ast-cache-size', type=int, default=64,
+                            help="megabytes the cached programs may take before the least recently used are evicted")
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help="rewrite the program before running it (inlining, simplification, dead code "
+                                 "elimination, loop optimization) and memoize calls of pure functions; "
+                                 "a --no-* option turns each off")
+    arg_parser.add_argument('--no-simplify', action='store_true',
+                            help="with -O, run the program without constant folding and algebraic simplification")
+    arg_parser.add_argument('--no-inline', action='store_true',
+                            help="with -O, do not inline calls of small non-recursive functions")
+    arg_parser.add_argument('--inline-size', type=int, default=40,
+                            help="largest function body, in AST nodes, that is inlined")
+    arg_parser.add_argument('--explain-inlining', action='store_true',
+                            help="report on stderr which calls were inlined and why others were not")
+    arg_parser.add_argument('--no-dce', action='store_true',
+                            help="with -O, keep unused variables, unreachable instructions and expressions without effect")
+    arg_parser.add_argument('--explain-dce', action='store_true',
+                            help="report on stderr what dead code was removed and how many nodes")
+    arg_parser.add_argument('--no-loop-opt', action='store_true',
+                            help="with -O, do not hoist loop invariant expressions nor strength reduce induction variables")
+    arg_parser.add_argument('--no-specialize', action='store_true',
+                            help="closure engine: keep variables in the Interpreter's memory stack instead of resolved slots, "
+                                 "and compile int arithmetic to one closure per operand")
+    arg_parser.add_argument('--no-tco', action='store_true',
+                            help="make self-recursive tail calls as ordinary calls instead of rerunning the body in place")
+    arg_parser.add_argument('--no-memo', action='store_true',
+                            help="with -O, do not memoize calls of pure functions (visitor engines)")
+    arg_parser.add_argument('--memo-size', type=int, default=1024,
+                            help="number of cached results kept before least recently used ones are evicted")
+    arg_parser.add_argument('--memo-stats', action='store_true',
+                            help="report memo cache hits and misses on stderr")
+    arg_parser.add_argument('--call-stats', action='store_true',
+                            help="report call site cache hits and misses on stderr (visitor and completion engines)")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="report on stderr the lines, functions and loops the program spends its time in (visitor engine)")
+    arg_parser.add_argument('--profile-top', type=int, default=20,
+                            help="number of lines listed by --profile")
+    arg_parser.add_argument('--profile-json', metavar='FILE',
+                            help="write the time and executions of every node, line, function and loop to FILE as JSON")
+    arg_parser.add_argument('--profile-collapsed', metavar='FILE',
+                            help="write the time of every stack of functions and loops to FILE in the collapsed format of flame graphs")
+    arg_parser.add_argument('--fuel', type=int,
+                            help="stop the program after this many loop iterations and calls (visitor engines); "
+                                 "a stopped program exits with status {}".format(BUDGET_EXCEEDED))
+    arg_parser.add_argument('--timeout', type=float,
+                            help="stop the program after this many seconds of running (visitor engines)")
+    arg_parser.add_argument('--max-memory', type=int,
+                            help="stop the program once the process peaks above this many megabytes (visitor engines)")
+    arg_parser.add_argument('--budget-interval', type=int, default=1024,
+                            help="loop iterations and calls between two checks of --timeout and --max-memory")
+    arg_parser.add_argument('--stats', action='store_true',
+                            help="report on stderr the time and memory of every phase, and token and AST node counts")
+    arg_parser.add_argument('--stats-json', metavar='FILE',
+                            help="write the figures of --stats to FILE as JSON")
+    arg_parser.add_argument('--stream', choices=['chunks', 'mmap'],
+                            help="lex the file as it is read in chunks or from an mmap of it instead of reading it whole")
+    arg_parser.add_argument('--stream-chunk-size', type=int, default=1024,
+                            help="size in KB of the pieces read with --stream")
+    args = arg_parser.parse_args()
+    if args.stream and args.lexer == 'fast':
+        arg_parser.error("--stream works with the ply lexer only")
+    if args.stream and args.cache_ast:
+        arg_parser.error("--cache-ast needs the whole source, it cannot be combined with --stream")
+    if args.stream and args.cache_py:
+        arg_parser.error("--cache-py needs the whole source, it cannot be combined with --stream")
+    if budgeted(args) and args.engine not in ('visitor', 'completion', 'resolved'):
+        arg_parser.error("--fuel, --timeout and --max-memory apply to the visitor engines only")
+    if profiling(args) and args.engine != 'visitor':
+        arg_parser.error("the profiler runs with the visitor engine only")
+
     try:
-        filename = sys.argv[1] if len(sys.argv) > 1 else "example.txt"
+        filename = args.filename
         file = open(filename, "r")
     except IOError:
         print("Cannot open {0} file".format(filename))
         sys.exit(0)
 
-    Cparser = Cparser()
-    parser = yacc.yacc(module=Cparser)
-    text = file.read()
-
-    ast = parser.parse(text, lexer=Cparser.scanner)
-    
-    typeChecker = TypeChecker()
-    ast.accept(typeChecker)
-
-    if typeChecker.haveErrors == 0:
-        ast.accept(inter.Interpreter())
+    if args.stream == 'mmap' and os.fstat(file.fileno()).st_size > 0:
+        text = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    elif args.stream:
+        text = file
+    else:
+        text = file.read()
 
-    # new
+    stats = Stats()
+    codes = None
+    if args.engine == 'python' and args.cache_py and not listing(args):
+        codes = Transpiler.CodeCache(args.py_cache, pipelineOptions(args))
+    status = 0
+    if codes is None or not runCached(codes, text, stats):
+        status = compileAndRun(text, args, stats, codes)
+    if reporting(args):
+        writeStats(stats, args)
+    if status:
+        sys.exit(status)
 
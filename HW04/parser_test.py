@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+import os
+import sys
+import unittest
+from StringIO import StringIO
+
+import ply.yacc as yacc
+import AST
+from Cparser import Cparser
+from PrattParser import PrattParser
+from FastScanner import FastScanner
+
+# programs both parsers must reject with the same message
+SYNTAX_ERRORS = ["int x;\n",
+                 "int f() { return 1; }\nint x = 1;\n",
+                 "print 1 < 2 < 3;\n",
+                 "if (x) print 1; else\n",
+                 "repeat until x;\n",
+                 "{ int f() { } }\n",
+                 "print (1 + ;\n",
+                 "x = 1 $ 2;\n"]
+
+
+def parse_ply(text):
+    cparser = Cparser()
+    parser = yacc.yacc(module=cparser, write_tables=False, debug=False, errorlog=yacc.NullLogger())
+    return parser.parse(text, lexer=cparser.scanner)
+
+
+def parse_pratt(text):
+    return PrattParser(scanner=FastScanner()).parse(text)
+
+
+# runs <parse> on <text>, returns the tree or None and what was printed
+def run(parse, text):
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        try:
+            ast = parse(text)
+        except SystemExit:
+            ast = None
+        return ast, sys.stdout.getvalue()
+    finally:
+        sys.stdout = stdout
+
+
+def fields(node):
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(node, name):
+                yield name, getattr(node, name)
+
+
+# compares two trees field by field, returns the path to the first
+# difference or None
+def difference(a, b, path='program'):
+    if type(a) is not type(b):
+        return "{0}: {1} != {2}".format(path, type(a).__name__, type(b).__name__)
+    if isinstance(a, AST.Node):
+        a_fields, b_fields = dict(fields(a)), dict(fields(b))
+        if sorted(a_fields) != sorted(b_fields):
+            return "{0}: fields {1} != {2}".format(path, sorted(a_fields), sorted(b_fields))
+        for name in sorted(a_fields):
+            diff = difference(a_fields[name], b_fields[name], path + '.' + name)
+            if diff:
+                return diff
+    elif isinstance(a, list):
+        if len(a) != len(b):
+            return "{0}: {1} != {2} items".format(path, len(a), len(b))
+        for i, (x, y) in enumerate(zip(a, b)):
+            diff = difference(x, y, "{0}[{1}]".format(path, i))
+            if diff:
+                return diff
+    elif a != b:
+        return "{0}: {1!r} != {2!r}".format(path, a, b)
+    return None
+
+
+class ParserTests(unittest.TestCase):
+
+    @classmethod
+    def add_tests(cls, dir):
+        for filename in sorted(os.listdir(dir)):
+            if filename.endswith('.in'):
+                cls.add_test(os.path.join(dir, filename))
+
+    @classmethod
+    def add_test(cls, path):
+
+        def test_func(self):
+            with open(path) as f:
+                text = f.read()
+            self.check(text)
+
+        setattr(cls, 'test_' + os.path.splitext(os.path.basename(path))[0], test_func)
+
+    def check(self, text):
+        expected, expected_output = run(parse_ply, text)
+        actual, actual_output = run(parse_pratt, text)
+        self.assertEqual(actual_output, expected_output)
+        self.assertIsNone(difference(expected, actual))
+
+    def test_syntax_errors(self):
+        for text in SYNTAX_ERRORS:
+            self.check(text)
+
+
+ParserTests.add_tests('tests/')
+unittest.main()
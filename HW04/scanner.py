@@ -12,8 +12,9 @@ class Scanner(object):
       return token.lexpos - last_cr
 
 
-  def build(self):
-      self.lexer = lex.lex(object=self)
+  # <tables> is a TableCache to load the lexer tables from, or None
+  def build(self, tables=None):
+      self.lexer = lex.lex(object=self) if tables is None else tables.lexer(self)
 
   def input(self, text):
       self.lexer.input(text)
@@ -102,3 +103,72 @@ class Scanner(object):
 
 
 
+
+
+# Scanner for input read piece by piece from <source>, anything with
+# read(size) such as an open file or an mmap of one. The ply lexer only
+# holds a window of whole lines: strings and line comments end at the end of
+# their line, so a cut after a newline cannot split them. A block comment
+# still open at the end of the window is lexed again once the next chunk has
+# been appended.
+class StreamScanner(Scanner):
+
+
+  def __init__(self, chunk_size=1 << 20):
+      self.chunk_size = chunk_size
+
+
+  def input(self, source):
+      self.source = source
+      self.offset = 0         # position of the window in the whole input
+      self.line_start = 0     # last '\n' before the window, 0 if none
+      self.rest = ''          # read after the last newline, not in the window yet
+      self.done = False
+      self.lexer.input('')
+
+
+  def token(self):
+      while True:
+          tok = self.lexer.token()
+          if tok is None:
+              if not self.fill(len(self.lexer.lexdata)):
+                return None
+          elif tok.type == '/' and not self.done and self.lexer.lexdata[tok.lexpos + 1:tok.lexpos + 2] == '*':
+              self.fill(tok.lexpos)
+          else:
+              tok.lexpos += self.offset
+              return tok
+
+
+  # moves the window to start at <start> and extends it with the lines read
+  # next, returns False once the whole input has been lexed
+  def fill(self, start):
+      window = self.lexer.lexdata
+      newline = window.rfind('\n', 0, start)
+      if newline >= 0:
+        self.line_start = self.offset + newline
+      self.offset += start
+      text = window[start:] + self.rest
+      self.rest = ''
+      while not self.done:
+          chunk = self.source.read(self.chunk_size)
+          if not chunk:
+            self.done = True
+          else:
+            cut = chunk.rfind('\n') + 1
+            if cut:
+              text += chunk[:cut]
+              self.rest = chunk[cut:]
+              break
+            text += chunk
+      self.lexer.input(text)
+      return len(text) > 0
+
+
+  # same columns as Scanner.find_tok_column gives for the whole input
+  def find_tok_column(self, token):
+      lexpos = token.lexpos - self.offset
+      last_cr = self.lexer.lexdata.rfind('\n', 0, lexpos)
+      if last_cr < 0:
+        return token.lexpos - self.line_start
+      return lexpos - last_cr
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+import os
+import sys
+import unittest
+from StringIO import StringIO
+
+from scanner import Scanner, StreamScanner
+from FastScanner import FastScanner
+
+# block comments and strings are cut at every position by the small chunks
+SAMPLE = ('int x = 1; /* a block\n comment over\n\n three lines */ string s = "a string";\n'
+          '# line comment /* not a block comment\nprint "/* not a comment */", x / 2;\r\n'
+          'x = x /* inline */ * 3;\n/* unterminated comment\n')
+
+# illegal characters, CRLF line ends and reserved words that start IDs
+EDGES = ('int integer = 1;\r\nprinter = whilex @ 2 $$ 3;\r\n\r\n  ifx = repeated ` 4.5e3;\n'
+         'returnValue = breaking; continue_ = 1.; "unterminated string\r\n'
+         'while (x) { break; } /* open comment\r\n int y; */ z ~ 1 /* never closed\n y')
+
+
+def tokens(scanner, source):
+    scanner.build()
+    scanner.input(source)
+    result = []
+    tok = scanner.token()
+    while tok is not None:
+        result.append((tok.type, tok.value, tok.lineno, tok.lexpos, scanner.find_tok_column(tok)))
+        tok = scanner.token()
+    return result
+
+
+# tokens as (type, value, lineno, column) and the error messages printed
+# while they are read, in the order they come
+def events(scanner, source):
+    stdout = sys.stdout
+    result = []
+    try:
+        scanner.build()
+        scanner.input(source)
+        while True:
+            sys.stdout = StringIO()
+            tok = scanner.token()
+            printed = sys.stdout.getvalue()
+            sys.stdout = stdout
+            if printed:
+                result.append(printed)
+            if tok is None:
+                return result
+            result.append((tok.type, tok.value, tok.lineno, scanner.find_tok_column(tok)))
+    finally:
+        sys.stdout = stdout
+
+
+class StreamScannerTests(unittest.TestCase):
+
+    def check(self, text):
+        expected = tokens(Scanner(), text)
+        for chunk_size in [1, 2, 3, 7, 64, 1 << 20]:
+            actual = tokens(StreamScanner(chunk_size), StringIO(text))
+            self.assertEqual(actual, expected, "chunk size {0}".format(chunk_size))
+
+    def test_sample(self):
+        self.check(SAMPLE)
+
+    def test_programs(self):
+        for filename in sorted(os.listdir('tests')):
+            if filename.endswith('.in'):
+                with open(os.path.join('tests', filename)) as f:
+                    self.check(f.read())
+
+
+class FastScannerTests(unittest.TestCase):
+
+    def check(self, text):
+        self.assertEqual(events(FastScanner(), text), events(Scanner(), text))
+
+    def test_sample(self):
+        self.check(SAMPLE)
+
+    def test_edges(self):
+        self.check(EDGES)
+
+    def test_programs(self):
+        for filename in sorted(os.listdir('tests')):
+            if filename.endswith('.in'):
+                with open(os.path.join('tests', filename)) as f:
+                    self.check(f.read())
+
+
+unittest.main()
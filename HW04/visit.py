@@ -3,7 +3,7 @@
 
 import inspect
 
-__all__ = ['on', 'when']
+__all__ = ['on', 'when', 'extend']
 
 def on(param_name):
   def f(fn):
@@ -31,6 +31,18 @@ def when(param_type):
   return f
 
 
+# copies the dispatcher behind an inherited visit method, so a subclass
+# can override some of the targets without touching the base class:
+#
+#   class Sub(Base):
+#     visit = extend(Base.visit)
+#
+#     @when(AST.Variable)
+#     def visit(self, node): ...
+def extend(visit):
+  return visit.dispatcher.copy()
+
+
 class Dispatcher(object):
   def __init__(self, param_name, fn):
     frame = inspect.currentframe().f_back.f_back   # these 2 lines
@@ -52,3 +64,10 @@ class Dispatcher(object):
 
   def add_target(self, typ, target):
     self.targets[typ] = target
+
+  def copy(self):
+    dispatcher = Dispatcher.__new__(Dispatcher)
+    dispatcher.param_index = self.param_index
+    dispatcher.param_name = self.param_name
+    dispatcher.targets = dict(self.targets)
+    return dispatcher